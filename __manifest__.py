@@ -18,6 +18,7 @@
     'depends': ['base', 'web', 'website', 'crm', 'sale'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron.xml',
         'views/report_views.xml',
         'views/website_templates.xml',
     ],
@@ -28,6 +29,18 @@
         'web.assets_web': [
             'CRM_report/static/src/js/patch_removefacet.js',
         ],
+        # Odoo's own copy of Chart.js, so that report pages load no CDN script
+        'CRM_report.chartjs': [
+            'web/static/lib/Chart/Chart.js',
+        ],
+        'CRM_report.report_dashboard': [
+            ('include', 'CRM_report.chartjs'),
+            'CRM_report/static/src/js/report_dashboard.js',
+        ],
+        'CRM_report.report_overview': [
+            ('include', 'CRM_report.chartjs'),
+            'CRM_report/static/src/js/report_overview.js',
+        ],
     },
     'installable': True,
     'application': True,
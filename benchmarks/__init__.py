@@ -0,0 +1 @@
+# Benchmark tooling, run from ``odoo-bin shell``; not loaded with the module.
@@ -0,0 +1,193 @@
+"""Seeded synthetic CRM data for the report benchmarks.
+
+Leads, partners and activities are cloned in SQL from one template record
+created through the ORM, so that every NOT NULL column of the installed
+modules gets a valid value while millions of rows are inserted in minutes.
+Distributions are skewed the way real pipelines are: a few salespeople own
+most leads, early stages are crowded, recent months are busier and revenues
+are log-normal.
+"""
+import logging
+
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+    '5m': 5_000_000,
+}
+
+PREFIX = 'Bench'
+
+# rows inserted per statement, committed in between
+CHUNK_SIZE = 250_000
+
+SALESPEOPLE = 25
+LOST_REASONS = 12
+LEADS_PER_PARTNER = 10
+ACTIVITIES_PER_LEAD = 0.5
+HISTORY_DAYS = 730
+
+
+def _pick(ids, skew):
+    """SQL expression picking one of ``ids``, the first ones being favoured
+    more as ``skew`` grows (1 is uniform)."""
+    return SQL(
+        "(%s::int[])[1 + floor(power(random(), %s) * %s)::int]",
+        list(ids), float(skew), len(ids),
+    )
+
+
+def _random_date(days=HISTORY_DAYS):
+    # squared: recent dates are more frequent
+    return SQL("now() - power(random(), 2) * %s * interval '1 day'", days)
+
+
+def _clone(env, table, template_id, count, overrides):
+    """Insert ``count`` copies of row ``template_id`` of ``table``, columns
+    in ``overrides`` being set to SQL expressions of ``gs.n`` instead."""
+    cr = env.cr
+    cr.execute(SQL(
+        """SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s AND column_name != 'id'
+         ORDER BY ordinal_position""",
+        table,
+    ))
+    columns = [row[0] for row in cr.fetchall()]
+    values = [
+        overrides[column] if column in overrides else SQL.identifier('template', column)
+        for column in columns
+    ]
+    for start in range(0, count, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, count)
+        cr.execute(SQL(
+            """INSERT INTO %s (%s)
+               SELECT %s FROM %s AS template, generate_series(%s, %s) AS gs(n)
+                WHERE template.id = %s""",
+            SQL.identifier(table),
+            SQL(", ").join(SQL.identifier(column) for column in columns),
+            SQL(", ").join(values),
+            SQL.identifier(table),
+            start + 1, stop, template_id,
+        ))
+        cr.commit()
+        _logger.info('%s: %s/%s rows', table, stop, count)
+
+
+def _inserted_range(env, table, name_like):
+    env.cr.execute(SQL(
+        "SELECT min(id), max(id) FROM %s WHERE name LIKE %s", SQL.identifier(table), name_like,
+    ))
+    return env.cr.fetchone()
+
+
+def _ensure_users(env):
+    Users = env['res.users'].with_context(no_reset_password=True)
+    group = env.ref('sales_team.group_sale_salesman')
+    users = Users.search([('login', '=like', 'bench_sales_%')], order='id')
+    for index in range(len(users), SALESPEOPLE):
+        users |= Users.create({
+            'name': f'{PREFIX} Salesperson {index + 1:02d}',
+            'login': f'bench_sales_{index + 1:02d}',
+            'groups_id': [(4, group.id)],
+        })
+    return users.ids
+
+
+def _ensure_lost_reasons(env):
+    Reason = env['crm.lost.reason']
+    reasons = Reason.search([('name', '=like', f'{PREFIX} %')], order='id')
+    for index in range(len(reasons), LOST_REASONS):
+        reasons |= Reason.create({'name': f'{PREFIX} lost reason {index + 1:02d}'})
+    return reasons.ids
+
+
+def generate(env, scale='10k', seed=42):
+    """Add ``scale`` leads (a key of ``SCALES`` or a number) with their
+    partners and activities. Commits as it goes."""
+    count = SCALES[scale] if isinstance(scale, str) else int(scale)
+    cr = env.cr
+    # setseed() takes a value in [-1, 1]
+    cr.execute(SQL("SELECT setseed(%s)", (seed % 2000) / 1000 - 1))
+
+    user_ids = _ensure_users(env)
+    reason_ids = _ensure_lost_reasons(env)
+    stage_ids = env['crm.stage'].search([], order='sequence, id').ids
+    team_ids = env['crm.team'].search([]).ids or [None]
+    source_ids = env['utm.source'].search([]).ids or [None]
+    activity_type_ids = env['mail.activity.type'].search([('res_model', 'in', (False, 'crm.lead'))]).ids
+    company_id = env.company.id
+
+    # partners
+    partner_count = max(count // LEADS_PER_PARTNER, 1)
+    partner = env['res.partner'].create({'name': f'{PREFIX} Partner template', 'company_id': False})
+    partner_overrides = {
+        'name': SQL("%s || gs.n", f'{PREFIX} Partner '),
+        'complete_name': SQL("%s || gs.n", f'{PREFIX} Partner '),
+        'email': SQL("'partner' || gs.n || '@bench.example.com'"),
+        'create_date': _random_date(),
+        'write_date': SQL("now()"),
+    }
+    if 'grade_id' in env['res.partner']._fields:
+        grade_ids = env['res.partner.grade'].search([]).ids
+        if grade_ids:
+            partner_overrides['grade_id'] = SQL(
+                "CASE WHEN random() < 0.6 THEN %s END", _pick(grade_ids, 2))
+    _clone(env, 'res_partner', partner.id, partner_count, partner_overrides)
+    partner_min, partner_max = _inserted_range(env, 'res_partner', f'{PREFIX} Partner %')
+
+    # leads: 30% leads, 70% opportunities of which 15% lost
+    lead = env['crm.lead'].create({'name': f'{PREFIX} Lead template', 'type': 'opportunity'})
+    _clone(env, 'crm_lead', lead.id, count, {
+        'name': SQL("%s || gs.n", f'{PREFIX} Lead '),
+        'type': SQL("CASE WHEN random() < 0.3 THEN 'lead' ELSE 'opportunity' END"),
+        'active': SQL("random() >= 0.15"),
+        'stage_id': _pick(stage_ids, 1.8),
+        'user_id': _pick(user_ids, 3),
+        'team_id': _pick(team_ids, 1),
+        'source_id': _pick(source_ids, 2),
+        'company_id': SQL("%s", company_id),
+        'partner_id': SQL(
+            "%s + floor(power(random(), 2) * %s)::int", partner_min, partner_max - partner_min + 1),
+        'expected_revenue': SQL("round(exp(8 + random() * 6)::numeric, 2)"),
+        'probability': SQL("round((random() * 100)::numeric, 2)"),
+        'create_date': _random_date(),
+        'write_date': SQL("now()"),
+    })
+    # lost reasons only on archived opportunities
+    cr.execute(SQL(
+        """UPDATE crm_lead SET lost_reason_id = %s
+            WHERE name LIKE %s AND active IS NOT TRUE AND type = 'opportunity'""",
+        _pick(reason_ids, 1.5), f'{PREFIX} Lead %',
+    ))
+    cr.commit()
+    lead_min, lead_max = _inserted_range(env, 'crm_lead', f'{PREFIX} Lead %')
+
+    # activities on random leads
+    if activity_type_ids:
+        activity = env['mail.activity'].create({
+            'res_model_id': env['ir.model']._get_id('crm.lead'),
+            'res_id': lead_min,
+            'activity_type_id': activity_type_ids[0],
+            'summary': f'{PREFIX} activity template',
+            'user_id': user_ids[0],
+        })
+        _clone(env, 'mail_activity', activity.id, int(count * ACTIVITIES_PER_LEAD), {
+            'res_id': SQL("%s + floor(random() * %s)::int", lead_min, lead_max - lead_min + 1),
+            'res_name': SQL("%s || gs.n", f'{PREFIX} Lead '),
+            'activity_type_id': _pick(activity_type_ids, 1.5),
+            'user_id': _pick(user_ids, 3),
+            'summary': SQL("%s || gs.n", f'{PREFIX} activity '),
+            'date_deadline': SQL("(now() + (random() * 120 - 90) * interval '1 day')::date"),
+            'create_date': _random_date(),
+            'write_date': SQL("now()"),
+        })
+
+    for table in ('res_partner', 'crm_lead', 'mail_activity'):
+        cr.execute(SQL("ANALYZE %s", SQL.identifier(table)))
+    env['looker_studio.lead_daily_fact']._refresh(full=True)
+    cr.commit()
+    _logger.info('Generated %s leads, %s partners (seed %s)', count, partner_count, seed)
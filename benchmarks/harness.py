@@ -0,0 +1,240 @@
+"""Timing harness for the report data methods and dashboard routes.
+
+Every method is run cold, as on a fresh request: the report cache, the
+per-cursor memo and the ORM cache are cleared before each iteration. Peak
+Python memory is measured in a separate, untimed pass because tracemalloc
+slows everything it traces.
+"""
+import json
+import logging
+import os
+import platform
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from dateutil.relativedelta import relativedelta
+
+import odoo
+from odoo.tools import SQL
+
+from odoo.addons.CRM_report.models.report import REPORT_CACHE_SEQUENCE, bump_generation
+from odoo.addons.CRM_report.models.report_cache import report_cache
+
+_logger = logging.getLogger(__name__)
+
+BENCH_REPORT_NAME = 'Benchmark'
+
+REPORT_METHODS = {
+    'looker_studio.report': (
+        'get_kpi_data', 'get_chart_data', 'get_detail_data', 'get_detail_page', 'get_lost_reason_data',
+        'get_pipeline_by_stage_data', 'get_win_loss_trend', 'get_source_analysis', 'get_deal_metrics',
+        'get_customer_data',
+    ),
+    'looker_studio.activity_report': ('get_data', 'get_detail_data', 'get_workload_heatmap'),
+    'looker_studio.sales_performance_report': (
+        'get_salesperson_performance', 'get_summary_data', 'get_chart_data', 'get_detail_data',
+    ),
+}
+
+# Routes computing the dashboards, by report model: ``(name, path, prime)``,
+# ``prime`` being requested untimed before each run (the drill-down route
+# slices the rows cached by the payload). Paths are formatted with the report
+# ``id`` and a ``stage`` to drill down to. The CRM dashboard page itself is
+# an empty shell: its widgets come from the payload, data and drill routes.
+PAYLOAD_PATH = '/looker_studio/report/%(id)s/payload/live'
+DATA_WIDGETS = 'kpi,chart,lost_reason,pipeline,trend,source,deal_metrics,customer'
+ROUTES = {
+    'looker_studio.report': (
+        ('payload', PAYLOAD_PATH, None),
+        ('data', '/looker_studio/report/%(id)s/data?widgets=' + DATA_WIDGETS, None),
+        ('drill', '/looker_studio/report/%(id)s/drill?drill_stage_id=%(stage)s', PAYLOAD_PATH),
+        ('drill_data', '/looker_studio/report/%(id)s/data?widgets=' + DATA_WIDGETS + '&drill_stage_id=%(stage)s', None),
+    ),
+    'looker_studio.activity_report': (('page', '/looker_studio/activity_report/%(id)s', None),),
+    'looker_studio.sales_performance_report': (('page', '/looker_studio/sales_performance/%(id)s', None),),
+}
+OVERVIEW_PATH = '/looker_studio/overview/data?reports=%s'
+
+
+def _percentile(samples, percent):
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _summary(durations, **extra):
+    return dict({
+        'p50_ms': round(_percentile(durations, 50), 2),
+        'p95_ms': round(_percentile(durations, 95), 2),
+        'min_ms': round(min(durations), 2),
+        'iterations': len(durations),
+    }, **extra)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_bench_reports(env):
+    """Return the benchmark report records, creating them on first use.
+
+    Every report covers the last 12 months; the CRM report is created once
+    per data source.
+    """
+    today = datetime.now().date()
+    window = {'time_filter': 'custom', 'date_from': today - relativedelta(years=1), 'date_to': today}
+    reports = []
+    for model, values in (
+        ('looker_studio.report', {'data_source': 'live', 'group_field': 'stage_id'}),
+        ('looker_studio.report', {'data_source': 'fact', 'group_field': 'stage_id'}),
+        ('looker_studio.activity_report', {'group_field': 'activity_type_id'}),
+        ('looker_studio.sales_performance_report', {'group_by_mode': 'all'}),
+    ):
+        name = f"{BENCH_REPORT_NAME} {values.get('data_source', '')}".strip()
+        report = env[model].search([('name', '=', name)], limit=1)
+        if not report:
+            report = env[model].create(dict(window, name=name, **values))
+        else:
+            report.write(window)
+        reports.append(report)
+    env.cr.commit()
+    return reports
+
+
+def _reset_caches(env):
+    report_cache.clear()
+    env.cr.cache.clear()
+    env.invalidate_all()
+
+
+def measure(env, function, iterations, warmup):
+    """Time ``function()`` run cold ``iterations`` times after ``warmup``
+    untimed runs; return its summary."""
+    # counters maintained by sql_db.Cursor.execute() once query_count exists
+    thread = threading.current_thread()
+    thread.query_time = getattr(thread, 'query_time', 0.0)
+    for _index in range(warmup):
+        _reset_caches(env)
+        function()
+    durations, queries = [], []
+    for _index in range(iterations):
+        _reset_caches(env)
+        thread.query_count = query_count = getattr(thread, 'query_count', 0)
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+        queries.append(thread.query_count - query_count)
+
+    _reset_caches(env)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return _summary(durations, queries=max(queries), peak_memory_kb=round(peak / 1024))
+
+
+def _bump_cache_generation(env):
+    """Invalidate the report cache of every server process, as a crm.lead
+    write would: route timings are then cold too."""
+    bump_generation(env.cr, REPORT_CACHE_SEQUENCE)
+    env.cr.commit()
+
+
+def measure_routes(env, reports, url, login, password, iterations, warmup):
+    """Time the dashboard routes of ``reports``, and the overview of the CRM
+    ones, through a server running on the database of ``env``."""
+    import requests
+
+    session = requests.Session()
+    response = session.post(f'{url}/web/session/authenticate', json={
+        'jsonrpc': '2.0', 'params': {'db': env.cr.dbname, 'login': login, 'password': password},
+    })
+    response.raise_for_status()
+    if response.json().get('error'):
+        raise RuntimeError(f"Cannot log in as {login}: {response.json()['error']}")
+
+    def get(path):
+        response = session.get(url + path)
+        response.raise_for_status()
+        return response
+
+    def time_route(path, prime=None):
+        for _index in range(warmup):
+            _bump_cache_generation(env)
+            get(prime or path)
+            get(path)
+        durations = []
+        for _index in range(iterations):
+            _bump_cache_generation(env)
+            if prime:
+                get(prime)
+            start = time.perf_counter()
+            response = get(path)
+            durations.append((time.perf_counter() - start) * 1000)
+        return _summary(durations, bytes=len(response.content))
+
+    stage = env['crm.stage'].search([], limit=1).id
+    results = {}
+    for report in reports:
+        for name, path, prime in ROUTES[report._name]:
+            values = {'id': report.id, 'stage': stage}
+            _logger.info('Benchmarking route %s of %s', name, report.name)
+            results[f'{name} [{report.name}]'] = time_route(path % values, prime and prime % values)
+    crm_reports = [report for report in reports if report._name == 'looker_studio.report']
+    if crm_reports:
+        path = OVERVIEW_PATH % ','.join(str(report.id) for report in crm_reports)
+        results['overview'] = time_route(path)
+    return results
+
+
+def run(env, iterations=10, warmup=2, output=None, url=None, login='admin', password='admin'):
+    """Benchmark every report method, and the dashboard routes when ``url``
+    points to a server running on the same database. Returns the results
+    and writes them as JSON to ``output`` when given."""
+    reports = get_bench_reports(env)
+    env.cr.execute("SELECT version()")
+    postgres = env.cr.fetchone()[0]
+    counts = {}
+    for table in ('crm_lead', 'res_partner', 'mail_activity', 'crm_lost_reason'):
+        env.cr.execute(SQL("SELECT COUNT(*) FROM %s", SQL.identifier(table)))
+        counts[table] = env.cr.fetchone()[0]
+
+    methods = {}
+    for report in reports:
+        for method in REPORT_METHODS[report._name]:
+            key = f'{report._name}.{method} [{report.name}]'
+            _logger.info('Benchmarking %s', key)
+            methods[key] = measure(env, getattr(report, method), iterations, warmup)
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': env.cr.dbname,
+            'odoo': odoo.release.version,
+            'postgres': postgres,
+            'python': platform.python_version(),
+            'iterations': iterations,
+            'warmup': warmup,
+        },
+        'counts': counts,
+        'methods': methods,
+    }
+    if url:
+        results['routes'] = measure_routes(env, reports, url, login, password, iterations, warmup)
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    return results
@@ -0,0 +1,78 @@
+"""Columnar encoding of the dashboard payload, decoded by report_dashboard.js.
+
+Widget results are mostly lists of dicts and parallel arrays of labels, the
+same stage, salesperson or source names recurring across widgets. The
+payload stores every string of such arrays once, in ``strings``, and:
+
+- a list of strings as ``{"$s": [index, ...]}``;
+- a list of dicts sharing the same keys as ``{"$t": {key: column}}``, each
+  column being encoded in turn;
+- floats rounded to ``FLOAT_DIGITS`` decimals, integral ones as integers.
+
+Everything else is kept as is. ``decode_payload`` is the inverse.
+"""
+
+FLOAT_DIGITS = 4
+
+PAYLOAD_VERSION = 1
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings = []
+        self.indexes = {}
+
+    def string(self, value):
+        index = self.indexes.get(value)
+        if index is None:
+            index = self.indexes[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def encode(self, value):
+        if isinstance(value, float):
+            value = round(value, FLOAT_DIGITS)
+            return int(value) if value.is_integer() else value
+        if isinstance(value, dict):
+            return {key: self.encode(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)) and value:
+            if all(isinstance(item, str) for item in value):
+                return {'$s': [self.string(item) for item in value]}
+            if all(isinstance(item, dict) for item in value):
+                keys = list(value[0])
+                if keys and all(list(item) == keys for item in value):
+                    return {'$t': {key: self.encode([item[key] for item in value]) for key in keys}}
+            return [self.encode(item) for item in value]
+        return value
+
+
+def encode_payload(widgets, as_of=None):
+    """Return the payload of ``{widget: data}``, ``as_of`` being the date of
+    the snapshot it comes from, if any."""
+    encoder = _Encoder()
+    encoded = encoder.encode(widgets)
+    return {
+        'version': PAYLOAD_VERSION,
+        'as_of': as_of,
+        'strings': encoder.strings,
+        'widgets': encoded,
+    }
+
+
+def _decode(value, strings):
+    if isinstance(value, list):
+        return [_decode(item, strings) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '$s' in value:
+        return [strings[index] for index in value['$s']]
+    if '$t' in value:
+        columns = {key: _decode(column, strings) for key, column in value['$t'].items()}
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+    return {key: _decode(item, strings) for key, item in value.items()}
+
+
+def decode_payload(payload):
+    """Return the ``{widget: data}`` of a payload, as report_dashboard.js
+    reads it."""
+    return _decode(payload['widgets'], payload['strings'])
@@ -1,7 +1,112 @@
-from odoo import http
-from odoo.http import request
+from odoo import api, fields, http
+from odoo.exceptions import UserError
+from odoo.http import request, content_disposition
 from odoo.tools.safe_eval import safe_eval
+from odoo.addons.CRM_report.models.report import (
+    DETAIL_FILTER_FIELDS, DETAIL_PAGE_SIZE, DETAIL_MAX_PAGE_SIZE, DRILL_FIELDS, DRILL_NONE,
+)
+from .payload import encode_payload
+import csv
+import gzip
+import hashlib
+import io
 import json
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+from werkzeug.exceptions import BadRequest
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Dashboard payload: version of pages that are not validated, widgets paged
+# through their own route instead.
+PAYLOAD_LIVE = 'live'
+PAYLOAD_EXCLUDED_WIDGETS = ('detail',)
+
+# Overview page: most reports shown at once, widgets it may request.
+OVERVIEW_MAX_REPORTS = 50
+OVERVIEW_WIDGETS = ('chart',)
+
+# Dashboard drill-down parameters: drill_<field>=<value>, see DRILL_FIELDS.
+DRILL_PREFIX = 'drill_'
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv;charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _iter_csv(headers, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # lets Excel detect UTF-8
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _validators(report, additional=()):
+    """Return the ``(etag, last_modified)`` of pages showing ``report``.
+
+    They combine the report's ``write_date``, the data generation of the
+    records it reads (see ``_get_source_stamp``), ``additional`` values and
+    whatever makes the page differ between users and sessions; computing them
+    reads a sequence and scans no report data.
+    """
+    stamp = report._get_source_stamp()
+    env = request.env
+    etag = hashlib.sha256(repr((
+        report._name, report.id, report.write_date, stamp, tuple(additional), fields.Date.context_today(report),
+        env.uid, tuple(env.companies.ids), env.lang, env.context.get('tz'), request.session.sid,
+    )).encode()).hexdigest()[:32]
+    dates = [value for value in (report.write_date,) + tuple(additional) if isinstance(value, datetime)]
+    return etag, max(dates).replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def _get_dashboard_state(report, params):
+    """Return ``report`` in the mode of the dashboard request ``params``
+    (``exact=1`` disables the approximate mode) and the domain of its
+    ``drill_<field>`` parameters. Raise UserError on invalid drill-downs."""
+    report = report.with_context(looker_studio_exact=params.get('exact') == '1')
+    drill = report._get_drill_domain({
+        key[len(DRILL_PREFIX):]: value for key, value in params.items() if key.startswith(DRILL_PREFIX)
+    })
+    return report, drill
+
+
+def _dashboard_query(report, drill, **extra):
+    """Query string carrying the state of ``_get_dashboard_state``, and the
+    ``extra`` parameters."""
+    params = [(DRILL_PREFIX + name, value or DRILL_NONE) for name, _operator, value in drill]
+    if report.env.context.get('looker_studio_exact'):
+        params.append(('exact', '1'))
+    params += extra.items()
+    return '?' + urlencode(params) if params else ''
+
+
+def _conditional(report, render, additional=()):
+    """Return ``render(etag)`` with ETag and Last-Modified headers, or an
+    empty 304 when the browser's copy is still current, see
+    ``_validators``. Debug pages embed timings and are never validated:
+    ``render`` then gets no etag.
+    """
+    if request.session.debug:
+        return render(None)
+    etag, last_modified = _validators(report, additional)
+    # If-Modified-Since alone is not trusted: the data generation has no date
+    if request.httprequest.if_none_match.contains(etag):
+        response = request.make_response('', status=304)
+    else:
+        response = render(etag)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # always revalidate: the data may change at any time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 class LookerReportController(http.Controller):
@@ -11,75 +116,224 @@ class LookerReportController(http.Controller):
         if not report.exists():
             return request.not_found()
         
-        # Get Group By Field Label (default to Stage if not set)
-        effective_group_field = report.group_field or 'stage_id'
-        group_field_label = 'Giai đoạn'  # Default label for stage_id
-        
-        field_info = request.env['ir.model.fields'].sudo().search([
-            ('model', '=', 'crm.lead'),
-            ('name', '=', effective_group_field)
-        ], limit=1)
-        if field_info:
-            group_field_label = field_info.field_description or effective_group_field
-        
-        # Get Data (time filter is handled in model)
-        kpi_data = report.get_kpi_data()
-        chart_data = report.get_chart_data()
-        detail_data = report.get_detail_data()
-        
-        # New advanced data
-        lost_reason_data = report.get_lost_reason_data()
-        pipeline_data = report.get_pipeline_by_stage_data()
-        win_loss_trend = report.get_win_loss_trend()
-        source_data = report.get_source_analysis()
-        deal_metrics = report.get_deal_metrics()
-        customer_data = report.get_customer_data()
+        if kwargs.get('refresh') == '1':
+            report._get_snapshot(refresh=True)
+        # exact=1 recomputes approximate figures without sampling, drill_*
+        # parameters filter every widget
+        try:
+            report, drill = _get_dashboard_state(report, kwargs)
+        except UserError as e:
+            raise BadRequest(str(e))
 
-        context = {
-            'report': report,
-            'group_field_label': group_field_label,
-            'kpi': kpi_data,
-            'detail_data': detail_data,
-            'labels_json': json.dumps(chart_data.get('labels', [])),
-            'counts_json': json.dumps(chart_data.get('count_values', [])),
-            'sums_json': json.dumps(chart_data.get('sum_values', [])),
-            'line_labels_json': json.dumps(chart_data.get('line_labels', [])),
-            'line_values_json': json.dumps(chart_data.get('line_values', [])),
-            # Lost Reason data
-            'lost_reason_data': lost_reason_data,
-            'lost_labels_json': json.dumps(lost_reason_data.get('labels', [])),
-            'lost_counts_json': json.dumps(lost_reason_data.get('counts', [])),
-            'lost_colors_json': json.dumps(lost_reason_data.get('colors', [])),
-            # Pipeline data
-            'pipeline_data': pipeline_data,
-            'pipeline_labels_json': json.dumps(pipeline_data.get('labels', [])),
-            'pipeline_revenues_json': json.dumps(pipeline_data.get('revenues', [])),
-            # Win/Loss trend
-            'trend_data': win_loss_trend,
-            'trend_labels_json': json.dumps(win_loss_trend.get('labels', [])),
-            'trend_won_json': json.dumps(win_loss_trend.get('won_counts', [])),
-            'trend_lost_json': json.dumps(win_loss_trend.get('lost_counts', [])),
-            # Source data
-            'source_data': source_data,
-            'source_labels_json': json.dumps(source_data.get('labels', [])),
-            'source_revenues_json': json.dumps(source_data.get('revenues', [])),
-            # Deal metrics
-            'deal_metrics': deal_metrics,
-            # Customer data
-            'customer_data': customer_data,
-            'customer_labels_json': json.dumps(customer_data.get('labels', [])),
-            'customer_counts_json': json.dumps(customer_data.get('counts', [])),
-            'customer_colors_json': json.dumps(customer_data.get('colors', [])),
-            'json': json,
+        def render(etag):
+            # Get Group By Field Label (default to Stage if not set)
+            group_field_label = report._crm_field_label(report.group_field or 'stage_id')
+
+            # Widgets come from the payload, fetched by the page itself
+            context = {
+                'report': report,
+                'group_field_label': group_field_label,
+                'payload_url': f'/looker_studio/report/{report.id}/payload/{etag or PAYLOAD_LIVE}'
+                               + _dashboard_query(report, drill),
+                # same page without sampling, or recomputing the snapshot,
+                # drill-down kept
+                'exact_url': _dashboard_query(report.with_context(looker_studio_exact=True), drill),
+                'refresh_url': _dashboard_query(report, drill, refresh='1'),
+                'drill_json': json.dumps(report._get_drill_labels(drill)),
+                'drill_fields_json': json.dumps({
+                    name: report._crm_field_label(name)
+                    for name in DRILL_FIELDS if name in request.env['crm.lead']._fields
+                }),
+                # debug mode: timings of the widgets fetched from now on are
+                # shown to administrators
+                'perf_since': request.session.debug and request.env.user.has_group('base.group_system')
+                              and fields.Datetime.to_string(fields.Datetime.now()),
+            }
+            return request.render('CRM_report.report_kpi_template_v3', context)
+
+        return _conditional(report, render, additional=self._payload_validators(report, drill))
+
+    def _payload_validators(self, report, drill):
+        """``additional`` validators of the dashboard page and its payload:
+        the snapshot it is served from, the sampling it is computed with and
+        its drill-down."""
+        return report._get_snapshot_date(), report._get_sample_percent(), repr(drill)
+
+    @http.route('/looker_studio/report/<int:report_id>/payload/<string:version>', type='http', auth='user')
+    def report_payload(self, report_id, version, **kwargs):
+        """Every widget of the dashboard in one columnar payload, see
+        ``payload.py``, gzip-compressed.
+
+        ``version`` is the report page's ETag, so a data change gives the
+        payload a new URL. It is still revalidated on every use, like the
+        page, against the data generation: renaming a stage, lost reason,
+        team, source, customer or salesperson bumps it, but renaming other
+        related records (countries, companies) does not, and their old
+        labels are served until the next lead change.
+        """
+        report = request.env['looker_studio.report'].sudo().browse(report_id)
+        if not report.exists():
+            return request.not_found()
+        try:
+            report, drill = _get_dashboard_state(report, kwargs)
+        except UserError as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+
+        def render(etag):
+            # snapshots hold the unfiltered figures of the report's own mode
+            exact_only = report.approximate and report.env.context['looker_studio_exact']
+            snapshot, as_of = (None, None) if exact_only or drill else report._get_snapshot()
+            widgets = [widget for widget in report._widget_methods if widget not in PAYLOAD_EXCLUDED_WIDGETS]
+            if snapshot:
+                data = {widget: snapshot['widgets'][widget] for widget in widgets}
+            else:
+                data = report.get_widgets_data(widgets, drill or None)
+            payload = encode_payload(data, as_of and fields.Datetime.to_string(as_of))
+            body = json.dumps(payload, separators=(',', ':')).encode()
+            headers = [
+                ('Content-Type', 'application/json; charset=utf-8'),
+                ('Vary', 'Accept-Encoding'),
+            ]
+            if request.httprequest.accept_encodings['gzip']:
+                body = gzip.compress(body)
+                headers.append(('Content-Encoding', 'gzip'))
+            return request.make_response(body, headers=headers)
+
+        return _conditional(report, render, additional=self._payload_validators(report, drill))
+
+    @http.route('/looker_studio/report/<int:report_id>/drill', type='http', auth='user', website=True)
+    def report_drill(self, report_id, **kwargs):
+        """First answer of a drill-down of the dashboard: the widgets
+        available without reading leads (see ``get_sliced_widgets_data``),
+        the ``pending`` ones to fetch from the data route, and the labels of
+        the drill-down ``filters``."""
+        report = request.env['looker_studio.report'].sudo().browse(report_id)
+        if not report.exists():
+            return request.not_found()
+        try:
+            report, drill = _get_dashboard_state(report, kwargs)
+        except UserError as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+        widgets = [widget for widget in report._widget_methods if widget not in PAYLOAD_EXCLUDED_WIDGETS]
+
+        def render(_etag):
+            data = report.get_sliced_widgets_data(widgets, drill or None)
+            return request.make_json_response({
+                'widgets': data,
+                'pending': [widget for widget in widgets if widget not in data],
+                'filters': report._get_drill_labels(drill),
+            })
+
+        return _conditional(report, render, additional=(report._get_sample_percent(), repr(drill)))
+
+    def _get_overview_reports(self, reports):
+        """Existing reports of the comma-separated ids ``reports``, in order."""
+        ids = []
+        for report_id in (reports or '').split(','):
+            if report_id.strip().isdigit() and int(report_id) not in ids:
+                ids.append(int(report_id))
+        return request.env['looker_studio.report'].sudo().browse(ids[:OVERVIEW_MAX_REPORTS]).exists()
+
+    @http.route('/looker_studio/overview', type='http', auth='user', website=True)
+    def render_overview(self, reports='', **kwargs):
+        """Main chart of several reports side by side."""
+        reports = self._get_overview_reports(reports)
+        if not reports:
+            return request.not_found()
+        return request.render('CRM_report.report_overview_template', {
+            'reports': reports,
+            'data_url': '/looker_studio/overview/data?reports=' + ','.join(str(report_id) for report_id in reports.ids),
+        })
+
+    @http.route('/looker_studio/overview/data', type='http', auth='user', website=True)
+    def overview_data(self, reports='', widgets='chart', **kwargs):
+        """``{report id: {widget: data}}`` of the reports, their charts being
+        computed together, see ``get_reports_widgets_data``."""
+        reports = self._get_overview_reports(reports)
+        widgets = [widget for widget in widgets.split(',') if widget]
+        if not reports or not widgets or any(widget not in OVERVIEW_WIDGETS for widget in widgets):
+            return request.not_found()
+        return request.make_json_response(reports.get_reports_widgets_data(widgets))
+
+    @http.route('/looker_studio/report/<int:report_id>/perf_log', type='http', auth='user', website=True)
+    def report_perf_log(self, report_id, since=None, **kwargs):
+        """Performance log entries of the report, for the debug overlay of
+        administrators: debug mode is the user's choice, not an access
+        right."""
+        if not request.env.user.has_group('base.group_system'):
+            return request.not_found()
+        domain = [('report_model', '=', 'looker_studio.report'), ('report_id', '=', report_id)]
+        if since:
+            domain.append(('create_date', '>=', since))
+        entries = request.env['looker_studio.perf_log'].sudo().search_read(
+            domain, ['method', 'duration', 'query_count', 'query_time', 'row_count', 'create_date'], limit=100,
+        )
+        return request.make_json_response(entries)
+
+    @http.route('/looker_studio/report/<int:report_id>/data/<string:widget>', type='http', auth='user', website=True)
+    def report_data(self, report_id, widget, **kwargs):
+        report = request.env['looker_studio.report'].sudo().browse(report_id)
+        if not report.exists() or widget not in report._widget_methods:
+            return request.not_found()
+        try:
+            report, drill = _get_dashboard_state(report, kwargs)
+        except UserError as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+        return _conditional(
+            report, lambda _etag: request.make_json_response(report.get_widget_data(widget, drill or None)),
+            additional=(report._get_sample_percent(), repr(drill)),
+        )
+
+    @http.route('/looker_studio/report/<int:report_id>/data', type='http', auth='user', website=True)
+    def report_data_batch(self, report_id, widgets='', **kwargs):
+        """Several widgets in one round trip, ``widgets`` being comma-separated."""
+        report = request.env['looker_studio.report'].sudo().browse(report_id)
+        widgets = [widget for widget in widgets.split(',') if widget]
+        if not report.exists() or not widgets or any(widget not in report._widget_methods for widget in widgets):
+            return request.not_found()
+        try:
+            report, drill = _get_dashboard_state(report, kwargs)
+        except UserError as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+        return _conditional(
+            report, lambda _etag: request.make_json_response(report.get_widgets_data(widgets, drill or None)),
+            additional=(report._get_sample_percent(), repr(drill)),
+        )
+
+    @http.route('/looker_studio/report/<int:report_id>/detail', type='http', auth='user', website=True)
+    def report_detail_page(self, report_id, cursor=None, sort='create_date', order='desc', page_size=None, **kwargs):
+        """Detail table page: ``cursor`` is the JSON ``next_cursor`` of the
+        previous page, column filters are passed as ``filter_<field>``."""
+        report = request.env['looker_studio.report'].sudo().browse(report_id)
+        if not report.exists():
+            return request.not_found()
+        filters = {
+            name: kwargs[f'filter_{name}'] for name in DETAIL_FILTER_FIELDS if kwargs.get(f'filter_{name}')
         }
-        return request.render('CRM_report.report_kpi_template_v3', context)
+        try:
+            report, drill = _get_dashboard_state(report, kwargs)
+            page_size = min(max(int(page_size or DETAIL_PAGE_SIZE), 1), DETAIL_MAX_PAGE_SIZE)
+            page = report.get_detail_page(
+                additional_domain=drill or None,
+                cursor=json.loads(cursor) if cursor else None,
+                sort=sort, descending=order != 'asc', filters=filters, page_size=page_size,
+            )
+        except (UserError, ValueError, TypeError) as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+        return request.make_json_response(page)
+
+    @http.route('/looker_studio/report/<int:report_id>/export/<string:export_format>', type='http', auth='user')
+    def export_report(self, report_id, export_format, **kwargs):
+        return self._stream_export('looker_studio.report', report_id, export_format)
 
     @http.route('/looker_studio/activity_report/<int:report_id>', type='http', auth='user', website=True)
     def render_activity_report(self, report_id, **kwargs):
         report = request.env['looker_studio.activity_report'].sudo().browse(report_id)
         if not report.exists():
             return request.not_found()
-        
+        return _conditional(report, lambda _etag: self._render_activity_report(report))
+
+    def _render_activity_report(self, report):
         data = report.get_data()
         detail_data = report.get_detail_data()
         
@@ -90,19 +344,84 @@ class LookerReportController(http.Controller):
             'detail_data': detail_data,
             'labels_json': json.dumps(data.get('labels', [])),
             'values_json': json.dumps(data.get('values', [])),
+            'heatmap_json': json.dumps(report.get_workload_heatmap()),
             'json': json,
         }
         return request.render('CRM_report.report_activity_template', context)
 
+    @http.route('/looker_studio/activity_report/<int:report_id>/export/<string:export_format>', type='http', auth='user')
+    def export_activity_report(self, report_id, export_format, **kwargs):
+        return self._stream_export('looker_studio.activity_report', report_id, export_format)
+
+    def _stream_export(self, model_name, report_id, export_format):
+        """Stream small CSV exports; queue XLSX and large ones as background
+        jobs, whose page waits for the file (see ``looker_studio.export_job``)."""
+        report = request.env[model_name].sudo().browse(report_id)
+        if export_format not in EXPORT_MIMETYPES or not report.exists():
+            return request.not_found()
+        max_rows = report._get_export_stream_max_rows()
+        if export_format != 'csv' or report._count_export_rows(max_rows + 1) > max_rows:
+            job = request.env['looker_studio.export_job'].sudo()._enqueue(report, export_format)
+            return request.render('CRM_report.report_export_job_template', {'job': job, 'report': report})
+        headers = report._get_export_headers()
+        registry, uid, context = request.env.registry, request.env.uid, dict(request.env.context)
+
+        def rows():
+            # the request's cursor is closed before the body is sent: read
+            # the rows in a cursor owned by the response
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context, su=True)
+                yield from env[model_name].browse(report_id)._iter_export_rows()
+
+        return request.make_response(_iter_csv(headers, rows()), headers=[
+            ('Content-Type', EXPORT_MIMETYPES[export_format]),
+            ('Content-Disposition', content_disposition(f'{report.name}.{export_format}')),
+        ])
+
+    def _get_export_job(self, job_id):
+        job = request.env['looker_studio.export_job'].sudo().browse(job_id)
+        return job if job.exists() and job.user_id.id == request.env.uid else None
+
+    @http.route('/looker_studio/export/<int:job_id>', type='http', auth='user')
+    def export_job_state(self, job_id, **kwargs):
+        """State of a background export, polled by its waiting page."""
+        job = self._get_export_job(job_id)
+        if not job:
+            return request.not_found()
+        return request.make_json_response({
+            'state': job.state,
+            'row_count': job.row_count,
+            'url': f'/looker_studio/export/{job.id}/download' if job.state == 'done' else None,
+        })
+
+    @http.route('/looker_studio/export/<int:job_id>/download', type='http', auth='user')
+    def export_job_download(self, job_id, **kwargs):
+        job = self._get_export_job(job_id)
+        if not job or job.state != 'done':
+            return request.not_found()
+        stream = request.env['ir.binary']._get_stream_from(
+            job, 'file', filename=job.file_name, mimetype=EXPORT_MIMETYPES[job.export_format])
+        return stream.get_response(as_attachment=True)
+
     @http.route('/looker_studio/sales_performance/<int:report_id>', type='http', auth='user', website=True)
     def render_sales_performance_report(self, report_id, **kwargs):
         report = request.env['looker_studio.sales_performance_report'].sudo().browse(report_id)
         if not report.exists():
             return request.not_found()
-        
-        summary = report.get_summary_data()
-        chart_data = report.get_chart_data()
-        detail_data = report.get_detail_data()
+        if kwargs.get('refresh') == '1':
+            return self._render_sales_performance_report(report, refresh=True)
+        return _conditional(
+            report, lambda _etag: self._render_sales_performance_report(report), additional=(report._get_snapshot_date(),))
+
+    def _render_sales_performance_report(self, report, refresh=False):
+        snapshot, snapshot_as_of = report._get_snapshot(refresh=refresh)
+        if snapshot:
+            summary, detail_data, chart_data = snapshot['summary'], snapshot['detail'], snapshot['chart']
+        else:
+            # All three share one memoized per-salesperson query
+            summary = report.get_summary_data()
+            detail_data = report.get_detail_data()
+            chart_data = report.get_chart_data()
         
         # Time filter display
         time_filter_labels = {
@@ -123,6 +442,7 @@ class LookerReportController(http.Controller):
         
         context = {
             'report': report,
+            'snapshot_as_of': snapshot_as_of,
             'summary': summary,
             'time_filter_display': time_filter_display,
             'salesperson_filter': salesperson_filter,
@@ -1 +1,6 @@
+from . import report_export
+from . import perf_log
+from . import report_snapshot
 from . import report
+from . import lead_daily_fact
+from . import crm
@@ -0,0 +1,117 @@
+from odoo import models, api
+
+from .report import ACTIVITY_GENERATION_SEQUENCE
+
+
+class CrmLead(models.Model):
+    """Keep report caches and daily facts in sync with lead changes."""
+
+    _inherit = 'crm.lead'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        leads = super().create(vals_list)
+        self.env['looker_studio.report']._invalidate_report_cache()
+        return leads
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+    def unlink(self):
+        self.env['looker_studio.lead_daily_fact']._mark_leads_dirty(self)
+        res = super().unlink()
+        self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+
+class CrmStage(models.Model):
+    """Won/lost figures depend on ``is_won``, so stage edits invalidate too."""
+
+    _inherit = 'crm.stage'
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+
+class CrmLostReason(models.Model):
+    """Lost reason names are part of the cached widgets."""
+
+    _inherit = 'crm.lost.reason'
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+
+class CrmTeam(models.Model):
+    """Team names label the cached widgets grouped or drilled by team."""
+
+    _inherit = 'crm.team'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+
+class UtmSource(models.Model):
+    """Source names label the source analysis."""
+
+    _inherit = 'utm.source'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+
+class ResPartner(models.Model):
+    """The customer widget counts partners by grade, and charts grouped by
+    customer show their names."""
+
+    _inherit = 'res.partner'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'grade_id' in vals or 'name' in vals:
+            self.env['looker_studio.report']._invalidate_report_cache()
+        return res
+
+
+class MailActivity(models.Model):
+    """Activity reports revalidate against the activity data generation."""
+
+    _inherit = 'mail.activity'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        activities = super().create(vals_list)
+        self.env['looker_studio.report']._invalidate_report_cache(ACTIVITY_GENERATION_SEQUENCE)
+        return activities
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['looker_studio.report']._invalidate_report_cache(ACTIVITY_GENERATION_SEQUENCE)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['looker_studio.report']._invalidate_report_cache(ACTIVITY_GENERATION_SEQUENCE)
+        return res
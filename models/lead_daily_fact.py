@@ -0,0 +1,122 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+import logging
+from datetime import timedelta
+
+_logger = logging.getLogger(__name__)
+
+# Days whose leads were deleted since the last refresh. Unlinked leads leave
+# no write_date behind, so crm.lead.unlink() records their days here.
+DIRTY_DAYS_TABLE = 'looker_studio_lead_fact_dirty_day'
+
+WATERMARK_PARAM = 'CRM_report.lead_fact_watermark'
+
+# Leads written by transactions still running when the watermark was taken
+# commit with an older write_date; re-scanning this margin picks them up.
+WATERMARK_MARGIN = timedelta(minutes=15)
+
+
+class LookerLeadDailyFact(models.Model):
+    """Daily rollup of crm.lead used by the reports' "fact" data source.
+
+    One row per creation day and combination of dimensions, holding the
+    number of leads and the sums of their numeric fields. Columns keep the
+    crm.lead names (``expected_revenue`` and ``probability`` are sums) so the
+    report SQL runs unchanged on either table, see ``LeadFilter``.
+    """
+
+    _name = 'looker_studio.lead_daily_fact'
+    _description = 'Looker Studio - CRM Lead Daily Fact'
+    _order = 'day desc'
+
+    day = fields.Date(required=True, index=True, readonly=True)
+    stage_id = fields.Many2one('crm.stage', readonly=True)
+    user_id = fields.Many2one('res.users', readonly=True)
+    team_id = fields.Many2one('crm.team', readonly=True)
+    source_id = fields.Many2one('utm.source', readonly=True)
+    lost_reason_id = fields.Many2one('crm.lost.reason', readonly=True)
+    company_id = fields.Many2one('res.company', readonly=True)
+    type = fields.Selection([('lead', 'Lead'), ('opportunity', 'Opportunity')], readonly=True)
+    active = fields.Boolean(readonly=True)
+    lead_count = fields.Integer(readonly=True)
+    expected_revenue = fields.Float(string='Expected Revenue (sum)', readonly=True)
+    probability = fields.Float(string='Probability (sum)', readonly=True)
+
+    def init(self):
+        self.env.cr.execute(SQL(
+            "CREATE TABLE IF NOT EXISTS %s (day date PRIMARY KEY)", SQL.identifier(DIRTY_DAYS_TABLE),
+        ))
+
+    @api.model
+    def _mark_leads_dirty(self, leads):
+        """Remember the creation days of ``leads`` before they are deleted."""
+        if not leads:
+            return
+        self.env.cr.execute(SQL(
+            """INSERT INTO %s (day)
+               SELECT DISTINCT create_date::date FROM crm_lead WHERE id IN %s
+               ON CONFLICT DO NOTHING""",
+            SQL.identifier(DIRTY_DAYS_TABLE), tuple(leads.ids),
+        ))
+
+    def _insert_facts(self, condition):
+        """(Re)build the fact rows of the crm_lead rows matching ``condition``."""
+        self.env.cr.execute(SQL(
+            """INSERT INTO looker_studio_lead_daily_fact
+                      (day, stage_id, user_id, team_id, source_id, lost_reason_id, company_id,
+                       type, active, lead_count, expected_revenue, probability,
+                       create_uid, create_date, write_uid, write_date)
+               SELECT lead.create_date::date, lead.stage_id, lead.user_id, lead.team_id,
+                      lead.source_id, lead.lost_reason_id, lead.company_id,
+                      lead.type, COALESCE(lead.active, FALSE), COUNT(*),
+                      COALESCE(SUM(lead.expected_revenue), 0), COALESCE(SUM(lead.probability), 0),
+                      %(uid)s, %(now)s, %(uid)s, %(now)s
+                 FROM crm_lead lead
+                WHERE %(condition)s
+             GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9""",
+            uid=self.env.uid, now=self.env.cr.now(), condition=condition,
+        ))
+
+    @api.model
+    def _refresh(self, full=False):
+        """Bring the fact table up to date with crm_lead.
+
+        Only the days containing leads written since the last watermark (or
+        deleted since the last run) are rebuilt; ``full`` rebuilds everything.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        self.env['crm.lead'].flush_model()
+        cr = self.env.cr
+        new_watermark = cr.now()
+        watermark = not full and ICP.get_param(WATERMARK_PARAM)
+
+        if not watermark:
+            cr.execute("DELETE FROM looker_studio_lead_daily_fact")
+            self._insert_facts(SQL("lead.create_date IS NOT NULL"))
+            days_count = None
+        else:
+            since = fields.Datetime.to_datetime(watermark) - WATERMARK_MARGIN
+            cr.execute(SQL(
+                """SELECT DISTINCT create_date::date FROM crm_lead WHERE write_date >= %s
+                   UNION
+                   SELECT day FROM %s""",
+                since, SQL.identifier(DIRTY_DAYS_TABLE),
+            ))
+            days = [row[0] for row in cr.fetchall() if row[0]]
+            days_count = len(days)
+            if days:
+                cr.execute(SQL("DELETE FROM looker_studio_lead_daily_fact WHERE day = ANY(%s)", days))
+                self._insert_facts(SQL("lead.create_date::date = ANY(%s)", days))
+        cr.execute(SQL("DELETE FROM %s", SQL.identifier(DIRTY_DAYS_TABLE)))
+        ICP.set_param(WATERMARK_PARAM, fields.Datetime.to_string(new_watermark))
+        self.invalidate_model()
+        # cached widget results may have been computed from the old facts
+        self.env['looker_studio.report']._invalidate_report_cache()
+        if days_count is None:
+            _logger.info('Lead daily facts rebuilt from scratch')
+        else:
+            _logger.info('Lead daily facts refreshed for %s day(s)', days_count)
+
+    @api.model
+    def _cron_refresh(self):
+        self._refresh()
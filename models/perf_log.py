@@ -0,0 +1,136 @@
+from odoo import models, fields, api
+from odoo.http import request
+from odoo.tools import SQL, str2bool
+import contextlib
+import functools
+import logging
+import threading
+import time
+from datetime import timedelta
+
+_logger = logging.getLogger(__name__)
+
+PERF_LOG_PARAM = 'CRM_report.perf_log'
+RETENTION_PARAM = 'CRM_report.perf_log_retention_days'
+DEFAULT_RETENTION_DAYS = 30
+
+# Per-thread flag set while a profiled method runs, so that profiled methods
+# called from another one are accounted to the outer call only.
+_profiling = threading.local()
+
+
+def profiling_enabled(env):
+    """Profile when asked through the context, in debug mode or when the
+    ``CRM_report.perf_log`` system parameter is set."""
+    if env.context.get('looker_studio_profile'):
+        return True
+    if request and request.db == env.cr.dbname and request.session.debug:
+        return True
+    return str2bool(env['ir.config_parameter'].sudo().get_param(PERF_LOG_PARAM, 'False'))
+
+
+def count_rows(result):
+    """Number of rows in a widget result: list length, or the longest list
+    of a dict (1 for a dict of scalars)."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return max((len(value) for value in result.values() if isinstance(value, list)), default=1)
+    return 0
+
+
+class Measure:
+    """Wall time, SQL statements and SQL time of a block, see :func:`measure`."""
+
+    duration = query_count = query_time = 0.0
+
+
+@contextlib.contextmanager
+def measure(env):
+    """Measure the enclosed block when profiling is enabled and no profiled
+    method is already running, yielding a :class:`Measure` filled on exit;
+    yield None otherwise. Profiled methods called within are not logged."""
+    if getattr(_profiling, 'active', False) or not profiling_enabled(env):
+        yield None
+        return
+    # counters maintained by sql_db.Cursor.execute() once they exist
+    thread = threading.current_thread()
+    thread.query_count = getattr(thread, 'query_count', 0)
+    thread.query_time = getattr(thread, 'query_time', 0.0)
+    query_count, query_time = thread.query_count, thread.query_time
+    result = Measure()
+    start = time.perf_counter()
+    _profiling.active = True
+    try:
+        yield result
+    finally:
+        _profiling.active = False
+        result.duration = (time.perf_counter() - start) * 1000
+        result.query_count = thread.query_count - query_count
+        result.query_time = (thread.query_time - query_time) * 1000
+
+
+def profiled(method):
+    """Log wall time, SQL statements and SQL time of a report ``get_*``
+    method to ``looker_studio.perf_log`` when profiling is enabled."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with measure(self.env) as measured:
+            result = method(self, *args, **kwargs)
+        if measured is not None:
+            self.env['looker_studio.perf_log']._record(self, method.__name__, {
+                'duration': measured.duration,
+                'query_count': measured.query_count,
+                'query_time': measured.query_time,
+                'row_count': count_rows(result),
+            })
+        return result
+
+    return wrapper
+
+
+class LookerPerfLog(models.Model):
+    """Timings of report data methods, see :func:`profiled`."""
+
+    _name = 'looker_studio.perf_log'
+    _description = 'Looker Studio - Performance Log'
+    _order = 'create_date desc, id desc'
+
+    report_model = fields.Char(required=True, readonly=True, index=True)
+    report_id = fields.Integer(readonly=True, index=True)
+    method = fields.Char(required=True, readonly=True)
+    user_id = fields.Many2one('res.users', readonly=True)
+    duration = fields.Float(string='Wall Time (ms)', digits=(16, 1), readonly=True, aggregator='avg')
+    query_count = fields.Integer(string='SQL Queries', readonly=True, aggregator='avg')
+    query_time = fields.Float(string='SQL Time (ms)', digits=(16, 1), readonly=True, aggregator='avg')
+    row_count = fields.Integer(string='Rows', readonly=True, help='Rows in the returned data', aggregator='avg')
+    shared_count = fields.Integer(
+        string='Shared Scan', readonly=True, aggregator='avg',
+        help='Widgets computed by the same scans as this one: their time is split between them, '
+             'the SQL queries are those of the whole scan.')
+
+    @api.model
+    def _record(self, report, method, values):
+        """Store one entry in its own transaction: the caller's may be read
+        only, or rolled back."""
+        values = dict(values, **{
+            'report_model': report._name,
+            'report_id': report.id if len(report) == 1 else False,
+            'method': method,
+            'user_id': self.env.uid,
+        })
+        try:
+            with self.pool.cursor() as cr:
+                self.env(cr=cr, su=True)[self._name].create(values)
+        except Exception:
+            _logger.warning('Could not store the performance log of %s.%s', report._name, method, exc_info=True)
+
+    @api.autovacuum
+    def _gc_perf_log(self):
+        days = int(self.env['ir.config_parameter'].sudo().get_param(RETENTION_PARAM, DEFAULT_RETENTION_DAYS))
+        self.env.cr.execute(SQL(
+            "DELETE FROM looker_studio_perf_log WHERE create_date < %s",
+            fields.Datetime.now() - timedelta(days=days),
+        ))
+        _logger.info('Removed %s performance log entries older than %s days', self.env.cr.rowcount, days)
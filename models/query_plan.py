@@ -0,0 +1,71 @@
+import contextlib
+
+from odoo.tools import SQL, create_index
+
+# Indexes backing the report filters: ``(name, table, expressions, where)``.
+# Every report query bounds create_date, the lead ones often narrow on type
+# and active through the report domain, and the sales report on user_id.
+# The stage join is on crm_stage, which is small enough not to matter.
+REPORT_INDEXES = (
+    ('crm_lead_looker_create_date_index', 'crm_lead', ['create_date', 'id'], ''),
+    ('crm_lead_looker_type_active_create_date_index', 'crm_lead', ['type', 'active', 'create_date'], ''),
+    ('crm_lead_looker_user_create_date_index', 'crm_lead', ['user_id', 'create_date'], "type = 'opportunity'"),
+    ('mail_activity_looker_create_date_index', 'mail_activity', ['create_date'], ''),
+)
+
+
+def create_report_indexes(cr, table):
+    """Create the missing ``REPORT_INDEXES`` of ``table``."""
+    for name, index_table, expressions, where in REPORT_INDEXES:
+        if index_table == table:
+            create_index(cr, name, table, expressions, where=where)
+
+
+@contextlib.contextmanager
+def capture_queries(cr):
+    """Record the ``(query, params)`` of every statement run on ``cr``."""
+    queries = []
+    execute = cr.execute
+
+    def recording_execute(query, params=None, *args, **kwargs):
+        queries.append((query, params))
+        return execute(query, params, *args, **kwargs)
+
+    cr.execute = recording_execute
+    try:
+        yield queries
+    finally:
+        del cr.execute
+
+
+def _query_code(query):
+    return query.code if isinstance(query, SQL) else query
+
+
+def window_statements(queries, table):
+    """The ``(query, params)`` of ``queries`` that are SELECTs reading
+    ``table`` within a report's time window (bounding its create_date)."""
+    bound = f'"{table}"."create_date" >='
+    return [
+        (query, params) for query, params in queries
+        if _query_code(query).lstrip().upper().startswith(('SELECT', 'WITH')) and bound in _query_code(query)
+    ]
+
+
+def explain(cr, query, params=None):
+    """JSON plan of ``query``, an SQL object or a string with ``params``."""
+    if isinstance(query, SQL):
+        cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query))
+    else:
+        cr.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    return cr.fetchone()[0][0]['Plan']
+
+
+def plan_indexes(plan):
+    """Names of the indexes read by ``plan`` and its sub-plans."""
+    found = set()
+    if plan.get('Index Name'):
+        found.add(plan['Index Name'])
+    for child in plan.get('Plans', ()):
+        found |= plan_indexes(child)
+    return found
@@ -1,13 +1,714 @@
 from odoo import models, fields, api
 from odoo.tools.safe_eval import safe_eval
 from odoo.exceptions import UserError
+from odoo.tools import SQL, config, frozendict, ormcache
+from odoo.tools.misc import get_lang, babel_locale_parse
+from babel.dates import format_date, get_day_names
+from .report_cache import report_cache, DEFAULT_CACHE_SIZE
+from .perf_log import profiled, profiling_enabled, measure, count_rows
+from .query_plan import create_report_indexes
 import logging
+import math
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytz
 
 _logger = logging.getLogger(__name__)
 
+# Alias under which crm_stage is joined to the compiled lead filter.
+STAGE_ALIAS = 'looker_stage'
+
+# crm.lead fields that also exist on looker_studio.lead_daily_fact (create_date
+# maps to the fact's day); a widget touching only these can be answered from it.
+FACT_DIMENSIONS = ('stage_id', 'user_id', 'team_id', 'source_id', 'lost_reason_id', 'company_id', 'type', 'active')
+FACT_FIELDS = FACT_DIMENSIONS + ('expected_revenue', 'probability', 'create_date')
+
+# Babel patterns used for period labels, same as read_group's.
+PERIOD_FORMATS = {
+    'day': 'dd MMM yyyy',
+    'week': "'W'w YYYY",
+    'month': 'MMMM yyyy',
+    'quarter': 'QQQ yyyy',
+    'year': 'yyyy',
+}
+
+# Bucket widths of the time-series granularities.
+PERIOD_DELTAS = {
+    'day': relativedelta(days=1),
+    'week': relativedelta(weeks=1),
+    'month': relativedelta(months=1),
+    'quarter': relativedelta(months=3),
+}
+
+# Detail table paging: columns it can be sorted and filtered by, page sizes.
+DETAIL_SORT_FIELDS = ('create_date', 'name', 'expected_revenue', 'probability')
+DETAIL_FILTER_FIELDS = ('name', 'partner_id', 'user_id', 'stage_id', 'lost_reason_id')
+DETAIL_PAGE_SIZE = 50
+DETAIL_MAX_PAGE_SIZE = 500
+
+# Fields the dashboard can be drilled down by, passed in its URL as
+# drill_<field>=<id>, ``none`` selecting the records without value.
+DRILL_FIELDS = ('stage_id', 'user_id', 'team_id', 'source_id', 'lost_reason_id', 'partner_id', 'company_id', 'country_id')
+DRILL_NONE = 'none'
+
+# Postgres sequence used as a cross-worker "crm.lead data generation" stamp:
+# nextval() is not transactional, so every worker sees a bump immediately.
+REPORT_CACHE_SEQUENCE = 'looker_studio_report_cache_seq'
+# Same for the mail.activity data of the activity reports.
+ACTIVITY_GENERATION_SEQUENCE = 'looker_studio_activity_generation_seq'
+# One row per generation bump, inserted by the bumping transaction: unlike
+# the sequence, it is only visible to the snapshots taken after the bump.
+GENERATION_BUMP_TABLE = 'looker_studio_generation_bump'
+
+# Parallel widgets: threads per request, each holding a database connection
+# of the process's pool (``db_maxconn``) besides the request's own.
+DEFAULT_PARALLEL_WORKERS = 4
+
+# Approximate mode: default share of the crm_lead pages read, estimated table
+# size under which reports stay exact, and normal quantile of the error bounds.
+DEFAULT_SAMPLE_PERCENT = 1.0
+APPROXIMATE_MIN_ROWS = 1000000
+ERROR_BOUND_Z = 1.96  # 95%
+
+
+class LeadFilter(namedtuple('LeadFilter', [
+    'domain', 'date_from', 'date_to', 'alias', 'from_clause', 'where_clause', 'active_test', 'fact', 'previous',
+    'sample',
+])):
+    """A report's crm.lead filter resolved for the current request.
+
+    ``domain`` is the full ORM domain (custom + time window + additional) and
+    ``from_clause``/``where_clause`` the same filter compiled once to SQL over
+    the ``alias`` table. That table is either ``crm_lead`` itself or, when
+    ``fact`` is set, ``looker_studio_lead_daily_fact``, whose rows are
+    pre-aggregated: the helpers below hide the difference so that widget SQL
+    is written once for both sources.
+
+    A comparison filter has ``previous`` set to the ``(start, end)`` of the
+    period before ``date_from``-``date_to``: it then spans both periods and
+    ``in_period()`` tells them apart.
+
+    A sampled filter has ``sample`` set to the percentage of the table's
+    pages it reads (``TABLESAMPLE SYSTEM``): counts and sums are then scaled
+    up to estimates of the whole, and ``count_error()``/``aggregate_error()``
+    give their error bounds.
+    """
+
+    __slots__ = ()
+
+    def column(self, name):
+        if self.fact and name == 'create_date':
+            name = 'day'
+        return SQL.identifier(self.alias, name)
+
+    def in_period(self, previous=False):
+        """Condition selecting the report's period, or the previous one, out
+        of a comparison filter; always true on other filters."""
+        if not self.previous:
+            return SQL("TRUE")
+        start, end = self.previous if previous else (self.date_from, self.date_to)
+        column = self.column('create_date')
+        return SQL("%s >= %s AND %s < %s", column, start, column, end + timedelta(days=1))
+
+    def is_active(self):
+        """Condition replacing the implicit ``active`` test of ORM searches."""
+        if not self.active_test:
+            return SQL("TRUE")
+        return SQL("%s IS TRUE", self.column('active'))
+
+    def count(self, condition=None):
+        if self.fact:
+            return self.aggregate('lead_count', 'sum', condition)
+        if self.sample:
+            return SQL("ROUND(%s * %s)::bigint", self._sample_count(condition), 100.0 / self.sample)
+        return self._sample_count(condition)
+
+    def _sample_count(self, condition=None):
+        if condition is None:
+            return SQL("COUNT(*)")
+        return SQL("COUNT(*) FILTER (WHERE %s)", condition)
+
+    def aggregate(self, name, operator='sum', condition=None):
+        """Aggregate of field ``name`` (``sum``, ``avg``, ``min`` or ``max``)
+        over the rows matching ``condition``, 0 when there are none."""
+        if self.fact and operator == 'avg':
+            # facts hold sums: weight them back by the number of leads
+            return SQL(
+                "COALESCE(%s / NULLIF(%s, 0), 0)",
+                self.aggregate(name, 'sum', condition), self.count(condition),
+            )
+        function = {'sum': SQL("SUM"), 'avg': SQL("AVG"), 'min': SQL("MIN"), 'max': SQL("MAX")}[operator]
+        expression = SQL("%s(%s)", function, self.column(name))
+        if condition is not None:
+            expression = SQL("%s FILTER (WHERE %s)", expression, condition)
+        if self.sample and operator == 'sum':
+            return SQL("COALESCE(%s, 0) * %s", expression, 100.0 / self.sample)
+        # averages are estimated as they are; sampled extrema are not corrected
+        return SQL("COALESCE(%s, 0)", expression)
+
+    # Error bounds of the estimates of a sampled filter, at ERROR_BOUND_Z
+    # standard errors. Rows are treated as drawn independently with the
+    # sampling probability, which understates the error when the leads of a
+    # page are alike (e.g. created the same day) since whole pages are read.
+    def count_error(self, condition=None):
+        fraction = self.sample / 100.0
+        return SQL(
+            "%s * SQRT(%s * %s) / %s",
+            ERROR_BOUND_Z, self._sample_count(condition), 1 - fraction, fraction,
+        )
+
+    def aggregate_error(self, name, operator='sum', condition=None):
+        """Error bound of ``aggregate(name, operator, condition)``; NULL for
+        extrema, and for averages of fewer than two rows."""
+        if operator == 'avg':
+            return self._mean_error(name, condition)
+        if operator != 'sum':
+            return SQL("NULL")
+        fraction = self.sample / 100.0
+        squares = SQL("SUM(%s * %s)", self.column(name), self.column(name))
+        if condition is not None:
+            squares = SQL("%s FILTER (WHERE %s)", squares, condition)
+        return SQL(
+            "%s * SQRT(COALESCE(%s, 0) * %s) / %s",
+            ERROR_BOUND_Z, squares, 1 - fraction, fraction,
+        )
+
+    def _mean_error(self, name, condition=None):
+        """Standard error bound of the sample mean of field ``name``."""
+        fraction = self.sample / 100.0
+        deviation = SQL("STDDEV_SAMP(%s)", self.column(name))
+        sampled = SQL("COUNT(%s)", self.column(name))
+        if condition is not None:
+            deviation = SQL("%s FILTER (WHERE %s)", deviation, condition)
+            sampled = SQL("%s FILTER (WHERE %s)", sampled, condition)
+        return SQL(
+            "%s * %s * SQRT(%s / NULLIF(%s, 0))",
+            ERROR_BOUND_Z, deviation, 1 - fraction, sampled,
+        )
+
+    # Conditions mirroring the domains the widgets used to search with. Like
+    # an ORM search, lead/opportunity conditions skip archived records; the
+    # won condition needs crm_stage joined under STAGE_ALIAS.
+    def is_lead(self):
+        return SQL("%s = 'lead' AND %s", self.column('type'), self.is_active())
+
+    def is_opportunity(self, include_archived=False):
+        if include_archived:
+            return SQL("%s = 'opportunity'", self.column('type'))
+        return SQL("%s = 'opportunity' AND %s", self.column('type'), self.is_active())
+
+    def is_lost(self):
+        return SQL("%s = 'opportunity' AND %s IS NOT TRUE", self.column('type'), self.column('active'))
+
+    def is_won(self):
+        return SQL("%s AND %s IS TRUE", self.is_opportunity(), SQL.identifier(STAGE_ALIAS, 'is_won'))
+
+
+# One grouping of ``LookerLeadReportMixin._group_leads_sets``: the rows of
+# ``lead_filter`` matching ``condition`` (an SQL condition or None), grouped by
+# the SQL expression ``groupby``, with ``aggregates`` ``(field, operator)``.
+# ``groupby`` may also be a tuple of SQL expressions, the row keys then being
+# tuples of their values.
+LeadGrouping = namedtuple('LeadGrouping', ['lead_filter', 'groupby', 'condition', 'aggregates'])
+
+
+class LeadGroup(tuple):
+    """A ``(key, count, *values)`` row of ``_group_leads_sets``. On sampled
+    filters, ``errors`` holds the error bounds of ``(count, *values)``."""
+
+    errors = None
+
+
+def create_generation(cr, sequence):
+    """Create the data generation ``sequence`` and log its current value as
+    visible to every transaction, see ``GENERATION_BUMP_TABLE``."""
+    cr.execute(SQL("CREATE SEQUENCE IF NOT EXISTS %s", SQL.identifier(sequence)))
+    cr.execute(SQL(
+        "CREATE TABLE IF NOT EXISTS %s (sequence varchar NOT NULL, generation bigint NOT NULL, "
+        "PRIMARY KEY (sequence, generation))",
+        SQL.identifier(GENERATION_BUMP_TABLE),
+    ))
+    cr.execute(SQL(
+        "INSERT INTO %s (sequence, generation) SELECT %s, last_value FROM %s ON CONFLICT DO NOTHING",
+        SQL.identifier(GENERATION_BUMP_TABLE), sequence, SQL.identifier(sequence),
+    ))
+
+
+def bump_generation(cr, sequence):
+    """Bump the data generation ``sequence`` and log the bump; both take
+    effect for readers once ``cr`` commits, see ``_can_cache_results``."""
+    cr.execute(SQL(
+        "INSERT INTO %s (sequence, generation) VALUES (%s, nextval(%s))",
+        SQL.identifier(GENERATION_BUMP_TABLE), sequence, sequence,
+    ))
+
+
+def _sql_key(sql):
+    """Hashable identity of an SQL object."""
+    return sql.code, repr(sql.params)
+
+
+def _groupby_key(groupby):
+    """Hashable identity of the ``groupby`` of a ``LeadGrouping``."""
+    if isinstance(groupby, tuple):
+        return tuple(_sql_key(expression) for expression in groupby)
+    return _sql_key(groupby)
+
+
+def _group_sort_key(key):
+    """Sort key of group keys: NULL groups last, per column of tuple keys."""
+    if isinstance(key, tuple):
+        return tuple((value is None, value) for value in key)
+    return key is None, key
+
+
+class LookerLeadReportMixin(models.AbstractModel):
+    """Shared crm.lead filtering and aggregation for report models.
+
+    Implementers provide ``domain``, ``time_filter``, ``date_from`` and
+    ``date_to`` fields.
+    """
+
+    _name = 'looker_studio.lead.mixin'
+    _description = 'Looker Studio - CRM lead report helpers'
+
+    data_source = fields.Selection([
+        ('live', 'Dữ liệu trực tiếp'),
+        ('fact', 'Bảng tổng hợp theo ngày'),
+    ], string='Data Source', default='live', required=True,
+        help='Bảng tổng hợp theo ngày chỉ được dùng khi báo cáo không có Domain tùy chỉnh.')
+
+    def _eval_domain(self):
+        if not self.domain:
+            return []
+        try:
+            return safe_eval(self.domain)
+        except Exception:
+            return []
+
+    def _get_time_window(self):
+        """Return the ``(start, end)`` dates selected by ``time_filter``."""
+        today = fields.Date.context_today(self)
+        if isinstance(today, str):
+            today = datetime.strptime(today, '%Y-%m-%d').date()
+        
+        start_date = None
+        end_date = today
+        
+        if self.time_filter == 'last_3_months':
+            start_date = today - relativedelta(months=3)
+        elif self.time_filter == 'last_6_months':
+            start_date = today - relativedelta(months=6)
+        elif self.time_filter == 'this_year':
+            start_date = today.replace(month=1, day=1)
+            end_date = today.replace(month=12, day=31)
+        elif self.time_filter == 'custom':
+            start_date = self.date_from
+            end_date = self.date_to
+        return start_date, end_date
+
+    def _get_previous_window(self):
+        """Return the ``(start, end)`` of the period of the same length just
+        before the time window, or ``(None, None)`` without a window.
+
+        The window only has data up to today (``this_year`` runs to Dec 31):
+        its length is counted up to today, so that both periods compare the
+        same elapsed time.
+        """
+        start_date, end_date = self._get_time_window()
+        if not (start_date and end_date):
+            return None, None
+        end_date = max(start_date, min(end_date, fields.Date.context_today(self)))
+        previous_end = start_date - timedelta(days=1)
+        return previous_end - (end_date - start_date), previous_end
+
+    def _get_request_memo(self, name):
+        """Dict living as long as the cursor, to share results between the
+        widgets of one request."""
+        return self.env.cr.cache.setdefault(f'looker_studio.{name}', {})
+
+    def _get_request_key(self, additional_domain=None):
+        """Memo key identifying this report's data for the current request."""
+        return (
+            self._name, self.id, self.write_date, repr(additional_domain or []),
+            fields.Date.context_today(self), self.env.uid, self.env.su, self.env.company.id,
+        )
+
+    @api.model
+    @ormcache('model_name', 'self.env.lang')
+    def _get_field_metadata(self, model_name):
+        """``{field name: {'string': label, 'type': type}}`` for the fields of
+        ``model_name``, labels in the user's language.
+
+        Built from the registry rather than ``ir.model.fields``, and cached
+        until the registry is reloaded (module install or upgrade), so looking
+        labels up costs no query.
+        """
+        return frozendict({
+            name: frozendict({'string': field._description_string(self.env) or name, 'type': field.type})
+            for name, field in self.env[model_name]._fields.items()
+        })
+
+    def _get_source_stamp(self):
+        """Values that change whenever the data shown by the report does:
+        the crm.lead data generation, bumped by every write to leads, the
+        stages, lost reasons and customers they are shown with, and every
+        refresh of the daily facts. The partner grade model comes from an
+        optional module this one cannot extend, so its labels are covered by
+        the latest ``write_date`` of that small table instead."""
+        stamp = (self.env['looker_studio.report']._get_cache_generation(),)
+        grade_field = self.env['res.partner']._fields.get('grade_id')
+        if grade_field:
+            self.env.cr.execute(SQL(
+                "SELECT MAX(write_date) FROM %s", SQL.identifier(self.env[grade_field.comodel_name]._table),
+            ))
+            stamp += (self.env.cr.fetchone()[0],)
+        return stamp
+
+    def _can_use_fact_table(self, additional_domain=None, fact_fields=None):
+        """Whether a widget reading ``fact_fields`` can be answered from the
+        daily fact table instead of crm_lead."""
+        if fact_fields is None or self.data_source != 'fact':
+            return False
+        if self.domain and self._eval_domain():
+            return False
+        for leaf in additional_domain or []:
+            if not (isinstance(leaf, (list, tuple)) and len(leaf) == 3
+                    and leaf[0] in FACT_DIMENSIONS and leaf[1] in ('=', '!=', 'in', 'not in')):
+                return False
+        return all(name in FACT_FIELDS for name in fact_fields)
+
+    def _get_lead_filter(self, additional_domain=None, fact_fields=None, compare=False, sample=False):
+        """Return the report's resolved crm.lead filter for this request.
+
+        The domain is evaluated, the time window resolved and the whole thing
+        compiled to SQL once per report and ``additional_domain`` for the
+        lifetime of the cursor; every widget then reuses the same
+        :class:`LeadFilter`. The compiled query ignores the implicit active
+        test so that SQL widgets can count archived (lost) opportunities in
+        the same statement; record rules are applied by ``_search``.
+
+        Widgets that only read ``fact_fields`` get a filter over the daily
+        fact table when the report's data source allows it. With ``compare``
+        the filter also covers the previous period, see ``LeadFilter``.
+        Widgets accepting estimates pass ``sample``: the filter then reads a
+        sample of crm_lead when ``_get_sample_percent()`` asks for one.
+        """
+        self.ensure_one()
+        use_fact = self._can_use_fact_table(additional_domain, fact_fields)
+        sample = sample and not use_fact and self._get_sample_percent() or None
+        memo = self._get_request_memo('lead_filter')
+        key = self._get_request_key(additional_domain) + (use_fact, compare, sample)
+        if key not in memo:
+            date_from, date_to = self._get_time_window()
+            previous = compare and date_from and date_to and self._get_previous_window()
+            scan_from = previous[0] if previous else date_from
+            domain = [] if use_fact else self._eval_domain()
+            # windows include their last day whole, on crm_lead as on the
+            # daily facts
+            scan_to = date_to and date_to + timedelta(days=1)
+            if date_from and date_to:
+                domain = domain + [('create_date', '>=', scan_from), ('create_date', '<', scan_to)]
+            if additional_domain:
+                domain = domain + list(additional_domain)
+            active_test = not any(
+                isinstance(leaf, (list, tuple)) and leaf[0] == 'active' for leaf in domain
+            )
+            if use_fact:
+                Source = self.env['looker_studio.lead_daily_fact'].with_context(active_test=False)
+                source_domain = [('day', '>=', scan_from), ('day', '<', scan_to)] if date_from and date_to else []
+                source_domain += list(additional_domain or [])
+            else:
+                Source = self.env['crm.lead'].with_context(active_test=False)
+                source_domain = domain
+            Source.flush_model()
+            self.env['crm.stage'].flush_model(['is_won'])
+            query = Source._search(source_domain)
+            from_clause = sample and self._sample_from_clause(query.from_clause, query.table, sample)
+            memo[key] = LeadFilter(
+                domain, date_from, date_to, query.table, from_clause or query.from_clause, query.where_clause,
+                active_test, use_fact, previous or None, sample if from_clause else None,
+            )
+        return memo[key]
+
+    def _get_sample_percent(self):
+        """Percentage of the crm_lead pages sampled by the widgets that
+        accept estimates, or None for exact figures."""
+        return None
+
+    def _sample_from_clause(self, from_clause, table, percent):
+        """``from_clause`` of an ORM query on ``table`` reading ``percent``
+        % of its pages, or None when it does not start with the table.
+
+        The sample is repeatable, so that refreshing a page or scanning the
+        same filter twice gives the same estimates.
+        """
+        head = SQL.identifier(table)
+        if not from_clause.code.startswith(head.code):
+            return None
+        return SQL(
+            "%s TABLESAMPLE SYSTEM (%s) REPEATABLE (0)" + from_clause.code[len(head.code):],
+            head, percent, *from_clause.params,
+        )
+
+    def _lead_from(self, lead_filter, stage=False):
+        """FROM clause of ``lead_filter``, optionally joined to the lead's
+        stage under the ``STAGE_ALIAS`` alias."""
+        if not stage:
+            return lead_filter.from_clause
+        return SQL(
+            "%s LEFT JOIN crm_stage AS %s ON %s = %s",
+            lead_filter.from_clause,
+            SQL.identifier(STAGE_ALIAS),
+            SQL.identifier(STAGE_ALIAS, 'id'),
+            SQL.identifier(lead_filter.alias, 'stage_id'),
+        )
+
+    def _group_leads_sets(self, groupings):
+        """Evaluate many groupings of lead rows in as few scans as possible.
+
+        ``groupings`` maps names to :class:`LeadGrouping`. Groupings whose
+        filters read the same table share one ``GROUPING SETS`` query: its
+        WHERE is the union of their filters, and each grouping's aggregates
+        are restricted to its own filter and condition with FILTER, so
+        reports differing only in their domain, grouping or value field are
+        answered by one scan. Identical grouping expressions share one
+        grouping set. Returns ``{name: rows}``, rows being ``(key, count,
+        *values)`` tuples ordered by key, empty groups left out.
+        """
+        scans = defaultdict(dict)
+        for name, grouping in groupings.items():
+            lead_filter = grouping.lead_filter
+            scans[(lead_filter.alias, lead_filter.fact) + _sql_key(lead_filter.from_clause)][name] = grouping
+        results = {}
+        for scan in scans.values():
+            results.update(self._group_leads_scan(scan))
+        return results
+
+    def _group_leads_scan(self, groupings):
+        """One query of ``_group_leads_sets``, over groupings of one table."""
+        wheres, expressions = {}, {}
+        for grouping in groupings.values():
+            wheres.setdefault(_sql_key(grouping.lead_filter.where_clause), grouping.lead_filter.where_clause)
+            expressions.setdefault(_groupby_key(grouping.groupby), grouping.groupby)
+        positions = {key: index for index, key in enumerate(expressions)}
+        columns = [
+            groupby if isinstance(groupby, tuple) else (groupby,) for groupby in expressions.values()
+        ]
+
+        # GROUPING() flags, then the grouping keys, then every grouping's
+        # aggregates and, when sampled, their error bounds; layout maps
+        # groupings to (grouping set, first aggregate, first bound, last)
+        select = [SQL("GROUPING(%s)", SQL(", ").join(set_columns)) for set_columns in columns]
+        starts = []
+        for set_columns in columns:
+            starts.append(len(select))
+            select += set_columns
+        layout = {}
+        for name, grouping in groupings.items():
+            lead_filter, condition = grouping.lead_filter, grouping.condition
+            if len(wheres) > 1:
+                where = lead_filter.where_clause
+                condition = where if condition is None else SQL("(%s) AND (%s)", where, condition)
+            aggregates = [lead_filter.count(condition)]
+            aggregates += [lead_filter.aggregate(field, operator, condition) for field, operator in grouping.aggregates]
+            errors = []
+            if lead_filter.sample:
+                errors = [lead_filter.count_error(condition)]
+                errors += [
+                    lead_filter.aggregate_error(field, operator, condition) for field, operator in grouping.aggregates
+                ]
+            start = len(select)
+            layout[name] = (
+                positions[_groupby_key(grouping.groupby)], start, start + len(aggregates),
+                start + len(aggregates) + len(errors),
+            )
+            select += aggregates + errors
+
+        self.env.cr.execute(SQL(
+            "SELECT %s FROM %s WHERE %s GROUP BY GROUPING SETS (%s)",
+            SQL(", ").join(select),
+            self._lead_from(next(iter(groupings.values())).lead_filter, stage=True),
+            SQL(" OR ").join(SQL("(%s)", where) for where in wheres.values()),
+            SQL(", ").join(SQL("(%s)", SQL(", ").join(set_columns)) for set_columns in columns),
+        ))
+        size = len(expressions)
+        composite = [isinstance(groupby, tuple) for groupby in expressions.values()]
+        results = {name: [] for name in groupings}
+        for row in self.env.cr.fetchall():
+            # GROUPING() is 0 for the row's grouping set, and for the sets
+            # made of part of its columns: the row's is the widest of them
+            position = max(
+                (index for index in range(size) if not row[index]), key=lambda index: len(columns[index]),
+            )
+            start = starts[position]
+            key = tuple(row[start:start + len(columns[position])]) if composite[position] else row[start]
+            for name, (grouping_set, start, bounds, stop) in layout.items():
+                if grouping_set == position and row[start]:
+                    group = LeadGroup((key,) + row[start:bounds])
+                    if stop > bounds:
+                        group.errors = row[bounds:stop]
+                    results[name].append(group)
+        for rows in results.values():
+            rows.sort(key=lambda row: _group_sort_key(row[0]))
+        return results
+
+    def _fetch_compared(self, lead_filter, select, errors=None):
+        """Evaluate aggregates over the current and the previous period of
+        comparison filter ``lead_filter`` in one scan.
+
+        ``select(period)`` returns the list of SQL aggregates to compute,
+        restricted to the SQL condition ``period``. On a sampled filter,
+        ``errors(period)`` returns error bounds to compute along, see
+        ``LeadFilter.count_error``. Returns the current and previous values,
+        the latter None when there is no previous period, and the current
+        bounds, None when the filter is exact.
+        """
+        current = select(lead_filter.in_period())
+        previous = select(lead_filter.in_period(previous=True)) if lead_filter.previous else []
+        bounds = errors(lead_filter.in_period()) if errors and lead_filter.sample else []
+        self.env.cr.execute(SQL(
+            "SELECT %s FROM %s WHERE %s",
+            SQL(", ").join(current + previous + bounds), self._lead_from(lead_filter, stage=True),
+            lead_filter.where_clause,
+        ))
+        row = self.env.cr.fetchone()
+        size = len(current) + len(previous)
+        return (
+            row[:len(current)], (row[len(current):size] if previous else None), (row[size:] if bounds else None),
+        )
+
+    def _compare_values(self, current, previous, lead_filter):
+        """Add the previous period's values of the ``current`` KPI dict, and
+        their changes, to it."""
+        if previous is None:
+            current.update(previous=None, delta=None, change_pct=None, previous_period=None)
+            return current
+        current.update(
+            previous=previous,
+            delta={key: round(value - previous[key], 2) for key, value in current.items()},
+            change_pct={
+                key: round((value - previous[key]) / abs(previous[key]) * 100, 1) if previous[key] else None
+                for key, value in current.items()
+            },
+            previous_period=[fields.Date.to_string(day) for day in lead_filter.previous],
+        )
+        return current
+
+    def _get_approximation(self, lead_filter, errors):
+        """``approximate`` entry of a widget result estimated from sampled
+        ``lead_filter``: the sample percentage and ``errors``, the error
+        bounds of the result's figures by key, shaped as the figures."""
+        return {'sample_percent': lead_filter.sample, 'errors': errors}
+
+    def _group_errors(self, groups, index):
+        """Error bounds of value ``index`` (0 for the count) of the
+        :class:`LeadGroup` ``groups``."""
+        return [group.errors[index] if group.errors else None for group in groups]
+
+    def _rate_error(self, lead_filter, rate, total):
+        """Error bound, in percentage points, of percentage ``rate`` of the
+        ``total`` rows estimated from sampled ``lead_filter``: binomial,
+        over the rows of ``total`` actually sampled."""
+        fraction = lead_filter.sample / 100.0
+        sampled = total * fraction
+        if not sampled:
+            return None
+        share = rate / 100.0
+        return round(ERROR_BOUND_Z * math.sqrt(share * (1 - share) * (1 - fraction) / sampled) * 100, 2)
+
+    def _total_error(self, errors):
+        """Error bound of the total of figures over disjoint groups of rows,
+        ``errors`` being theirs: their variances add up."""
+        return math.sqrt(sum(error ** 2 for error in errors if error))
+
+    def _get_group_labels(self, field_name, keys, empty_label):
+        """Return ``[(key, label)]`` for group ``keys`` of crm.lead field
+        ``field_name``, in the order read_group would list them."""
+        field = self.env['crm.lead']._fields[field_name]
+        present = [key for key in keys if key not in (None, False)]
+        if field.type == 'many2one':
+            records = self.env[field.comodel_name].with_context(active_test=False).search([('id', 'in', present)])
+            labels = [(rec.id, rec.display_name) for rec in records]
+        elif field.type == 'selection':
+            selection = field._description_selection(self.env)
+            labels = [(value, label) for value, label in selection if value in present]
+        else:
+            labels = [(key, str(key)) for key in sorted(present)]
+        if len(present) < len(keys):
+            labels.append((None, empty_label))
+        return labels
+
+    def _get_value_aggregator(self, field_name):
+        """Aggregate function read_group applies to crm.lead ``field_name``."""
+        field = self.env['crm.lead']._fields[field_name]
+        operator = getattr(field, 'aggregator', None) or getattr(field, 'group_operator', None)
+        return operator if operator in ('sum', 'avg', 'min', 'max') else 'sum'
+
+    def _format_period(self, value, granularity):
+        """Label of the ``granularity`` bucket starting at ``value``."""
+        locale = babel_locale_parse(get_lang(self.env).code)
+        return format_date(value, PERIOD_FORMATS[granularity], locale=locale)
+
+    def _format_period_key(self, value, granularity):
+        """ISO key of the ``granularity`` bucket starting at ``value``:
+        ``2025-01-31``, ``2025-W05``, ``2025-01`` or ``2025-Q1``."""
+        if granularity == 'week':
+            year, week, _weekday = value.isocalendar()
+            return f'{year}-W{week:02d}'
+        if granularity == 'quarter':
+            return f'{value.year}-Q{(value.month - 1) // 3 + 1}'
+        return value.strftime('%Y-%m' if granularity == 'month' else '%Y-%m-%d')
+
+    def _period_bucket(self, lead_filter, granularity):
+        """SQL start of the ``granularity`` bucket of a row's creation date."""
+        return SQL("date_trunc(%s, %s::timestamp)", granularity, lead_filter.column('create_date'))
+
+    def _fill_time_series(self, lead_filter, granularity, rows, names):
+        """Gap-filled time series from ``(bucket, *values)`` rows grouped by
+        ``_period_bucket``, ``names`` naming the values.
+
+        Buckets span the report's time window up to today, or the data when
+        there is no window; empty ones are 0. Returns ``{'keys': [...],
+        'labels': [...], name: [...]}`` in chronological order.
+        """
+        values = {row[0]: row[1:] for row in rows}
+        start, end = lead_filter.date_from, lead_filter.date_to
+        if start and end:
+            end = max(start, min(end, fields.Date.context_today(self)))
+        elif values:
+            start, end = min(values), max(values)
+        else:
+            start = end = None
+        buckets = []
+        if start:
+            bucket, last = self._truncate_period(start, granularity), self._truncate_period(end, granularity)
+            while bucket <= last:
+                buckets.append(bucket)
+                bucket += PERIOD_DELTAS[granularity]
+        result = {
+            'keys': [self._format_period_key(bucket, granularity) for bucket in buckets],
+            'labels': [self._format_period(bucket, granularity) for bucket in buckets],
+        }
+        empty = (0,) * len(names)
+        for index, name in enumerate(names):
+            result[name] = [values.get(bucket, empty)[index] or 0 for bucket in buckets]
+        return result
+
+    def _truncate_period(self, value, granularity):
+        """Start of the ``granularity`` bucket of ``value``, as date_trunc."""
+        day = datetime(value.year, value.month, value.day)
+        if granularity == 'week':
+            return day - timedelta(days=day.weekday())
+        if granularity == 'month':
+            return day.replace(day=1)
+        if granularity == 'quarter':
+            return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+        return day
+
 
 class LookerReport(models.Model):
     """Simple report record used by the Looker Studio module.
@@ -18,6 +719,7 @@ class LookerReport(models.Model):
     """
 
     _name = 'looker_studio.report'
+    _inherit = ['looker_studio.lead.mixin', 'looker_studio.export.mixin', 'looker_studio.snapshot.mixin']
     _description = 'Looker Studio - Report (simple)'
 
     name = fields.Char(required=True)
@@ -26,6 +728,13 @@ class LookerReport(models.Model):
     group_field = fields.Selection(selection='_get_crm_group_fields', string='Group By Field', help='CRM field to group by')
     value_field = fields.Selection(selection='_get_crm_value_fields', string='Value Field', help='Numeric CRM field to aggregate (sum)')
     chart_type = fields.Selection([('bar', 'Bar'), ('line', 'Line'), ('pie', 'Pie')], default='bar')
+    granularity = fields.Selection([
+        ('day', 'Ngày'),
+        ('week', 'Tuần'),
+        ('month', 'Tháng'),
+        ('quarter', 'Quý'),
+    ], string='Time Granularity', default='month', required=True,
+        help='Độ chi tiết của các chuỗi thời gian (biểu đồ xu hướng).')
     limit = fields.Integer(string='Limit', default=1000)
     
     time_filter = fields.Selection([
@@ -47,15 +756,63 @@ class LookerReport(models.Model):
     
     success_domain = fields.Text(string='Success Domain', help='Domain (Python list) selecting records considered "success" for percentage calculation, e.g. [("stage_id","=","won")]')
 
+    cache_stats = fields.Char(string='Report Cache', compute='_compute_cache_stats')
+    parallel_widgets = fields.Boolean(
+        string='Parallel Widgets',
+        help='Tính các widget đồng thời, mỗi widget trên một cursor chỉ đọc cùng snapshot. '
+             'Số luồng tối đa: tham số hệ thống CRM_report.parallel_max_workers, trong giới hạn db_maxconn. '
+             'Không áp dụng khi máy chủ chạy đa luồng (workers = 0).')
+    approximate = fields.Boolean(
+        string='Approximate Mode',
+        help='Ước lượng số lượng và doanh thu từ một mẫu dữ liệu CRM thay vì đọc toàn bộ, kèm sai số (95%). '
+             'Chỉ áp dụng khi bảng CRM có từ CRM_report.approximate_min_rows bản ghi trở lên.')
+    sample_percent = fields.Float(
+        string='Sample (%)', default=DEFAULT_SAMPLE_PERCENT,
+        help='Tỷ lệ dữ liệu được đọc ở chế độ ước lượng: mẫu càng lớn, sai số càng nhỏ.')
+
+    # Dashboard widgets served through get_widget_data(), by public name
+    _widget_methods = {
+        'kpi': 'get_kpi_data',
+        'chart': 'get_chart_data',
+        'detail': 'get_detail_data',
+        'lost_reason': 'get_lost_reason_data',
+        'pipeline': 'get_pipeline_by_stage_data',
+        'trend': 'get_win_loss_trend',
+        'source': 'get_source_analysis',
+        'deal_metrics': 'get_deal_metrics',
+        'customer': 'get_customer_data',
+    }
+
+    # Widgets whose queries can be planned together with other widgets' and
+    # other reports', see get_reports_widgets_data(): (plan, build) methods
+    _planned_widgets = {
+        'chart': ('_plan_chart_data', '_build_chart_data'),
+        'lost_reason': ('_plan_lost_reason_data', '_build_lost_reason_data'),
+        'pipeline': ('_plan_pipeline_by_stage_data', '_build_pipeline_by_stage_data'),
+        'trend': ('_plan_win_loss_trend', '_build_win_loss_trend'),
+        'source': ('_plan_source_analysis', '_build_source_analysis'),
+    }
+
+    _export_model = 'crm.lead'
+    _export_fields = (
+        'name', 'partner_id', 'user_id', 'stage_id', 'expected_revenue', 'probability',
+        'create_date', 'type', 'active', 'lost_reason_id',
+    )
+
+    def init(self):
+        create_generation(self.env.cr, REPORT_CACHE_SEQUENCE)
+        create_report_indexes(self.env.cr, 'crm_lead')
+
+    def _compute_cache_stats(self):
+        stats = report_cache.stats()
+        text = '%(hits)s hits / %(misses)s misses (%(hit_rate)s%%) - %(size)s/%(max_size)s entries, %(evictions)s evicted' % stats
+        for rec in self:
+            rec.cache_stats = text
+
     @api.depends('group_field', 'value_field', 'domain', 'time_filter', 'chart_type')
     def _compute_description(self):
         for rec in self:
-            def label(field):
-                if not field:
-                    return ''
-                f = self.env['ir.model.fields'].sudo().search([('model', '=', 'crm.lead'), ('name', '=', field)], limit=1)
-                return (f.field_description if f and f.field_description else field)
-            
+            label = rec._crm_field_label
             time_label = dict(self._fields['time_filter'].selection).get(rec.time_filter, 'thời gian')
             # Default to stage_id if no group_field
             group_label = label(rec.group_field) if rec.group_field else 'Giai đoạn'
@@ -82,8 +839,8 @@ class LookerReport(models.Model):
         """Return the human label for a CRM field or the raw name as fallback."""
         if not field_name:
             return ''
-        f = self.env['ir.model.fields'].sudo().search([('model', '=', 'crm.lead'), ('name', '=', field_name)], limit=1)
-        return (f.field_description if f and f.field_description else field_name)
+        field_info = self._get_field_metadata('crm.lead').get(field_name)
+        return field_info['string'] if field_info else field_name
 
     def _build_pie_description(self):
         return ('Phân bố khách hàng tiềm năng theo %s.' % self._crm_field_label(self.group_field)) if self.group_field else 'Phân bố khách hàng tiềm năng.'
@@ -105,119 +862,523 @@ class LookerReport(models.Model):
             return 'Xu hướng tổng %s theo %s%s.' % (self._crm_field_label(self.value_field), time_label, domain_part)
         return 'Xu hướng số lượng khách hàng tiềm năng theo %s%s.' % (time_label, domain_part)
 
-    def _eval_domain(self):
-        if not self.domain:
-            return []
-        try:
-            return safe_eval(self.domain)
-        except Exception:
-            return []
+    # --- Widget result cache ---
+    @api.model
+    def _get_cache_generation(self, sequence=REPORT_CACHE_SEQUENCE):
+        """Current value of the data generation ``sequence``, read once per
+        transaction: every widget of a request shares it."""
+        return self._read_cache_generation(sequence)[0]
+
+    @api.model
+    def _can_cache_results(self, sequence=REPORT_CACHE_SEQUENCE):
+        """Whether results computed by the current transaction may be cached
+        under its generation of ``sequence``.
+
+        The generation is read after the transaction's snapshot was taken:
+        when a writer committed after the snapshot and bumped before the
+        read, the results come from older data than the generation says.
+        The logged bump is then invisible to the snapshot, and they are not
+        cached.
+        """
+        return self._read_cache_generation(sequence)[1]
+
+    def _read_cache_generation(self, sequence):
+        memo = self._get_request_memo('cache_generation')
+        if sequence not in memo:
+            if not memo:
+                # a later transaction of the same cursor must see new bumps
+                self.env.cr.postcommit.add(memo.clear)
+                self.env.cr.postrollback.add(memo.clear)
+            self.env.cr.execute(SQL(
+                """SELECT generation.last_value, EXISTS(
+                       SELECT FROM %s bump WHERE bump.sequence = %s AND bump.generation = generation.last_value
+                   ) FROM %s generation""",
+                SQL.identifier(GENERATION_BUMP_TABLE), sequence, SQL.identifier(sequence),
+            ))
+            memo[sequence] = self.env.cr.fetchone()
+        return memo[sequence]
+
+    @api.model
+    def _invalidate_report_cache(self, sequence=REPORT_CACHE_SEQUENCE):
+        """Bump the crm.lead data generation, or the one of ``sequence``,
+        once the current transaction commits.
+
+        Bumping after the commit (rather than immediately) keeps readers from
+        seeing the new generation before the data it stands for; readers
+        whose snapshot predates the commit are told apart by
+        ``_can_cache_results``.
+        """
+        cr = self.env.cr
+        key = f'looker_studio.report_cache.{sequence}'
+        if cr.postcommit.data.get(key):
+            return
+        cr.postcommit.data[key] = True
+        registry = self.pool
+
+        def bump():
+            with registry.cursor() as bump_cr:
+                bump_generation(bump_cr, sequence)
+
+        cr.postcommit.add(bump)
+
+    @api.autovacuum
+    def _gc_generation_bumps(self):
+        """Drop the logged bumps of generations no longer current."""
+        self.env.cr.execute(SQL(
+            """DELETE FROM %s bump WHERE bump.generation < (
+                   SELECT MAX(latest.generation) FROM %s latest WHERE latest.sequence = bump.sequence)""",
+            SQL.identifier(GENERATION_BUMP_TABLE), SQL.identifier(GENERATION_BUMP_TABLE),
+        ))
+
+    def _get_widget_cache_key(self, widget, additional_domain=None):
+        return (
+            self.env.cr.dbname,
+            self._name,
+            self.id,
+            self.write_date,
+            widget,
+            repr(self._get_lead_filter(additional_domain).domain),
+            self.env.company.id,
+            self.env.uid,
+            self.env.lang,
+            self._get_sample_percent(),
+            self._get_cache_generation(),
+        )
+
+    def _get_sample_percent(self):
+        """Sampled percentage in approximate mode, unless exact figures are
+        asked for (``looker_studio_exact`` context key) or crm_lead is too
+        small for sampling to pay off."""
+        if not self.approximate or self.env.context.get('looker_studio_exact'):
+            return None
+        percent = min(max(self.sample_percent or DEFAULT_SAMPLE_PERCENT, 0.01), 100.0)
+        if percent == 100.0:
+            return None
+        memo = self._get_request_memo('table_rows')
+        if 'crm_lead' not in memo:
+            # planner estimate, kept up to date by autovacuum
+            self.env.cr.execute("SELECT reltuples FROM pg_class WHERE oid = 'crm_lead'::regclass")
+            memo['crm_lead'] = self.env.cr.fetchone()[0]
+        min_rows = int(self.env['ir.config_parameter'].sudo().get_param(
+            'CRM_report.approximate_min_rows', APPROXIMATE_MIN_ROWS))
+        return percent if memo['crm_lead'] >= min_rows else None
+
+    def _get_report_cache(self):
+        size = self.env['ir.config_parameter'].sudo().get_param('CRM_report.report_cache_size', DEFAULT_CACHE_SIZE)
+        report_cache.resize(int(size))
+        return report_cache
+
+    def get_widget_data(self, widget, additional_domain=None):
+        """Return the data of one dashboard widget, using the report cache.
+
+        ``widget`` is one of the keys of ``_widget_methods``.
+        """
+        return self.get_widgets_data([widget], additional_domain)[widget]
+
+    def get_widgets_data(self, widgets, additional_domain=None):
+        """Return ``{widget: data}`` for several dashboard widgets at once.
+
+        Widgets missing from the report cache are computed together, the
+        planned ones sharing their scans (see ``_compute_reports_widgets``),
+        or concurrently when ``parallel_widgets`` is set and the server
+        allows it, see ``_get_parallel_workers()``.
+        """
+        self.ensure_one()
+        for widget in widgets:
+            if widget not in self._widget_methods:
+                raise UserError(f'Unknown report widget: {widget}')
+        cache = self._get_report_cache()
+        result, keys = {}, {}
+        for widget in widgets:
+            keys[widget] = self._get_widget_cache_key(widget, additional_domain)
+            hit, value = cache.get(keys[widget])
+            if hit and not additional_domain and widget in self._planned_widgets:
+                # drill-downs are sliced out of the base rows: keep them along
+                hit = self._get_base_rows_key(widget) in cache
+            if hit:
+                result[widget] = value
+        missing = [widget for widget in widgets if widget not in result]
+        workers = len(missing) > 1 and self.parallel_widgets and self._get_parallel_workers(len(missing))
+        snapshot = workers > 1 and self._export_widget_snapshot()
+        if snapshot:
+            computed = self._compute_widgets_parallel(missing, additional_domain, snapshot, workers)
+        else:
+            computed = {
+                widget: value
+                for (_report_id, widget), value in self._compute_reports_widgets(
+                    [(self, widget) for widget in missing], additional_domain,
+                ).items()
+            }
+        if self._can_cache_results():
+            for widget, value in computed.items():
+                # keys were taken here: a generation bumped while the threads
+                # ran must not label results computed from the older snapshot
+                cache.set(keys[widget], value)
+        result.update(computed)
+        return result
+
+    def get_reports_widgets_data(self, widgets, additional_domain=None):
+        """Return ``{report id: {widget: data}}`` for several reports.
+
+        Cached results are reused, missing ones computed together by
+        ``_compute_reports_widgets``.
+        """
+        for widget in widgets:
+            if widget not in self._widget_methods:
+                raise UserError(f'Unknown report widget: {widget}')
+        cache = self._get_report_cache()
+        result = {report.id: {} for report in self}
+        keys = {}
+        for report in self:
+            for widget in widgets:
+                key = report._get_widget_cache_key(widget, additional_domain)
+                hit, value = cache.get(key)
+                if hit:
+                    result[report.id][widget] = value
+                else:
+                    keys[report, widget] = key
+        computed = self._compute_reports_widgets(list(keys), additional_domain)
+        cacheable = self._can_cache_results()
+        for (report, widget), key in keys.items():
+            result[report.id][widget] = computed[report.id, widget]
+            if cacheable:
+                cache.set(key, computed[report.id, widget])
+        return result
+
+    def _compute_reports_widgets(self, missing, additional_domain=None):
+        """Compute the ``(report, widget)`` pairs of ``missing``, bypassing
+        the report cache. Returns ``{(report id, widget): data}``.
+
+        Planned widgets are evaluated together, see
+        ``_compute_planned_widgets``; other widgets one by one.
+        """
+        planned = [(report, widget) for report, widget in missing if widget in self._planned_widgets]
+        computed = self._compute_planned_widgets(planned, additional_domain) if planned else {}
+        for report, widget in missing:
+            if (report.id, widget) not in computed:
+                computed[report.id, widget] = getattr(report, self._widget_methods[widget])(additional_domain)
+        return computed
+
+    def _compute_planned_widgets(self, planned, additional_domain=None, base_keys=None):
+        """Compute the ``(report, widget)`` pairs of ``planned`` from one
+        ``_group_leads_sets`` call: one GROUPING SETS scan per source table,
+        whatever the number of widgets and reports.
+
+        The grouping rows of unfiltered reports (see ``_plan_base_rows``)
+        are kept in the report cache, under ``base_keys`` ``{(report id,
+        widget): key}`` when the caller took them (pairs left out are not
+        cached), and drill-downs they answer are sliced out of them, see
+        ``_slice_base_rows``.
+
+        When profiling, every widget gets its own performance log entry:
+        its share of the scans, by number of groupings, plus its own build.
+        """
+        if not additional_domain and base_keys is None:
+            base_keys = {
+                (report.id, widget): report._get_base_rows_key(widget) for report, widget in planned
+            } if self._can_cache_results() else {}
+        groupings, results = {}, defaultdict(dict)
+        with measure(self.env) as scan:
+            for report, widget in planned:
+                if additional_domain:
+                    rows = report._slice_base_rows(widget, additional_domain)
+                    if rows is not None:
+                        results[report.id, widget] = rows
+                        continue
+                    plan = getattr(report, self._planned_widgets[widget][0])(additional_domain)
+                else:
+                    plan = report._plan_base_rows(widget)
+                groupings.update({(report.id, widget, name): grouping for name, grouping in plan.items()})
+            for (report_id, widget, name), rows in self._group_leads_sets(groupings).items():
+                results[report_id, widget][name] = rows
+            if not additional_domain:
+                cache = self._get_report_cache()
+                for report, widget in planned:
+                    if (report.id, widget) in base_keys:
+                        cache.set(base_keys[report.id, widget], results[report.id, widget])
+        computed = {}
+        for report, widget in planned:
+            with measure(self.env) as build:
+                computed[report.id, widget] = getattr(report, self._planned_widgets[widget][1])(
+                    results[report.id, widget], additional_domain)
+            if scan is not None:
+                share = sum(key[:2] == (report.id, widget) for key in groupings) / (len(groupings) or 1)
+                self.env['looker_studio.perf_log']._record(report, self._widget_methods[widget], {
+                    'duration': scan.duration * share + build.duration,
+                    'query_count': scan.query_count + build.query_count,
+                    'query_time': scan.query_time * share + build.query_time,
+                    'row_count': count_rows(computed[report.id, widget]),
+                    'shared_count': len(planned),
+                })
+        return computed
+
+    def _get_base_rows_key(self, widget):
+        """Report cache key of the grouping rows of planned ``widget`` on the
+        unfiltered report."""
+        return self._get_widget_cache_key(widget) + ('rows',)
+
+    def _plan_base_rows(self, widget):
+        """Groupings of planned ``widget`` on the unfiltered report, whose
+        rows are cached: its own, plus, when some of them group by a
+        drill-down field, each other one (e.g. the time series of the chart)
+        also grouped by that field, under ``(name, field)``."""
+        plan = getattr(self, self._planned_widgets[widget][0])()
+        base = dict(plan)
+        for field in DRILL_FIELDS:
+            if field not in self.env['crm.lead']._fields:
+                continue
+            for name, grouping in plan.items():
+                column = grouping.lead_filter.column(field)
+                if _groupby_key(grouping.groupby) == _sql_key(column):
+                    base.update({
+                        (other_name, field): other._replace(groupby=(column, other.groupby))
+                        for other_name, other in plan.items()
+                        if _groupby_key(other.groupby) != _sql_key(column)
+                    })
+                    break
+        return base
+
+    def _slice_base_rows(self, widget, additional_domain):
+        """Grouping rows of planned ``widget`` under drill-down
+        ``additional_domain``, sliced out of the cached rows of the
+        unfiltered report, or None when these do not answer it.
+
+        They do when the drill-down is a single ``(field, '=', value)`` and
+        every grouping of the widget groups by that field, or is cached
+        grouped by it too (see ``_plan_base_rows``): the drilled groupings
+        are then the rows of key ``value``.
+        """
+        leaf = additional_domain[0] if len(additional_domain) == 1 else None
+        if not isinstance(leaf, (list, tuple)) or leaf[1] != '=':
+            return None
+        field, _operator, value = leaf
+        hit, rows = self._get_report_cache().get(self._get_base_rows_key(widget))
+        if not hit:
+            return None
+        key = value if value is not False else None
+        sliced = {}
+        for name, grouping in getattr(self, self._planned_widgets[widget][0])().items():
+            if _groupby_key(grouping.groupby) == _sql_key(grouping.lead_filter.column(field)):
+                sliced[name] = [row for row in rows[name] if row[0] == key]
+            elif (name, field) in rows:
+                sliced[name] = []
+                for row in rows[name, field]:
+                    if row[0][0] == key:
+                        group = LeadGroup((row[0][1],) + row[1:])
+                        group.errors = row.errors
+                        sliced[name].append(group)
+            else:
+                return None
+        return sliced
+
+    def get_sliced_widgets_data(self, widgets, additional_domain):
+        """The part of ``get_widgets_data(widgets, additional_domain)``
+        answered without reading leads: cached results, and planned widgets
+        sliced out of the unfiltered report's rows. Drill-downs show them at
+        once while the other widgets are computed."""
+        self.ensure_one()
+        cache = self._get_report_cache()
+        result = {}
+        for widget in widgets:
+            if widget not in self._widget_methods:
+                raise UserError(f'Unknown report widget: {widget}')
+            key = self._get_widget_cache_key(widget, additional_domain)
+            hit, value = cache.get(key)
+            if not hit and additional_domain and widget in self._planned_widgets:
+                rows = self._slice_base_rows(widget, additional_domain)
+                if rows is not None:
+                    hit, value = True, getattr(self, self._planned_widgets[widget][1])(rows, additional_domain)
+                    cache.set(key, value)
+            if hit:
+                result[widget] = value
+        return result
+
+    @api.model
+    def _get_drill_domain(self, drill):
+        """Domain of the drill-down ``drill``, ``{field: value}`` as passed in
+        the dashboard URL. Raise UserError on fields outside
+        ``DRILL_FIELDS`` and on values that are not record ids."""
+        unknown = set(drill) - set(DRILL_FIELDS)
+        if unknown:
+            raise UserError(f'Cannot drill down by {", ".join(sorted(unknown))}')
+        domain = []
+        for name in DRILL_FIELDS:
+            if name not in drill or name not in self.env['crm.lead']._fields:
+                continue
+            value = drill[name]
+            if value == DRILL_NONE:
+                value = False
+            elif not str(value).isdigit():
+                raise UserError(f'Invalid drill-down value for {name}: {value}')
+            else:
+                value = int(value)
+            domain.append((name, '=', value))
+        return domain
+
+    def _get_drill_labels(self, domain):
+        """``[{field, value, field_label, label}]`` of the drill-down
+        ``domain``, for the filter bar of the dashboard."""
+        labels = []
+        for name, _operator, value in domain:
+            group_labels = self._get_group_labels(name, [value or None], 'Không xác định')
+            labels.append({
+                'field': name,
+                'value': str(value) if value else DRILL_NONE,
+                'field_label': self._crm_field_label(name),
+                'label': group_labels[0][1] if group_labels else str(value),
+            })
+        return labels
+
+    def action_open_overview(self):
+        """Open the overview page of the selected reports."""
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/looker_studio/overview?reports=' + ','.join(str(report_id) for report_id in self.ids),
+            'target': 'new',
+        }
+
+    def _get_snapshot_payload(self):
+        return {'widgets': self.get_widgets_data(list(self._widget_methods))}
+
+    def _export_widget_snapshot(self):
+        """Export the current transaction's snapshot for widget threads, or
+        return None when they could not see the same data."""
+        self.env.flush_all()
+        cr = self.env.cr
+        cr.execute("SELECT txid_current_if_assigned()")
+        if cr.fetchone()[0] is not None:
+            # this transaction wrote: its changes are invisible to others
+            return None
+        cr.execute("SELECT pg_export_snapshot()")
+        return cr.fetchone()[0]
+
+    def _get_parallel_workers(self, count):
+        """Number of threads computing ``count`` widgets concurrently, 0 when
+        widgets must be computed by the request itself.
+
+        Every thread takes a connection from the process's pool, which holds
+        ``db_maxconn`` of them. A threaded server (``workers`` = 0) shares that
+        pool between all its requests and crons, so concurrent dashboards
+        could exhaust it: the threads are only used by prefork workers, which
+        own their pool, and at most ``db_maxconn`` - 1 of them, the request
+        keeping its own connection.
+        """
+        if not config['workers']:
+            return 0
+        max_workers = int(self.env['ir.config_parameter'].sudo().get_param(
+            'CRM_report.parallel_max_workers', DEFAULT_PARALLEL_WORKERS))
+        return max(0, min(max_workers, config['db_maxconn'] - 1, count))
+
+    def _compute_widgets_parallel(self, widgets, additional_domain, snapshot, workers):
+        """Compute ``widgets`` in a pool of ``workers`` threads.
+
+        Every thread reads through its own read-only REPEATABLE READ cursor
+        importing ``snapshot``, which the caller's transaction must keep
+        alive until all of them are done.
+        """
+        registry = self.pool
+        dbname, uid, context, su = self.env.cr.dbname, self.env.uid, self.env.context, self.env.su
+        if profiling_enabled(self.env):
+            # threads do not see the request's debug mode
+            context = dict(context, looker_studio_profile=True)
+
+        # base rows are cached under keys of this cursor's generation, see
+        # get_widgets_data()
+        base_keys = None
+        if not additional_domain:
+            base_keys = {
+                (self.id, widget): self._get_base_rows_key(widget)
+                for widget in widgets if widget in self._planned_widgets
+            } if self._can_cache_results() else {}
+
+        def compute(widget):
+            thread = threading.current_thread()
+            thread.dbname, thread.uid = dbname, uid
+            with registry.cursor() as cr:
+                cr.execute(SQL("SET TRANSACTION SNAPSHOT %s", snapshot))
+                cr.execute("SET TRANSACTION READ ONLY")
+                report = api.Environment(cr, uid, context, su=su)[self._name].browse(self.id)
+                if widget in self._planned_widgets:
+                    return report._compute_planned_widgets(
+                        [(report, widget)], additional_domain, base_keys)[report.id, widget]
+                return getattr(report, self._widget_methods[widget])(additional_domain)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='looker_studio_widget') as executor:
+            return dict(zip(widgets, executor.map(compute, widgets)))
 
     @api.model
     def _get_crm_group_fields(self):
         """Return a selection of sensible group-by fields for crm.lead."""
         allowed = ['stage_id', 'user_id', 'team_id', 'partner_id', 'company_id', 'country_id']
-        res = []
-        for name in allowed:
-            f = self.env['ir.model.fields'].sudo().search([('model', '=', 'crm.lead'), ('name', '=', name)], limit=1)
-            if f:
-                res.append((f.name, f.field_description or f.name))
+        metadata = self._get_field_metadata('crm.lead')
+        res = [(name, metadata[name]['string']) for name in allowed if name in metadata]
         if not res:
-            fields = self.env['ir.model.fields'].sudo().search([('model', '=', 'crm.lead')])
-            for f in fields:
-                if f.ttype in ('char', 'selection', 'many2one'):
-                    res.append((f.name, f.field_description or f.name))
+            res = [(name, info['string']) for name, info in metadata.items() if info['type'] in ('char', 'selection', 'many2one')]
         return res
 
     @api.model
     def _get_crm_value_fields(self):
         """Return a selection of numeric fields usable as value metrics."""
         allowed = ['expected_revenue', 'planned_revenue', 'probability']
-        res = []
-        for name in allowed:
-            f = self.env['ir.model.fields'].sudo().search([('model', '=', 'crm.lead'), ('name', '=', name)], limit=1)
-            if f and f.ttype in ('integer', 'float', 'monetary'):
-                res.append((f.name, f.field_description or f.name))
+        numeric = ('integer', 'float', 'monetary')
+        metadata = self._get_field_metadata('crm.lead')
+        res = [(name, metadata[name]['string']) for name in allowed if metadata.get(name, {}).get('type') in numeric]
         if not res:
-            fields = self.env['ir.model.fields'].sudo().search([('model', '=', 'crm.lead')])
-            for f in fields:
-                if f.ttype in ('integer', 'float', 'monetary'):
-                    res.append((f.name, f.field_description or f.name))
+            res = [(name, info['string']) for name, info in metadata.items() if info['type'] in numeric]
         return res
 
-    def _get_time_domain(self):
-        today = fields.Date.context_today(self)
-        if isinstance(today, str):
-            today = datetime.strptime(today, '%Y-%m-%d').date()
-        
-        start_date = None
-        end_date = today
-        
-        if self.time_filter == 'last_3_months':
-            start_date = today - relativedelta(months=3)
-        elif self.time_filter == 'last_6_months':
-            start_date = today - relativedelta(months=6)
-        elif self.time_filter == 'this_year':
-            start_date = today.replace(month=1, day=1)
-            end_date = today.replace(month=12, day=31)
-        elif self.time_filter == 'custom':
-            start_date = self.date_from
-            end_date = self.date_to
-            
-        if start_date and end_date:
-            return [('create_date', '>=', start_date), ('create_date', '<=', end_date)]
-        return []
-
+    @profiled
     def get_chart_data(self, additional_domain=None):
         """Aggregate data for charts.
 
-        Returns a dict with keys: labels, count_values, sum_values, line_labels, line_values.
+        Returns a dict with keys: keys (the group values), labels, count_values, sum_values,
+        line_keys, line_labels, line_values.
         Always returns lists (never None) to simplify template handling.
         If no group_field is set, defaults to grouping by stage_id for standard CRM analysis.
         """
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
+        return self._build_chart_data(self._group_leads_sets(self._plan_chart_data(additional_domain)), additional_domain)
+
+    def _get_chart_fields(self):
+        # Use group_field if set, otherwise default to stage_id for standard CRM report;
+        # default to expected_revenue if no value_field set
+        return self.group_field or 'stage_id', self.value_field or 'expected_revenue'
+
+    def _get_chart_filter(self, additional_domain=None):
+        group_field, value_field = self._get_chart_fields()
+        return self._get_lead_filter(
+            additional_domain, fact_fields=(group_field, value_field, 'create_date'), sample=True)
+
+    def _plan_chart_data(self, additional_domain=None):
+        """Groupings of ``get_chart_data``: the groups, and the time series
+        of the value (or count) per creation period."""
+        group_field, value_field = self._get_chart_fields()
+        lead_filter = self._get_chart_filter(additional_domain)
+        active = lead_filter.is_active()
+        aggregates = [(value_field, self._get_value_aggregator(value_field))]
+        return {
+            'groups': LeadGrouping(lead_filter, lead_filter.column(group_field), active, aggregates),
+            'line': LeadGrouping(lead_filter, self._period_bucket(lead_filter, self.granularity), active, aggregates),
+        }
 
+    def _build_chart_data(self, results, additional_domain=None):
+        """``get_chart_data`` from the results of its groupings."""
+        keys = []
         labels = []
         count_values = []
         sum_values = []
-
-        # Use group_field if set, otherwise default to stage_id for standard CRM report
-        effective_group_field = self.group_field or 'stage_id'
+        group_field, value_field = self._get_chart_fields()
 
         try:
-            try:
-                groups = Model.read_group(domain, [effective_group_field], [effective_group_field], lazy=False)
-            except Exception:
-                _logger.exception('read_group(groups) failed for report %s', self.id)
-                groups = []
-
-            sum_map = {}
-            # Default to expected_revenue if no value_field set
-            effective_value_field = self.value_field or 'expected_revenue'
-            try:
-                grp_sum = Model.read_group(domain, [effective_group_field, effective_value_field], [effective_group_field], lazy=False)
-            except Exception:
-                _logger.exception('read_group(sum) failed for report %s', self.id)
-                grp_sum = []
-            for g in grp_sum:
-                key = g.get(effective_group_field)
-                gid = key[0] if isinstance(key, (list, tuple)) else key
-                sum_map[gid] = g.get(effective_value_field) or 0.0
+            lead_filter = self._get_chart_filter(additional_domain)
+            groups = {row[0]: row for row in results['groups']}
 
             group_entries = []
-            for g in groups:
-                key = g.get(effective_group_field)
-                gid = key[0] if isinstance(key, (list, tuple)) else key
-                lbl = key[1] if isinstance(key, (list, tuple)) and len(key) > 1 else (key or 'Không xác định')
-                cnt = g.get('__count', 0)
-                sval = sum_map.get(gid, 0.0)
-                group_entries.append({'gid': gid, 'label': str(lbl), 'count': cnt, 'sum': float(sval)})
+            for gid, lbl in self._get_group_labels(group_field, list(groups), 'Không xác định'):
+                _key, cnt, sval = groups[gid]
+                group_entries.append({
+                    'gid': gid, 'label': str(lbl), 'count': cnt, 'sum': float(sval), 'group': groups[gid],
+                })
 
             limit_n = int(self.limit) if getattr(self, 'limit', 0) and int(self.limit) > 0 else 0
             if limit_n and len(group_entries) > limit_n:
@@ -225,52 +1386,42 @@ class LookerReport(models.Model):
                 group_entries = sorted(group_entries, key=lambda x: x[sort_key], reverse=True)[:limit_n]
 
             for entry in group_entries:
+                keys.append(entry['gid'])
                 labels.append(entry['label'])
                 count_values.append(entry['count'])
                 sum_values.append(entry['sum'])
 
-            # Time-series comparison
-            # If time_filter is 'this_month', group by day. Else group by month.
-            groupby_period = 'create_date:month'
-            if self.time_filter == 'this_month':
-                groupby_period = 'create_date:day'
-            
-            try:
-                if self.value_field:
-                    ts_groups = Model.read_group(domain, ['create_date', self.value_field], [groupby_period], lazy=False)
-                else:
-                    ts_groups = Model.read_group(domain, ['create_date'], [groupby_period], lazy=False)
-            except Exception:
-                _logger.exception('read_group(time-series) failed for report %s', self.id)
-                ts_groups = []
-
-            line_labels = []
-            line_values = []
-            
-            # Sort groups by date just in case
-            # read_group usually returns sorted by group key
-            
-            for g in ts_groups:
-                key = g.get(groupby_period)
-                # key is usually a string like "January 2025" or "2025-01-01" depending on locale and version
-                # But read_group with date granularity returns formatted string.
-                # We can use it directly as label.
-                line_labels.append(str(key))
-                if self.value_field:
-                    line_values.append(g.get(self.value_field) or 0.0)
-                else:
-                    line_values.append(g.get('__count', 0))
+            # the line shows the value, or the count without a value field
+            line_index = 1 if self.value_field else 0
+            line_rows = [(row[0], row[line_index + 1]) for row in results['line']]
+            line = self._fill_time_series(lead_filter, self.granularity, line_rows, ['values'])
 
-            return {
+            chart = {
+                'keys': keys,
                 'labels': labels,
                 'count_values': count_values,
                 'sum_values': sum_values,
-                'line_labels': line_labels,
-                'line_values': line_values,
+                'line_keys': line['keys'],
+                'line_labels': line['labels'],
+                'line_values': line['values'],
             }
+            if lead_filter.sample:
+                groups = [entry['group'] for entry in group_entries]
+                line_errors = self._fill_time_series(lead_filter, self.granularity, [
+                    (row[0], row.errors[line_index]) for row in results['line']
+                ], ['values'])
+                chart['approximate'] = self._get_approximation(lead_filter, {
+                    'count_values': self._group_errors(groups, 0),
+                    'sum_values': self._group_errors(groups, 1),
+                    'line_values': line_errors['values'],
+                })
+            return chart
         except Exception:
             _logger.exception('Unexpected error in get_chart_data for report %s', getattr(self, 'id', '?'))
-            return {'labels': [], 'count_values': [], 'sum_values': [], 'line_labels': [], 'line_values': []}
+            return {
+                'keys': [], 'labels': [], 'count_values': [], 'sum_values': [],
+                'line_keys': [], 'line_labels': [], 'line_values': [],
+            }
 
     def action_preview(self):
         self.ensure_one()
@@ -280,45 +1431,66 @@ class LookerReport(models.Model):
             'target': 'new',
         }
 
+    @profiled
     def get_kpi_data(self, additional_domain=None):
-        """Calculate specific KPIs for the report."""
+        """Calculate specific KPIs for the report.
+
+        Also returns the KPIs of the previous period of the same length
+        (``previous``) and the changes (``delta``, ``change_pct``).
+        """
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-
-        # Base domains
-        lead_domain = domain + [('type', '=', 'lead')]
-        opp_domain = domain + [('type', '=', 'opportunity')]
-
-        # 1. Number of Leads
-        lead_count = Model.search_count(lead_domain)
-
-        # 2. Number of Opportunities
-        active_opp_count = Model.search_count(opp_domain)
-        
-        # Lost opportunities
-        lost_domain = domain + [('type', '=', 'opportunity'), ('active', '=', False)]
-        lost_count = Model.with_context(active_test=False).search_count(lost_domain)
-        
+        lead_filter = self._get_lead_filter(
+            additional_domain, fact_fields=('type', 'active', 'stage_id', 'expected_revenue', 'create_date'),
+            compare=True, sample=True)
+
+        # Every KPI card is a conditional aggregate over the same filtered
+        # set, so a single scan answers all of them, for both periods.
+        def select(period):
+            def within(condition):
+                return SQL("%s AND %s", condition, period)
+            return [
+                lead_filter.count(within(lead_filter.is_lead())),
+                lead_filter.count(within(lead_filter.is_opportunity())),
+                lead_filter.count(within(lead_filter.is_lost())),
+                lead_filter.aggregate('expected_revenue', 'sum', within(lead_filter.is_opportunity())),
+                lead_filter.count(within(lead_filter.is_won())),
+            ]
+
+        def errors(period):
+            opportunity = SQL("%s AND %s", lead_filter.is_opportunity(), period)
+            return [
+                lead_filter.count_error(SQL("%s AND %s", lead_filter.is_lead(), period)),
+                lead_filter.count_error(opportunity),
+                lead_filter.aggregate_error('expected_revenue', 'sum', opportunity),
+                lead_filter.count_error(SQL("%s AND %s", lead_filter.is_lost(), period)),
+            ]
+
+        current, previous, bounds = self._fetch_compared(lead_filter, select, errors)
+        kpis = self._compute_kpis(*current)
+        kpis = self._compare_values(kpis, previous and self._compute_kpis(*previous), lead_filter)
+        if bounds:
+            lead_error, opp_error, forecast_error, lost_error = bounds
+            total_records = kpis['lead_count'] + kpis['total_opps']
+            kpis['approximate'] = self._get_approximation(lead_filter, {
+                'lead_count': lead_error,
+                'opp_count': opp_error,
+                'forecast': forecast_error,
+                # active and lost opportunities are disjoint
+                'total_opps': self._total_error([opp_error, lost_error]),
+                'won_rate': self._rate_error(lead_filter, kpis['won_rate'], kpis['total_opps']),
+                'lost_rate': self._rate_error(lead_filter, kpis['lost_rate'], kpis['total_opps']),
+                'conversion_rate': self._rate_error(lead_filter, kpis['conversion_rate'], total_records),
+            })
+        return kpis
+
+    def _compute_kpis(self, lead_count, active_opp_count, lost_count, forecast, won_count):
         total_opps = active_opp_count + lost_count
 
-        # 3. Forecast (Expected Revenue of Active Opportunities)
-        forecast_data = Model.read_group(opp_domain, ['expected_revenue'], [])
-        forecast = forecast_data[0]['expected_revenue'] if forecast_data else 0.0
-
-        # 5. Percentage Won
-        won_domain = opp_domain + [('stage_id.is_won', '=', True)]
-        won_count = Model.search_count(won_domain)
+        # Percentage Won / Lost
         won_rate = (won_count / total_opps * 100) if total_opps > 0 else 0.0
-
-        # 6. Percentage Lost
         lost_rate = (lost_count / total_opps * 100) if total_opps > 0 else 0.0
 
-        # 7. Percentage converted from Lead to Opportunity
+        # Percentage converted from Lead to Opportunity
         # Proxy: Opps / (Leads + Opps)
         total_records = lead_count + total_opps
         conversion_rate = (total_opps / total_records * 100) if total_records > 0 else 0.0
@@ -333,47 +1505,119 @@ class LookerReport(models.Model):
             'conversion_rate': round(conversion_rate, 2),
         }
 
+    @profiled
     def get_detail_data(self, additional_domain=None):
+        """First ``limit`` rows of the detail table, newest first."""
+        return self.get_detail_page(additional_domain, page_size=self.limit or 100)['rows']
+
+    @profiled
+    def get_detail_page(self, additional_domain=None, cursor=None, sort='create_date', descending=True,
+                        filters=None, page_size=DETAIL_PAGE_SIZE):
+        """One page of the detail table, lost leads included.
+
+        Pages are seeked on ``(sort, id)``: ``cursor`` is the ``next_cursor``
+        returned with the previous page, so that every page costs one index
+        range scan however deep it is. ``filters`` maps fields of
+        ``DETAIL_FILTER_FIELDS`` to a text matched with ``ilike``.
+
+        Returns ``{'rows': [...], 'next_cursor': [value, id] or None}``,
+        rows being formatted like ``search_read``'s.
+        """
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-        
-        # Fields to fetch
+        if sort not in DETAIL_SORT_FIELDS:
+            raise UserError(f"Cannot sort the detail table by {sort!r}.")
+        Model = self.env['crm.lead'].with_context(active_test=False)
+        domain = list(additional_domain or [])
+        for name, value in (filters or {}).items():
+            if name not in DETAIL_FILTER_FIELDS:
+                raise UserError(f"Cannot filter the detail table by {name!r}.")
+            if value:
+                domain.append((name, 'ilike', value))
+        lead_filter = self._get_lead_filter(domain)
+
+        column = lead_filter.column(sort)
+        id_column = lead_filter.column('id')
+        direction = SQL("DESC") if descending else SQL("ASC")
+        after = SQL("<") if descending else SQL(">")
+        value, last_id = self._parse_detail_cursor(Model._fields[sort], cursor) if cursor else (None, None)
+
+        # Rows with a value come first, seeked with a row comparison matching
+        # the (sort, id) index, then those without, by id: NULLS LAST in
+        # both directions. A cursor with a null value is in the second phase.
+        keys = []
+        if not cursor or value is not None:
+            if cursor:
+                seek = SQL("(%s, %s) %s (%s, %s)", column, id_column, after, value, last_id)
+            else:
+                seek = SQL("%s IS NOT NULL", column)
+            self.env.cr.execute(SQL(
+                "SELECT %s, %s FROM %s WHERE %s AND %s ORDER BY %s %s, %s %s LIMIT %s",
+                id_column, column, lead_filter.from_clause, lead_filter.where_clause, seek,
+                column, direction, id_column, direction, page_size + 1,
+            ))
+            keys = self.env.cr.fetchall()
+        if len(keys) <= page_size:
+            seek = SQL("%s IS NULL", column)
+            if cursor and value is None:
+                seek = SQL("%s AND %s %s %s", seek, id_column, after, last_id)
+            self.env.cr.execute(SQL(
+                "SELECT %s, %s FROM %s WHERE %s AND %s ORDER BY %s %s LIMIT %s",
+                id_column, column, lead_filter.from_clause, lead_filter.where_clause, seek,
+                id_column, direction, page_size + 1 - len(keys),
+            ))
+            keys += self.env.cr.fetchall()
+
         fields_to_read = ['name', 'partner_id', 'user_id', 'stage_id', 'expected_revenue', 'probability', 'create_date', 'type', 'active', 'lost_reason_id']
-        if self.group_field and self.group_field not in fields_to_read:
-             # Check if it's a valid field on crm.lead
-             if self.group_field in Model._fields:
-                 fields_to_read.append(self.group_field)
+        if self.group_field and self.group_field not in fields_to_read and self.group_field in Model._fields:
+            fields_to_read.append(self.group_field)
+        rows = Model.browse([key[0] for key in keys[:page_size]]).read(fields_to_read)
+
+        next_cursor = None
+        if len(keys) > page_size:
+            last_id, value = keys[page_size - 1]
+            if isinstance(value, datetime):
+                # full precision: rows of the same second must not be skipped
+                value = value.isoformat()
+            next_cursor = [value, last_id]
+        return {'rows': rows, 'next_cursor': next_cursor}
+
+    def _parse_detail_cursor(self, field, cursor):
+        """Validate a client-provided ``[value, id]`` page cursor."""
+        value, last_id = cursor
+        if value is not None:
+            if field.type == 'datetime':
+                value = datetime.fromisoformat(value)
+            elif field.type in ('float', 'monetary', 'integer'):
+                value = float(value)
+            else:
+                value = str(value)
+        return value, int(last_id)
 
-        limit = self.limit or 100
-        # Include lost leads (active=False)
-        records = Model.with_context(active_test=False).search_read(domain, fields_to_read, limit=limit, order='create_date desc')
-        return records
+    def _get_export_query(self):
+        # same records as get_detail_data(), lost leads included
+        domain = self._get_lead_filter().domain
+        return self.env['crm.lead'].with_context(active_test=False)._search(domain, order='create_date desc, id desc')
 
+    @profiled
     def get_lost_reason_data(self, additional_domain=None):
         """Get data for Lost Reason Analysis Pie Chart"""
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-
-        # Lost opportunities (active=False)
-        lost_domain = domain + [('type', '=', 'opportunity'), ('active', '=', False)]
-        
-        # Group by lost_reason_id
-        groups = Model.with_context(active_test=False).read_group(
-            lost_domain,
-            ['lost_reason_id', 'expected_revenue:sum'],
-            ['lost_reason_id'],
-            lazy=False
-        )
+        return self._build_lost_reason_data(
+            self._group_leads_sets(self._plan_lost_reason_data(additional_domain)), additional_domain)
+
+    def _get_lost_reason_filter(self, additional_domain=None):
+        return self._get_lead_filter(
+            additional_domain, fact_fields=('type', 'active', 'lost_reason_id', 'expected_revenue'), sample=True)
+
+    def _plan_lost_reason_data(self, additional_domain=None):
+        lead_filter = self._get_lost_reason_filter(additional_domain)
+        # Lost opportunities (active=False), grouped by lost_reason_id
+        return {'reasons': LeadGrouping(
+            lead_filter, lead_filter.column('lost_reason_id'), lead_filter.is_lost(), [('expected_revenue', 'sum')],
+        )}
+
+    def _build_lost_reason_data(self, results, additional_domain=None):
+        groups = {row[0]: row for row in results['reasons']}
 
         labels = []
         counts = []
@@ -384,11 +1628,10 @@ class LookerReport(models.Model):
         ]
         
         total_lost = 0
-        for i, g in enumerate(groups):
-            reason = g.get('lost_reason_id')
-            label = reason[1] if reason else 'Không xác định'
-            count = g.get('__count', 0)
-            revenue = g.get('expected_revenue', 0) or 0
+        ordered = []
+        for reason_id, label in self._get_group_labels('lost_reason_id', list(groups), 'Không xác định'):
+            _key, count, revenue = groups[reason_id]
+            ordered.append(groups[reason_id])
             
             labels.append(label)
             counts.append(count)
@@ -398,7 +1641,8 @@ class LookerReport(models.Model):
         # Calculate percentages
         percentages = [round(c / total_lost * 100, 1) if total_lost > 0 else 0 for c in counts]
 
-        return {
+        data = {
+            'keys': [group[0] for group in ordered],
             'labels': labels,
             'counts': counts,
             'revenues': revenues,
@@ -407,206 +1651,241 @@ class LookerReport(models.Model):
             'total_lost': total_lost,
             'total_lost_revenue': sum(revenues),
         }
+        lead_filter = self._get_lost_reason_filter(additional_domain)
+        if lead_filter.sample:
+            errors = {'counts': self._group_errors(ordered, 0), 'revenues': self._group_errors(ordered, 1)}
+            errors.update(
+                total_lost=self._total_error(errors['counts']),
+                total_lost_revenue=self._total_error(errors['revenues']),
+            )
+            data['approximate'] = self._get_approximation(lead_filter, errors)
+        return data
 
+    @profiled
     def get_pipeline_by_stage_data(self, additional_domain=None):
         """Get pipeline value by stage"""
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-
-        opp_domain = domain + [('type', '=', 'opportunity')]
-        
-        groups = Model.read_group(
-            opp_domain,
-            ['stage_id', 'expected_revenue:sum'],
-            ['stage_id'],
-            lazy=False
-        )
+        return self._build_pipeline_by_stage_data(
+            self._group_leads_sets(self._plan_pipeline_by_stage_data(additional_domain)), additional_domain)
+
+    def _get_pipeline_filter(self, additional_domain=None):
+        return self._get_lead_filter(
+            additional_domain, fact_fields=('type', 'active', 'stage_id', 'expected_revenue'), sample=True)
+
+    def _plan_pipeline_by_stage_data(self, additional_domain=None):
+        lead_filter = self._get_pipeline_filter(additional_domain)
+        return {'stages': LeadGrouping(
+            lead_filter, lead_filter.column('stage_id'), lead_filter.is_opportunity(), [('expected_revenue', 'sum')],
+        )}
+
+    def _build_pipeline_by_stage_data(self, results, additional_domain=None):
+        groups = {row[0]: row for row in results['stages']}
 
         labels = []
         counts = []
         revenues = []
         
-        for g in groups:
-            stage = g.get('stage_id')
-            labels.append(stage[1] if stage else 'Undefined')
-            counts.append(g.get('__count', 0))
-            revenues.append(g.get('expected_revenue', 0) or 0)
+        ordered = []
+        for stage_id, label in self._get_group_labels('stage_id', list(groups), 'Undefined'):
+            _key, count, revenue = groups[stage_id]
+            ordered.append(groups[stage_id])
+            labels.append(label)
+            counts.append(count)
+            revenues.append(revenue)
 
-        return {
+        data = {
+            'keys': [group[0] for group in ordered],
             'labels': labels,
             'counts': counts,
             'revenues': revenues,
             'total_pipeline': sum(revenues),
         }
-
+        lead_filter = self._get_pipeline_filter(additional_domain)
+        if lead_filter.sample:
+            errors = {'counts': self._group_errors(ordered, 0), 'revenues': self._group_errors(ordered, 1)}
+            errors['total_pipeline'] = self._total_error(errors['revenues'])
+            data['approximate'] = self._get_approximation(lead_filter, errors)
+        return data
+
+    @profiled
     def get_win_loss_trend(self, additional_domain=None):
-        """Get Win/Loss trend over time"""
+        """Get Win/Loss trend over time, per ``granularity`` period."""
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-
-        opp_domain = domain + [('type', '=', 'opportunity')]
-        
-        # Won by month
-        won_domain = opp_domain + [('stage_id.is_won', '=', True)]
-        won_groups = Model.read_group(
-            won_domain,
-            ['create_date', 'expected_revenue:sum'],
-            ['create_date:month'],
-            lazy=False
-        )
-
-        # Lost by month  
-        lost_domain = domain + [('type', '=', 'opportunity'), ('active', '=', False)]
-        lost_groups = Model.with_context(active_test=False).read_group(
-            lost_domain,
-            ['create_date'],
-            ['create_date:month'],
-            lazy=False
-        )
-
-        # Build timeline data
-        won_by_month = {}
-        lost_by_month = {}
-        
-        for g in won_groups:
-            month = g.get('create_date:month')
-            if month:
-                won_by_month[month] = {
-                    'count': g.get('__count', 0),
-                    'revenue': g.get('expected_revenue', 0) or 0
-                }
-
-        for g in lost_groups:
-            month = g.get('create_date:month')
-            if month:
-                lost_by_month[month] = g.get('__count', 0)
-
-        # Merge labels
-        all_months = sorted(set(list(won_by_month.keys()) + list(lost_by_month.keys())))
-        
-        labels = all_months
-        won_counts = [won_by_month.get(m, {}).get('count', 0) for m in all_months]
-        won_revenues = [won_by_month.get(m, {}).get('revenue', 0) for m in all_months]
-        lost_counts = [lost_by_month.get(m, 0) for m in all_months]
-
+        return self._build_win_loss_trend(
+            self._group_leads_sets(self._plan_win_loss_trend(additional_domain)), additional_domain)
+
+    def _get_trend_filter(self, additional_domain=None):
+        return self._get_lead_filter(
+            additional_domain, fact_fields=('type', 'active', 'stage_id', 'expected_revenue', 'create_date'),
+            sample=True)
+
+    def _plan_win_loss_trend(self, additional_domain=None):
+        """Won and lost opportunities per period; ``periods`` counts every
+        row, so that a report without time window spans the same periods as
+        before."""
+        lead_filter = self._get_trend_filter(additional_domain)
+        bucket = self._period_bucket(lead_filter, self.granularity)
+        revenue = [('expected_revenue', 'sum')]
         return {
-            'labels': labels,
-            'won_counts': won_counts,
-            'won_revenues': won_revenues,
-            'lost_counts': lost_counts,
+            'periods': LeadGrouping(lead_filter, bucket, None, []),
+            'won': LeadGrouping(lead_filter, bucket, lead_filter.is_won(), revenue),
+            'lost': LeadGrouping(lead_filter, bucket, lead_filter.is_lost(), revenue),
         }
 
+    def _build_win_loss_trend(self, results, additional_domain=None):
+        lead_filter = self._get_trend_filter(additional_domain)
+        names = ['won_counts', 'won_revenues', 'lost_counts', 'lost_revenues']
+        rows = {row[0]: [0, 0, 0, 0] for row in results['periods']}
+        errors = {bucket: [0, 0, 0, 0] for bucket in rows}
+        for offset, name in ((0, 'won'), (2, 'lost')):
+            for row in results[name]:
+                rows.setdefault(row[0], [0, 0, 0, 0])[offset:offset + 2] = row[1:]
+                if row.errors:
+                    errors.setdefault(row[0], [0, 0, 0, 0])[offset:offset + 2] = row.errors
+        trend = self._fill_time_series(
+            lead_filter, self.granularity, [(bucket,) + tuple(values) for bucket, values in rows.items()], names,
+        )
+        trend['granularity'] = self.granularity
+        if lead_filter.sample:
+            errors = self._fill_time_series(
+                lead_filter, self.granularity, [(bucket,) + tuple(values) for bucket, values in errors.items()], names,
+            )
+            trend['approximate'] = self._get_approximation(lead_filter, {name: errors[name] for name in names})
+        return trend
+
+    @profiled
     def get_source_analysis(self, additional_domain=None):
         """Get revenue by source/campaign"""
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-
-        opp_domain = domain + [('type', '=', 'opportunity')]
-        
+        return self._build_source_analysis(
+            self._group_leads_sets(self._plan_source_analysis(additional_domain)), additional_domain)
+
+    def _get_source_filter(self, additional_domain=None):
+        return self._get_lead_filter(
+            additional_domain, fact_fields=('type', 'active', 'source_id', 'expected_revenue'), sample=True)
+
+    def _plan_source_analysis(self, additional_domain=None):
         # By source_id if available
-        if 'source_id' in Model._fields:
-            groups = Model.read_group(
-                opp_domain,
-                ['source_id', 'expected_revenue:sum'],
-                ['source_id'],
-                lazy=False
-            )
+        if 'source_id' not in self.env['crm.lead']._fields:
+            return {}
+        lead_filter = self._get_source_filter(additional_domain)
+        return {'sources': LeadGrouping(
+            lead_filter, lead_filter.column('source_id'), lead_filter.is_opportunity(), [('expected_revenue', 'sum')],
+        )}
+
+    def _build_source_analysis(self, results, additional_domain=None):
+        if 'sources' in results:
+            groups = {row[0]: row for row in results['sources']}
             
             labels = []
             counts = []
             revenues = []
+            ordered = []
             
-            for g in groups:
-                source = g.get('source_id')
-                labels.append(source[1] if source else 'Direct/Unknown')
-                counts.append(g.get('__count', 0))
-                revenues.append(g.get('expected_revenue', 0) or 0)
-
-            return {
+            for source_id, label in self._get_group_labels('source_id', list(groups), 'Direct/Unknown'):
+                _key, count, revenue = groups[source_id]
+                ordered.append(groups[source_id])
+                labels.append(label)
+                counts.append(count)
+                revenues.append(revenue)
+
+            data = {
+                'keys': [group[0] for group in ordered],
                 'labels': labels,
                 'counts': counts,
                 'revenues': revenues,
             }
+            lead_filter = self._get_source_filter(additional_domain)
+            if lead_filter.sample:
+                data['approximate'] = self._get_approximation(lead_filter, {
+                    'counts': self._group_errors(ordered, 0), 'revenues': self._group_errors(ordered, 1),
+                })
+            return data
         
-        return {'labels': [], 'counts': [], 'revenues': []}
+        return {'keys': [], 'labels': [], 'counts': [], 'revenues': []}
 
+    @profiled
     def get_deal_metrics(self, additional_domain=None):
-        """Get advanced deal metrics"""
+        """Get advanced deal metrics, with their previous-period values
+        (see ``get_kpi_data``)."""
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-
-        opp_domain = domain + [('type', '=', 'opportunity')]
-        won_domain = opp_domain + [('stage_id.is_won', '=', True)]
-        
-        # Average Deal Size
-        won_data = Model.read_group(won_domain, ['expected_revenue:avg'], [])
-        avg_deal_size = won_data[0].get('expected_revenue', 0) if won_data else 0
-
-        # Total Won Revenue
-        total_won_data = Model.read_group(won_domain, ['expected_revenue:sum'], [])
-        total_won_revenue = total_won_data[0].get('expected_revenue', 0) if total_won_data else 0
-
-        # Average Probability (Active Opps)
-        prob_data = Model.read_group(opp_domain, ['probability:avg'], [])
-        avg_probability = prob_data[0].get('probability', 0) if prob_data else 0
-
-        # Count metrics
-        total_opps = Model.with_context(active_test=False).search_count(opp_domain)
-        active_opps = Model.search_count(opp_domain)
-        won_count = Model.search_count(won_domain)
-
-        return {
-            'avg_deal_size': round(avg_deal_size, 2),
-            'total_won_revenue': round(total_won_revenue, 2),
-            'avg_probability': round(avg_probability, 1),
-            'total_opps': total_opps,
-            'active_opps': active_opps,
-            'won_count': won_count,
-        }
+        lead_filter = self._get_lead_filter(
+            additional_domain, fact_fields=('type', 'active', 'stage_id', 'expected_revenue', 'probability', 'create_date'),
+            compare=True, sample=True)
+
+        def select(period):
+            won = SQL("%s AND %s", lead_filter.is_won(), period)
+            opp = SQL("%s AND %s", lead_filter.is_opportunity(), period)
+            return [
+                lead_filter.aggregate('expected_revenue', 'avg', won),
+                lead_filter.aggregate('expected_revenue', 'sum', won),
+                lead_filter.aggregate('probability', 'avg', opp),
+                lead_filter.count(SQL("%s AND %s", lead_filter.is_opportunity(include_archived=True), period)),
+                lead_filter.count(opp),
+                lead_filter.count(won),
+            ]
+
+        def metrics(avg_deal_size, total_won_revenue, avg_probability, total_opps, active_opps, won_count):
+            return {
+                'avg_deal_size': round(avg_deal_size, 2),
+                'total_won_revenue': round(total_won_revenue, 2),
+                'avg_probability': round(avg_probability, 1),
+                'total_opps': total_opps,
+                'active_opps': active_opps,
+                'won_count': won_count,
+            }
 
+        def errors(period):
+            won = SQL("%s AND %s", lead_filter.is_won(), period)
+            opp = SQL("%s AND %s", lead_filter.is_opportunity(), period)
+            return [
+                lead_filter.aggregate_error('expected_revenue', 'avg', won),
+                lead_filter.aggregate_error('expected_revenue', 'sum', won),
+                lead_filter.aggregate_error('probability', 'avg', opp),
+                lead_filter.count_error(SQL("%s AND %s", lead_filter.is_opportunity(include_archived=True), period)),
+                lead_filter.count_error(opp),
+                lead_filter.count_error(won),
+            ]
+
+        current, previous, bounds = self._fetch_compared(lead_filter, select, errors)
+        deal_metrics = self._compare_values(metrics(*current), previous and metrics(*previous), lead_filter)
+        if bounds:
+            deal_metrics['approximate'] = self._get_approximation(lead_filter, dict(zip(
+                ('avg_deal_size', 'total_won_revenue', 'avg_probability', 'total_opps', 'active_opps', 'won_count'),
+                bounds,
+            )))
+        return deal_metrics
+
+    @profiled
     def get_customer_data(self, additional_domain=None):
         """Get customer statistics from CRM leads"""
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-
-        # Get all unique partners from CRM leads
-        # Include both leads and opportunities
-        leads_with_partners = Model.with_context(active_test=False).search(domain + [('partner_id', '!=', False)])
-        partner_ids = leads_with_partners.mapped('partner_id').ids
-        
-        total_customers = len(set(partner_ids))
-        
-        # Get customers by grade/level
+
+        # Count distinct partners of the matching leads and opportunities
+        # (archived ones included), grouped by partner grade, in SQL: records
+        # are never loaded. Each partner has a single grade, so the grade
+        # counts add up to the number of distinct customers.
+        lead_filter = self._get_lead_filter(additional_domain)
         Partner = self.env['res.partner']
-        partners = Partner.browse(list(set(partner_ids)))
+        Partner.flush_model()
         
         # Check if grade_id field exists (from partnership module)
         has_grade = 'grade_id' in Partner._fields
+        partner_grade = SQL.identifier('looker_partner', 'grade_id') if has_grade else SQL("NULL")
+        self.env.cr.execute(SQL(
+            """SELECT %s, COUNT(DISTINCT %s)
+                 FROM %s
+                 JOIN res_partner AS looker_partner ON looker_partner.id = %s
+                WHERE %s
+             GROUP BY 1""",
+            partner_grade,
+            lead_filter.column('partner_id'),
+            self._lead_from(lead_filter),
+            lead_filter.column('partner_id'),
+            lead_filter.where_clause,
+        ))
+        counts_by_grade = dict(self.env.cr.fetchall())
+        total_customers = sum(counts_by_grade.values())
         
         grade_labels = []
         grade_counts = []
@@ -616,31 +1895,15 @@ class LookerReport(models.Model):
         ]
         
         if has_grade:
-            # Group customers by grade
-            grade_data = {}
-            no_grade_count = 0
-            
-            for partner in partners:
-                grade = partner.grade_id
-                if grade:
-                    if grade.id not in grade_data:
-                        grade_data[grade.id] = {
-                            'name': grade.name,
-                            'count': 0,
-                            'sequence': grade.sequence
-                        }
-                    grade_data[grade.id]['count'] += 1
-                else:
-                    no_grade_count += 1
-            
             # Sort by sequence
-            sorted_grades = sorted(grade_data.values(), key=lambda x: x.get('sequence', 999))
-            
-            for g in sorted_grades:
-                grade_labels.append(g['name'])
-                grade_counts.append(g['count'])
+            Grade = self.env[Partner._fields['grade_id'].comodel_name].with_context(active_test=False)
+            grades = Grade.search([('id', 'in', [gid for gid in counts_by_grade if gid])], order='sequence, id')
+            for grade in grades:
+                grade_labels.append(grade.name)
+                grade_counts.append(counts_by_grade[grade.id])
             
             # Add "No Level" at the end if exists
+            no_grade_count = counts_by_grade.get(None, 0)
             if no_grade_count > 0:
                 grade_labels.append('Chưa phân loại')
                 grade_counts.append(no_grade_count)
@@ -650,7 +1913,7 @@ class LookerReport(models.Model):
             grade_counts = [total_customers]
 
         # Calculate percentages
-        total = sum(grade_counts) if grade_counts else 1
+        total = sum(grade_counts) or 1
         grade_percentages = [round(c / total * 100, 1) for c in grade_counts]
 
         return {
@@ -667,8 +1930,12 @@ class LookerActivityReport(models.Model):
     """Report record targeting mail.activity."""
 
     _name = 'looker_studio.activity_report'
+    _inherit = ['looker_studio.export.mixin']
     _description = 'Looker Studio - Activity Report'
 
+    _export_model = 'mail.activity'
+    _export_fields = ('res_name', 'activity_type_id', 'summary', 'date_deadline', 'user_id', 'res_model', 'res_id')
+
     name = fields.Char(required=True)
     domain = fields.Text(string='Domain', help='Python literal list domain')
     group_field = fields.Selection(selection='_get_activity_group_fields', string='Group By Field')
@@ -684,6 +1951,10 @@ class LookerActivityReport(models.Model):
     date_from = fields.Date(string='Từ ngày')
     date_to = fields.Date(string='Đến ngày')
 
+    def init(self):
+        create_generation(self.env.cr, ACTIVITY_GENERATION_SEQUENCE)
+        create_report_indexes(self.env.cr, 'mail_activity')
+
     @api.model
     def _get_activity_group_fields(self):
         return [
@@ -725,42 +1996,87 @@ class LookerActivityReport(models.Model):
             return [('create_date', '>=', start_date), ('create_date', '<=', end_date)]
         return []
 
+    def _get_activity_query(self, **kwargs):
+        """``Query`` of the activities of the report."""
+        Model = self.env['mail.activity']
+        Model.flush_model()
+        return Model._search(self._eval_domain() + self._get_time_domain(), **kwargs)
+
+    def _get_group_labels(self, field, keys):
+        """Return ``keys``, the values of ``field`` found in the data, sorted
+        like read_group sorts them, with their display labels."""
+        keys = [key for key in keys if key is not None]
+        if field.type == 'many2one':
+            records = self.env[field.comodel_name].with_context(active_test=False).browse(keys).sorted()
+            return [(record.id, record.display_name) for record in records]
+        if field.type == 'selection':
+            labels = dict(field._description_selection(self.env))
+            return [(key, labels.get(key, key)) for key in sorted(keys)]
+        return [(key, str(key)) for key in sorted(keys)]
+
+    @profiled
     def get_data(self):
+        """Activity total, per-type counts and counts by group field.
+
+        The three come from one ``GROUPING SETS`` query; the names of the
+        groups are then read once per grouped model.
+        """
         self.ensure_one()
         Model = self.env['mail.activity']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
         
         try:
-            # KPIs
-            total_activities = Model.search_count(domain)
-            
-            # Breakdown by Activity Type for cards
-            activity_types_data = Model.read_group(domain, ['activity_type_id'], ['activity_type_id'], lazy=False)
-            type_counts = []
-            for g in activity_types_data:
-                if g.get('activity_type_id'):
-                    type_counts.append({
-                        'name': g['activity_type_id'][1],
-                        'count': g['__count']
-                    })
+            query = self._get_activity_query()
+            type_field = Model._fields['activity_type_id']
+            group = Model._fields.get(self.group_field)
+            if group is not None and not group.column_type:
+                group = None
+            # one grouping set per breakdown, plus the empty one for the total
+            columns = [SQL.identifier(query.table, type_field.name)]
+            if group and group is not type_field:
+                columns.append(SQL.identifier(query.table, group.name))
+            self.env.cr.execute(SQL(
+                """SELECT %(grouping)s, %(columns)s, COUNT(*)
+                     FROM %(from)s
+                    WHERE %(where)s
+                 GROUP BY GROUPING SETS ((), %(sets)s)""",
+                grouping=SQL(", ").join(SQL("GROUPING(%s)", column) for column in columns),
+                columns=SQL(", ").join(columns),
+                sets=SQL(", ").join(SQL("(%s)", column) for column in columns),
+                **{'from': query.from_clause, 'where': query.where_clause or SQL("TRUE")},
+            ))
+            total_activities = 0
+            type_data, group_data = {}, {}
+            for row in self.env.cr.fetchall():
+                # GROUPING() is 0 for the columns a row is grouped by
+                grouped = [not flag for flag in row[:len(columns)]]
+                keys = row[len(columns):-1]
+                if not any(grouped):
+                    total_activities = row[-1]
+                elif grouped[0]:
+                    type_data[keys[0]] = row[-1]
                 else:
-                     type_counts.append({
-                        'name': 'Undefined',
-                        'count': g['__count']
-                    })
+                    group_data[keys[1]] = row[-1]
+            if group is type_field:
+                group_data = type_data
+
+            # Breakdown by Activity Type for cards
+            type_counts = [
+                {'name': name, 'count': type_data[key]}
+                for key, name in self._get_group_labels(type_field, type_data)
+            ]
+            if None in type_data:
+                type_counts.append({'name': 'Undefined', 'count': type_data[None]})
 
             # Grouping
             labels = []
             values = []
-            if self.group_field:
-                groups = Model.read_group(domain, [self.group_field], [self.group_field], lazy=False)
-                for g in groups:
-                    key = g.get(self.group_field)
-                    lbl = key[1] if isinstance(key, (list, tuple)) and len(key) > 1 else (key or 'Undefined')
-                    labels.append(str(lbl))
-                    values.append(g.get('__count', 0))
+            if group:
+                for key, name in self._get_group_labels(group, group_data):
+                    labels.append(name)
+                    values.append(group_data[key])
+                if None in group_data:
+                    labels.append('Undefined')
+                    values.append(group_data[None])
             
             return {
                 'total': total_activities,
@@ -778,12 +2094,12 @@ class LookerActivityReport(models.Model):
                 'error': str(e)
             }
 
+    @profiled
     def get_detail_data(self):
+        """First ``limit`` activities by deadline, with the salesperson of
+        their lead joined in SQL."""
         self.ensure_one()
         Model = self.env['mail.activity']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
         
         try:
             # Fields to fetch
@@ -793,22 +2109,113 @@ class LookerActivityReport(models.Model):
                      fields_to_read.append(self.group_field)
 
             limit = self.limit or 100
-            records = Model.search_read(domain, fields_to_read, limit=limit, order='date_deadline asc')
-
-            # Enrich with Salesperson for CRM Leads
-            lead_ids = [r['res_id'] for r in records if r.get('res_model') == 'crm.lead']
-            if lead_ids:
-                leads = self.env['crm.lead'].browse(lead_ids)
-                lead_map = {l.id: l.user_id.name for l in leads}
-                for r in records:
-                    if r.get('res_model') == 'crm.lead':
-                        r['salesperson'] = lead_map.get(r['res_id'])
+            query = self._get_activity_query(order='date_deadline asc, id', limit=limit)
+            self.env.cr.execute(SQL(
+                """SELECT activity.id, partner.name
+                     FROM (%s) AS activity
+                LEFT JOIN crm_lead AS lead ON activity.res_model = 'crm.lead' AND lead.id = activity.res_id
+                LEFT JOIN res_users AS salesperson ON salesperson.id = lead.user_id
+                LEFT JOIN res_partner AS partner ON partner.id = salesperson.partner_id
+                 ORDER BY activity.date_deadline, activity.id""",
+                query.select(*[
+                    SQL.identifier(query.table, name) for name in ('id', 'res_model', 'res_id', 'date_deadline')
+                ]),
+            ))
+            salespeople = dict(self.env.cr.fetchall())
+
+            # read() keeps the order of the ids
+            records = Model.browse(list(salespeople)).read(fields_to_read)
+            for r in records:
+                r['salesperson'] = salespeople[r['id']]
 
             return records
         except Exception as e:
             _logger.error("Error in LookerActivityReport get_detail_data: %s", e)
             return []
 
+    def _get_user_tz(self):
+        """Timezone of the current user, UTC when unset or unknown."""
+        tz = self.env.context.get('tz') or self.env.user.tz
+        return tz if tz in pytz.all_timezones_set else 'UTC'
+
+    @profiled
+    def get_workload_heatmap(self):
+        """Activity volume by assignee, weekday and hour of creation, with
+        the share of those activities that are overdue.
+
+        ``counts`` and ``overdue_ratio`` are dense ``[user][weekday][hour]``
+        matrices (Monday first) in the user's timezone, whose row 0 sums all
+        assignees. They come from one query grouped both per assignee and
+        overall; the other rows follow the assignees' volume.
+        """
+        self.ensure_one()
+        query = self._get_activity_query()
+        tz = self._get_user_tz()
+        local_create = SQL(
+            "(%s AT TIME ZONE 'UTC' AT TIME ZONE %s)", SQL.identifier(query.table, 'create_date'), tz,
+        )
+        user = SQL.identifier(query.table, 'user_id')
+        self.env.cr.execute(SQL(
+            """SELECT GROUPING(%(user)s), %(user)s, %(weekday)s, %(hour)s,
+                      COUNT(*),
+                      COUNT(*) FILTER (WHERE %(deadline)s < (now() AT TIME ZONE %(tz)s)::date)
+                 FROM %(from)s
+                WHERE %(where)s
+             GROUP BY GROUPING SETS ((%(user)s, %(weekday)s, %(hour)s), (%(weekday)s, %(hour)s))""",
+            user=user, tz=tz,
+            weekday=SQL("EXTRACT(ISODOW FROM %s)::int - 1", local_create),
+            hour=SQL("EXTRACT(HOUR FROM %s)::int", local_create),
+            deadline=SQL.identifier(query.table, 'date_deadline'),
+            **{'from': query.from_clause, 'where': query.where_clause or SQL("TRUE")},
+        ))
+
+        def empty():
+            return [[0] * 24 for _day in range(7)]
+
+        counts, overdue = defaultdict(empty), defaultdict(empty)
+        totals = defaultdict(int)
+        for all_users, user_id, weekday, hour, count, overdue_count in self.env.cr.fetchall():
+            key = 'all' if all_users else user_id
+            counts[key][weekday][hour] = count
+            overdue[key][weekday][hour] = overdue_count
+            totals[key] += count
+
+        user_ids = sorted((key for key in totals if key != 'all'), key=lambda key: -totals[key])
+        names = {
+            record.id: record.display_name
+            for record in self.env['res.users'].with_context(active_test=False).browse(
+                [user_id for user_id in user_ids if user_id])
+        }
+        keys = ['all'] + user_ids
+        locale = babel_locale_parse(get_lang(self.env).code)
+        day_names = get_day_names('abbreviated', locale=locale)
+        return {
+            'users': [{'id': None, 'name': 'Tất cả'}] + [
+                {'id': user_id, 'name': names.get(user_id, 'Undefined')} for user_id in user_ids
+            ],
+            'weekdays': [day_names[day] for day in range(7)],
+            'hours': list(range(24)),
+            'counts': [counts[key] for key in keys],
+            'overdue_ratio': [
+                [
+                    [round(late / count, 4) if count else 0 for late, count in zip(late_hours, count_hours)]
+                    for late_hours, count_hours in zip(overdue[key], counts[key])
+                ]
+                for key in keys
+            ],
+            'timezone': tz,
+        }
+
+    def _get_export_query(self):
+        return self._get_activity_query(order='date_deadline asc, id')
+
+    def _get_source_stamp(self):
+        """The mail.activity data generation, and the crm.lead one for the
+        salespeople and names of the leads shown along, see
+        ``looker_studio.lead.mixin``."""
+        Report = self.env['looker_studio.report']
+        return Report._get_cache_generation(ACTIVITY_GENERATION_SEQUENCE), Report._get_cache_generation()
+
     def action_preview(self):
         self.ensure_one()
         return {
@@ -822,6 +2229,7 @@ class LookerSalesPerformanceReport(models.Model):
     """Report for Sales Team Performance Analysis - grouped by salesperson."""
 
     _name = 'looker_studio.sales_performance_report'
+    _inherit = ['looker_studio.lead.mixin', 'looker_studio.snapshot.mixin']
     _description = 'Looker Studio - Sales Performance Report'
 
     name = fields.Char(required=True)
@@ -849,114 +2257,102 @@ class LookerSalesPerformanceReport(models.Model):
     
     description = fields.Text(string='Description', default='Báo cáo hiệu suất bán hàng theo nhân viên')
 
-    def _eval_domain(self):
-        if not self.domain:
-            return []
-        try:
-            return safe_eval(self.domain)
-        except Exception:
-            return []
-            
-    def _get_time_domain(self):
-        today = fields.Date.context_today(self)
-        if isinstance(today, str):
-            today = datetime.strptime(today, '%Y-%m-%d').date()
-        
-        start_date = None
-        end_date = today
-        
-        if self.time_filter == 'last_3_months':
-            start_date = today - relativedelta(months=3)
-        elif self.time_filter == 'last_6_months':
-            start_date = today - relativedelta(months=6)
-        elif self.time_filter == 'this_year':
-            start_date = today.replace(month=1, day=1)
-            end_date = today.replace(month=12, day=31)
-        elif self.time_filter == 'custom':
-            start_date = self.date_from
-            end_date = self.date_to
-            
-        if start_date and end_date:
-            return [('create_date', '>=', start_date), ('create_date', '<=', end_date)]
-        return []
+    def _get_salesperson_filter(self, additional_domain=None):
+        """Lead filter of the report, narrowed to the selected salesperson
+        when mode is 'specific'."""
+        domain = list(additional_domain or [])
+        if self.group_by_mode == 'specific' and self.salesperson_id:
+            domain.append(('user_id', '=', self.salesperson_id.id))
+        return self._get_lead_filter(
+            domain, fact_fields=('user_id', 'type', 'active', 'stage_id', 'expected_revenue', 'create_date'),
+            compare=True)
+
+    def _get_salesperson_rows(self, additional_domain=None):
+        """Return per-salesperson totals as a ``{user_id: row}`` dict.
+
+        All counters come from one conditional-aggregate query grouped by
+        ``user_id``; the result is memoized for the request so the summary,
+        chart and table of the sales page share it. Unassigned records are
+        kept under the ``None`` key: they count in the summary only.
+
+        The query also covers the previous period, whose counters are under
+        each row's ``previous`` key (None without a time window); ``records``
+        is the number of records of the current period.
+        """
+        self.ensure_one()
+        memo = self._get_request_memo('salesperson_rows')
+        key = self._get_request_key(additional_domain)
+        if key not in memo:
+            lead_filter = self._get_salesperson_filter(additional_domain)
+
+            def select(period):
+                won = SQL("%s AND %s", lead_filter.is_won(), period)
+                opp = SQL("%s AND %s", lead_filter.is_opportunity(), period)
+                return [
+                    lead_filter.count(period),
+                    lead_filter.count(SQL("%s AND %s", lead_filter.is_lead(), period)),
+                    lead_filter.count(opp),
+                    lead_filter.aggregate('expected_revenue', 'sum', opp),
+                    lead_filter.count(won),
+                    lead_filter.aggregate('expected_revenue', 'sum', won),
+                    lead_filter.count(SQL("%s AND %s", lead_filter.is_lost(), period)),
+                ]
+
+            def counters(records, leads, opportunities, pipeline_revenue, won_count, won_revenue, lost):
+                return {
+                    'records': records,
+                    'leads': leads,
+                    'opportunities': opportunities,
+                    'pipeline_revenue': pipeline_revenue,
+                    'won': won_count,
+                    'won_revenue': won_revenue,
+                    'lost': lost,
+                }
 
+            current = select(lead_filter.in_period())
+            previous = select(lead_filter.in_period(previous=True)) if lead_filter.previous else []
+            self.env.cr.execute(SQL(
+                "SELECT %s, %s FROM %s WHERE %s GROUP BY 1",
+                lead_filter.column('user_id'),
+                SQL(", ").join(current + previous),
+                self._lead_from(lead_filter, stage=True),
+                lead_filter.where_clause,
+            ))
+            memo[key] = {
+                row[0]: dict(
+                    counters(*row[1:len(current) + 1]),
+                    previous=counters(*row[len(current) + 1:]) if previous else None,
+                )
+                for row in self.env.cr.fetchall()
+            }
+        return memo[key]
+
+    @profiled
     def get_salesperson_performance(self, additional_domain=None):
         """Get comprehensive performance data for each salesperson"""
         self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-        
-        # Filter by specific salesperson if mode is 'specific' and salesperson is selected
-        if self.group_by_mode == 'specific' and self.salesperson_id:
-            domain = domain + [('user_id', '=', self.salesperson_id.id)]
-
-        # Get all salespeople (users with leads/opportunities)
-        all_users_data = Model.with_context(active_test=False).read_group(
-            domain,
-            ['user_id'],
-            ['user_id'],
-            lazy=False
-        )
+        rows = self._get_salesperson_rows(additional_domain)
 
+        # Salespeople are the users with leads/opportunities, archived included
         salespeople = {}
-        for g in all_users_data:
-            user = g.get('user_id')
-            if user:
-                user_id, user_name = user
-                salespeople[user_id] = {
-                    'id': user_id,
-                    'name': user_name,
-                    'leads': 0,
-                    'opportunities': 0,
-                    'won': 0,
-                    'lost': 0,
-                    'won_revenue': 0,
-                    'pipeline_revenue': 0,
-                    'lead_to_opp_rate': 0,
-                    'win_rate': 0,
-                }
-
-        # Count Leads by salesperson
-        lead_domain = domain + [('type', '=', 'lead')]
-        lead_groups = Model.read_group(lead_domain, ['user_id'], ['user_id'], lazy=False)
-        for g in lead_groups:
-            user = g.get('user_id')
-            if user and user[0] in salespeople:
-                salespeople[user[0]]['leads'] = g.get('__count', 0)
-
-        # Count Opportunities by salesperson
-        opp_domain = domain + [('type', '=', 'opportunity')]
-        opp_groups = Model.read_group(opp_domain, ['user_id', 'expected_revenue:sum'], ['user_id'], lazy=False)
-        for g in opp_groups:
-            user = g.get('user_id')
-            if user and user[0] in salespeople:
-                salespeople[user[0]]['opportunities'] = g.get('__count', 0)
-                salespeople[user[0]]['pipeline_revenue'] = g.get('expected_revenue', 0) or 0
-
-        # Count Won by salesperson
-        won_domain = opp_domain + [('stage_id.is_won', '=', True)]
-        won_groups = Model.read_group(won_domain, ['user_id', 'expected_revenue:sum'], ['user_id'], lazy=False)
-        for g in won_groups:
-            user = g.get('user_id')
-            if user and user[0] in salespeople:
-                salespeople[user[0]]['won'] = g.get('__count', 0)
-                salespeople[user[0]]['won_revenue'] = g.get('expected_revenue', 0) or 0
-
-        # Count Lost by salesperson
-        lost_domain = domain + [('type', '=', 'opportunity'), ('active', '=', False)]
-        lost_groups = Model.with_context(active_test=False).read_group(lost_domain, ['user_id'], ['user_id'], lazy=False)
-        for g in lost_groups:
-            user = g.get('user_id')
-            if user and user[0] in salespeople:
-                salespeople[user[0]]['lost'] = g.get('__count', 0)
+        active_users = [uid for uid, row in rows.items() if uid and row['records']]
+        for user_id, user_name in self._get_group_labels('user_id', active_users, ''):
+            row = rows[user_id]
+            salespeople[user_id] = {
+                'id': user_id,
+                'name': user_name,
+                'leads': row['leads'],
+                'opportunities': row['opportunities'],
+                'won': row['won'],
+                'lost': row['lost'],
+                'won_revenue': row['won_revenue'],
+                'pipeline_revenue': row['pipeline_revenue'],
+                'lead_to_opp_rate': 0,
+                'win_rate': 0,
+            }
 
         # Calculate rates
         for sp in salespeople.values():
-            total_records = sp['leads'] + sp['opportunities'] + sp['lost']
             total_decided = sp['won'] + sp['lost']
             
             # Lead to Opportunity rate
@@ -972,30 +2368,28 @@ class LookerSalesPerformanceReport(models.Model):
 
         return result
 
+    @profiled
     def get_summary_data(self, additional_domain=None):
-        """Get overall summary KPIs - filtered by salesperson if selected"""
-        self.ensure_one()
-        Model = self.env['crm.lead']
-        domain = self._eval_domain()
-        time_domain = self._get_time_domain()
-        domain = domain + time_domain
-        if additional_domain:
-            domain = domain + additional_domain
-        
-        # Filter by specific salesperson if mode is 'specific' and salesperson is selected
-        if self.group_by_mode == 'specific' and self.salesperson_id:
-            domain = domain + [('user_id', '=', self.salesperson_id.id)]
+        """Get overall summary KPIs - filtered by salesperson if selected.
 
-        lead_count = Model.search_count(domain + [('type', '=', 'lead')])
-        opp_count = Model.search_count(domain + [('type', '=', 'opportunity')])
-        
-        won_domain = domain + [('type', '=', 'opportunity'), ('stage_id.is_won', '=', True)]
-        won_count = Model.search_count(won_domain)
-        won_revenue = Model.read_group(won_domain, ['expected_revenue:sum'], [])
-        total_won_revenue = won_revenue[0].get('expected_revenue', 0) if won_revenue else 0
-        
-        lost_domain = domain + [('type', '=', 'opportunity'), ('active', '=', False)]
-        lost_count = Model.with_context(active_test=False).search_count(lost_domain)
+        Previous-period values and changes are returned as in
+        ``LookerReport.get_kpi_data``.
+        """
+        self.ensure_one()
+        lead_filter = self._get_salesperson_filter(additional_domain)
+        rows = self._get_salesperson_rows(additional_domain).values()
+        summary = self._summarize_salesperson_rows(rows)
+        previous = None
+        if lead_filter.previous:
+            previous = self._summarize_salesperson_rows([row['previous'] for row in rows])
+        return self._compare_values(summary, previous, lead_filter)
+
+    def _summarize_salesperson_rows(self, rows):
+        lead_count = sum(row['leads'] for row in rows)
+        opp_count = sum(row['opportunities'] for row in rows)
+        won_count = sum(row['won'] for row in rows)
+        total_won_revenue = sum(row['won_revenue'] for row in rows)
+        lost_count = sum(row['lost'] for row in rows)
         
         total_decided = won_count + lost_count
         total_records = lead_count + opp_count + lost_count
@@ -1010,6 +2404,7 @@ class LookerSalesPerformanceReport(models.Model):
             'overall_conversion_rate': round((opp_count + lost_count) / total_records * 100, 1) if total_records > 0 else 0,
         }
 
+    @profiled
     def get_chart_data(self, additional_domain=None):
         """Get chart data for visualization"""
         salespeople = self.get_salesperson_performance(additional_domain)
@@ -1038,10 +2433,18 @@ class LookerSalesPerformanceReport(models.Model):
             'colors': colors[:len(labels)],
         }
 
+    @profiled
     def get_detail_data(self, additional_domain=None):
         """Get detailed salesperson data for table"""
         return self.get_salesperson_performance(additional_domain)
 
+    def _get_snapshot_payload(self):
+        return {
+            'summary': self.get_summary_data(),
+            'detail': self.get_detail_data(),
+            'chart': self.get_chart_data(),
+        }
+
     def action_preview(self):
         self.ensure_one()
         return {
@@ -0,0 +1,81 @@
+import copy
+import logging
+import threading
+from collections import OrderedDict
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 512
+
+
+class ReportCache:
+    """Process-wide LRU cache for report widget results.
+
+    Keys are built by the report models and already contain everything that
+    can change a widget result (report, write_date, domain, time window,
+    company, user, data generation), so entries are never updated in place:
+    stale ones simply stop being looked up and fall off the LRU end.
+    Values are deep-copied in and out because callers freely mutate the
+    dicts and lists returned by ``get_*`` methods.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return ``(True, value)`` on a hit and ``(False, None)`` on a miss."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return True, copy.deepcopy(value)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def resize(self, max_size):
+        with self._lock:
+            if max_size != self.max_size:
+                self.max_size = max_size
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            }
+
+    def _evict(self):
+        while len(self._data) > max(self.max_size, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+report_cache = ReportCache()
@@ -0,0 +1,307 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+import csv
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+import xlsxwriter
+from datetime import timedelta
+
+_logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip from the server-side cursor.
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_CURSOR = 'looker_studio_export'
+
+XLSX_MAX_ROWS = 1048576
+
+# CSV exports of up to this many rows are streamed by the HTTP worker; larger
+# ones, and every XLSX one, are written by a background job. The system
+# parameter CRM_report.export_stream_max_rows overrides it.
+EXPORT_STREAM_MAX_ROWS = 100000
+
+EXPORT_JOB_RETENTION_DAYS = 7
+
+# Bytes read at once when checksumming and copying export files.
+EXPORT_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def write_csv(output, headers, rows):
+    """Write ``headers`` and ``rows`` to binary file ``output`` as CSV."""
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='', write_through=True)
+    text.write('\ufeff')  # lets Excel detect UTF-8
+    writer = csv.writer(text)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    text.detach()
+
+
+def write_xlsx(output, headers, rows):
+    """Write ``headers`` and ``rows`` to binary file ``output`` as XLSX, a
+    new sheet starting every ``XLSX_MAX_ROWS`` rows."""
+    # constant_memory flushes each row to disk once the next one starts
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    bold = workbook.add_format({'bold': True})
+    sheet, row_index = None, XLSX_MAX_ROWS
+    for row in rows:
+        if row_index == XLSX_MAX_ROWS:
+            sheet, row_index = workbook.add_worksheet(), 1
+            sheet.write_row(0, 0, headers, bold)
+        sheet.write_row(row_index, 0, row)
+        row_index += 1
+    if sheet is None:
+        workbook.add_worksheet().write_row(0, 0, headers, bold)
+    workbook.close()
+
+
+EXPORT_WRITERS = {'csv': write_csv, 'xlsx': write_xlsx}
+
+
+class LookerReportExportMixin(models.AbstractModel):
+    """Export of every record matched by a report, without the ``limit``.
+
+    Rows are read through a server-side cursor in batches and yielded one by
+    one, so memory stays flat whatever the number of records. Implementers
+    set ``_export_model`` and provide ``_get_export_query()``.
+    """
+
+    _name = 'looker_studio.export.mixin'
+    _description = 'Looker Studio - Report export helpers'
+
+    _export_model = None
+    _export_fields = ()
+
+    def _get_export_fields(self):
+        """Stored fields of ``_export_model`` written to the export."""
+        Model = self.env[self._export_model]
+        names = list(self._export_fields)
+        if self.group_field and self.group_field not in names:
+            names.append(self.group_field)
+        return [name for name in names if name in Model._fields and Model._fields[name].column_type]
+
+    def _get_export_query(self):
+        """Return the ``Query`` of the exported records, ordered."""
+        raise NotImplementedError()
+
+    def _get_export_stream_max_rows(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'CRM_report.export_stream_max_rows', EXPORT_STREAM_MAX_ROWS))
+
+    def _count_export_rows(self, limit):
+        """Number of exported records, counted up to ``limit``."""
+        self.ensure_one()
+        query = self._get_export_query()
+        self.env.cr.execute(SQL(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM %s WHERE %s LIMIT %s) AS export",
+            query.from_clause, query.where_clause or SQL("TRUE"), limit,
+        ))
+        return self.env.cr.fetchone()[0]
+
+    def _get_export_headers(self):
+        names = self._get_export_fields()
+        descriptions = self.env[self._export_model].fields_get(names, ['string'])
+        return [descriptions[name]['string'] for name in names]
+
+    def _get_export_formatter(self, field, values):
+        """Return a function turning raw column values of ``field`` into
+        display values; ``values`` are the column's values in the batch."""
+        if field.type == 'many2one':
+            ids = {value for value in values if value}
+            records = self.env[field.comodel_name].with_context(active_test=False).browse(ids)
+            names = {record.id: record.display_name for record in records}
+            return lambda value: names.get(value, '')
+        if field.type == 'selection':
+            labels = dict(field._description_selection(self.env))
+            return lambda value: labels.get(value, value or '')
+        if field.translate:
+            lang = self.env.lang or 'en_US'
+            return lambda value: (value.get(lang) or value.get('en_US') or '') if value else ''
+        if field.type == 'datetime':
+            return lambda value: fields.Datetime.to_string(value) if value else ''
+        if field.type == 'date':
+            return lambda value: fields.Date.to_string(value) if value else ''
+        return lambda value: '' if value is None else value
+
+    def _iter_export_rows(self, batch_size=EXPORT_BATCH_SIZE):
+        """Yield the display values of every exported record, as lists."""
+        self.ensure_one()
+        Model = self.env[self._export_model]
+        names = self._get_export_fields()
+        query = self._get_export_query()
+        cr = self.env.cr
+        cr.execute(SQL(
+            "DECLARE %s NO SCROLL CURSOR FOR %s",
+            SQL.identifier(EXPORT_CURSOR),
+            query.select(*[SQL.identifier(query.table, name) for name in names]),
+        ))
+        while True:
+            cr.execute(SQL("FETCH FORWARD %s FROM %s", batch_size, SQL.identifier(EXPORT_CURSOR)))
+            rows = cr.fetchall()
+            if not rows:
+                break
+            formatters = [
+                self._get_export_formatter(Model._fields[name], [row[index] for row in rows])
+                for index, name in enumerate(names)
+            ]
+            for row in rows:
+                yield [format_value(value) for format_value, value in zip(formatters, row)]
+            # forget the records browsed for this batch's names
+            self.env.invalidate_all()
+        cr.execute(SQL("CLOSE %s", SQL.identifier(EXPORT_CURSOR)))
+
+
+class LookerReportExportJob(models.Model):
+    """Export written in the background, see ``_enqueue``.
+
+    Large exports outgrow the time limits of HTTP workers: they are queued
+    and written by a cron job to ``file``, which the user is notified of and
+    downloads once ``state`` is ``done``.
+    """
+
+    _name = 'looker_studio.export_job'
+    _description = 'Looker Studio - Export Job'
+    _order = 'id desc'
+
+    report_model = fields.Char(required=True, readonly=True)
+    report_id = fields.Integer(required=True, readonly=True)
+    export_format = fields.Selection([('csv', 'CSV'), ('xlsx', 'XLSX')], required=True, readonly=True)
+    user_id = fields.Many2one('res.users', required=True, readonly=True, ondelete='cascade')
+    lang = fields.Char(readonly=True)
+    state = fields.Selection([
+        ('queued', 'Đang chờ'),
+        ('running', 'Đang xuất'),
+        ('done', 'Hoàn tất'),
+        ('failed', 'Lỗi'),
+    ], default='queued', required=True, readonly=True)
+    file = fields.Binary(attachment=True, readonly=True)
+    file_name = fields.Char(readonly=True)
+    row_count = fields.Integer(readonly=True)
+    duration = fields.Float(string='Export Time (s)', digits=(16, 1), readonly=True)
+    error = fields.Text(readonly=True)
+
+    @api.model
+    def _enqueue(self, report, export_format):
+        """Queue the export of ``report`` for the current user and wake the
+        cron up to write it."""
+        job = self.create({
+            'report_model': report._name,
+            'report_id': report.id,
+            'export_format': export_format,
+            'user_id': self.env.uid,
+            'lang': self.env.lang,
+            'file_name': f'{report.name}.{export_format}',
+        })
+        self.env.ref('CRM_report.ir_cron_run_export_jobs')._trigger()
+        return job
+
+    @api.model
+    def _cron_run(self):
+        """Write the queued exports, one transaction each. The cron worker
+        has its own time limit (``limit_time_real_cron``), not the HTTP
+        workers' ones."""
+        for job in self.search([('state', '=', 'queued')], order='id'):
+            job.state = 'running'
+            self.env.cr.commit()
+            try:
+                job._run()
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception('Could not export %s %s', job.report_model, job.report_id)
+                job.write({'state': 'failed', 'error': str(e)})
+            job._notify_user()
+            self.env.cr.commit()
+
+    def _run(self):
+        self.ensure_one()
+        report = self.env[self.report_model].with_context(lang=self.lang).sudo().browse(self.report_id)
+        if not report.exists():
+            raise ValueError(f'{self.report_model} {self.report_id} no longer exists')
+        start = time.perf_counter()
+        row_count = 0
+
+        def rows():
+            nonlocal row_count
+            for row in report._iter_export_rows():
+                row_count += 1
+                yield row
+
+        with tempfile.TemporaryFile() as output:
+            EXPORT_WRITERS[self.export_format](output, report._get_export_headers(), rows())
+            self._attach_file(output)
+        self.write({
+            'state': 'done',
+            'row_count': row_count,
+            'duration': time.perf_counter() - start,
+        })
+
+    def _attach_file(self, output):
+        """Attach binary file ``output`` as the job's ``file``.
+
+        With the file storage, it is checksummed and copied into the
+        filestore in chunks, and the attachment pointed at it: the export is
+        never held in memory whole, as a ``raw`` or base64 value would be.
+        """
+        self.ensure_one()
+        Attachment = self.env['ir.attachment'].sudo()
+        values = {
+            'name': 'file',
+            'res_model': self._name,
+            'res_field': 'file',
+            'res_id': self.id,
+            'mimetype': mimetypes.guess_type(self.file_name)[0] or 'application/octet-stream',
+        }
+        output.seek(0)
+        if Attachment._storage() != 'file':
+            # the database storage holds the file in one value anyway
+            Attachment.create(dict(values, raw=output.read()))
+            return
+        checksum, size = hashlib.sha1(), 0
+        for chunk in iter(lambda: output.read(EXPORT_COPY_CHUNK_SIZE), b''):
+            checksum.update(chunk)
+            size += len(chunk)
+        checksum = checksum.hexdigest()
+        fname = f'{checksum[:2]}/{checksum}'
+        full_path = Attachment._full_path(fname)
+        if not os.path.isfile(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            output.seek(0)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(full_path), delete=False) as target:
+                shutil.copyfileobj(output, target, EXPORT_COPY_CHUNK_SIZE)
+            os.replace(target.name, full_path)
+        # removed by the filestore GC if this transaction is rolled back
+        Attachment._mark_for_gc(fname)
+        attachment = Attachment.create(values)
+        # create() and write() drop these fields, computed from the content
+        self.env.cr.execute(SQL(
+            "UPDATE ir_attachment SET store_fname = %s, file_size = %s, checksum = %s WHERE id = %s",
+            fname, size, checksum, attachment.id,
+        ))
+        attachment.invalidate_recordset(['store_fname', 'file_size', 'checksum'])
+
+    def _notify_user(self):
+        """Tell the user, in the web client, that the export is ready or
+        failed."""
+        self.ensure_one()
+        if self.state == 'done':
+            message = f'{self.file_name}: {self.row_count} dòng, tải về tại /looker_studio/export/{self.id}/download'
+        else:
+            message = f'{self.file_name}: xuất dữ liệu thất bại.'
+        self.user_id.partner_id._bus_send('simple_notification', {
+            'type': 'success' if self.state == 'done' else 'danger',
+            'title': 'Xuất dữ liệu',
+            'message': message,
+            'sticky': True,
+        })
+
+    @api.autovacuum
+    def _gc_export_jobs(self):
+        """Remove the jobs, and their files, older than a week."""
+        self.search([
+            ('create_date', '<', fields.Datetime.now() - timedelta(days=EXPORT_JOB_RETENTION_DAYS)),
+        ]).unlink()
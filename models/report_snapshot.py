@@ -0,0 +1,146 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+import base64
+import gzip
+import json
+import logging
+import time
+from datetime import timedelta
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_MAX_AGE = 120  # minutes
+
+
+class LookerReportSnapshotMixin(models.AbstractModel):
+    """Dashboards pre-rendered on a schedule.
+
+    When ``snapshot_enabled`` is set, the cron stores the full payload of
+    the report page in ``looker_studio.report_snapshot`` and the page is
+    served from it while it is younger than ``snapshot_max_age``.
+    Implementers provide ``_get_snapshot_payload()``.
+    """
+
+    _name = 'looker_studio.snapshot.mixin'
+    _description = 'Looker Studio - Report snapshot helpers'
+
+    snapshot_enabled = fields.Boolean(
+        string='Scheduled Snapshot',
+        help='Tính sẵn toàn bộ số liệu của báo cáo theo lịch; trang báo cáo hiển thị bản chụp '
+             'khi còn mới thay vì tính lại.')
+    snapshot_max_age = fields.Integer(
+        string='Snapshot Max Age (min)', default=DEFAULT_SNAPSHOT_MAX_AGE,
+        help='Quá thời gian này (phút), bản chụp được tính lại ở lần xem kế tiếp.')
+
+    def _get_snapshot_payload(self):
+        """Return the JSON-serializable data of the report page."""
+        raise NotImplementedError()
+
+    def _get_snapshot_date(self):
+        """``computed_at`` of the fresh snapshot the page would be served
+        from, if any."""
+        self.ensure_one()
+        if not self.snapshot_enabled:
+            return None
+        snapshot = self.env['looker_studio.report_snapshot'].sudo()._find(self)
+        return snapshot.computed_at if snapshot and snapshot._is_fresh(self.snapshot_max_age) else None
+
+    def _get_snapshot(self, refresh=False):
+        """Return ``(payload, computed_at)`` of the report page.
+
+        The stored snapshot is used while fresh; otherwise, or with
+        ``refresh``, the payload is computed and stored again. Returns
+        ``(None, None)`` when snapshots are disabled.
+        """
+        self.ensure_one()
+        if not self.snapshot_enabled:
+            return None, None
+        Snapshot = self.env['looker_studio.report_snapshot'].sudo()
+        snapshot = Snapshot._find(self)
+        if refresh or not snapshot or not snapshot._is_fresh(self.snapshot_max_age):
+            snapshot = Snapshot._store(self)
+        return snapshot._get_payload(), snapshot.computed_at
+
+
+class LookerReportSnapshot(models.Model):
+    """Compressed page payload of a report, see the snapshot mixin."""
+
+    _name = 'looker_studio.report_snapshot'
+    _description = 'Looker Studio - Report Snapshot'
+    _order = 'computed_at desc'
+
+    report_model = fields.Char(required=True, readonly=True, index=True)
+    report_id = fields.Integer(required=True, readonly=True, index=True)
+    lang = fields.Char(required=True, readonly=True)
+    computed_at = fields.Datetime(required=True, readonly=True)
+    duration = fields.Float(string='Compute Time (ms)', digits=(16, 1), readonly=True)
+    size = fields.Integer(string='Compressed Size (bytes)', readonly=True)
+    payload = fields.Binary(attachment=False, readonly=True, help='gzip-compressed JSON')
+
+    _sql_constraints = [
+        ('report_lang_unique', 'UNIQUE(report_model, report_id, lang)', 'One snapshot per report and language.'),
+    ]
+
+    @api.model
+    def _find(self, report):
+        return self.search([
+            ('report_model', '=', report._name),
+            ('report_id', '=', report.id),
+            ('lang', '=', report.env.lang or 'en_US'),
+        ], limit=1)
+
+    def _is_fresh(self, max_age):
+        self.ensure_one()
+        return self.computed_at >= fields.Datetime.now() - timedelta(minutes=max_age)
+
+    def _get_payload(self):
+        self.ensure_one()
+        return json.loads(gzip.decompress(base64.b64decode(self.payload)))
+
+    @api.model
+    def _store(self, report):
+        """Compute the payload of ``report`` and store it, replacing the
+        snapshot of the same language."""
+        start = time.perf_counter()
+        data = gzip.compress(json.dumps(report._get_snapshot_payload(), default=str).encode())
+        values = {
+            'computed_at': fields.Datetime.now(),
+            'duration': (time.perf_counter() - start) * 1000,
+            'size': len(data),
+            'payload': base64.b64encode(data),
+        }
+        snapshot = self._find(report)
+        if snapshot:
+            snapshot.write(values)
+        else:
+            snapshot = self.create(dict(values, **{
+                'report_model': report._name,
+                'report_id': report.id,
+                'lang': report.env.lang or 'en_US',
+            }))
+        return snapshot
+
+    @api.model
+    def _cron_refresh(self):
+        """Recompute the snapshots of every report that has them enabled,
+        in each language they were viewed in (the cron's by default).
+
+        Snapshots left untouched for a week, of reports no longer snapshotted
+        or languages no longer used, are removed.
+        """
+        self.env.cr.execute(SQL(
+            "DELETE FROM looker_studio_report_snapshot WHERE computed_at < %s",
+            fields.Datetime.now() - timedelta(days=7),
+        ))
+        for model_name in self.env['looker_studio.snapshot.mixin']._inherit_children:
+            for report in self.env[model_name].search([('snapshot_enabled', '=', True)]):
+                langs = self.search([
+                    ('report_model', '=', model_name), ('report_id', '=', report.id),
+                ]).mapped('lang') or [self.env.lang or 'en_US']
+                for lang in langs:
+                    try:
+                        self.with_context(lang=lang)._store(report.with_context(lang=lang))
+                        self.env.cr.commit()
+                    except Exception:
+                        self.env.cr.rollback()
+                        _logger.exception('Could not refresh the snapshot of %s %s (%s)', model_name, report.id, lang)
@@ -0,0 +1,796 @@
+/** @odoo-module ignore */
+/**
+ * KPI dashboard loader for report_kpi_template_v3.
+ *
+ * The page is rendered as an empty shell; every widget comes from one
+ * columnar payload (see controllers/payload.py) fetched from the page's
+ * data-payload-url, and each [data-looker-widget] element is filled once it
+ * gets close to the viewport. The payload URL changes with the data, and
+ * the browser revalidates it on every use (private, no-cache, ETag), getting
+ * an empty 304 while it is current. The detail table pages through
+ * /looker_studio/report/<id>/detail instead. Clicking a group of the main,
+ * pipeline or lost reason chart drills the whole dashboard down to it.
+ */
+(function () {
+    'use strict';
+
+    var root = document.getElementById('looker_dashboard');
+    if (!root) {
+        return;
+    }
+
+    var reportId = root.dataset.reportId;
+    var chartType = root.dataset.chartType || 'bar';
+    var groupField = root.dataset.groupField;
+    var currency = root.dataset.currency || 'VND';
+
+    var PALETTE = [
+        '#4e73df', '#1cc88a', '#36b9cc', '#f6c23e', '#e74a3b',
+        '#858796', '#5a5c69', '#6610f2', '#fd7e14', '#20c997'
+    ];
+
+    var payload = null;
+
+    function fetchJson(url) {
+        return fetch(url, {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' },
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error(url + ': HTTP ' + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    /* Inverse of controllers/payload.py: {"$s": [...]} are indexes into the
+     * shared strings, {"$t": {key: column}} tables of rows. */
+    function decode(value, strings) {
+        if (Array.isArray(value)) {
+            return value.map(function (item) { return decode(item, strings); });
+        }
+        if (value === null || typeof value !== 'object') {
+            return value;
+        }
+        if (value.$s) {
+            return value.$s.map(function (index) { return strings[index]; });
+        }
+        if (value.$t) {
+            var keys = Object.keys(value.$t);
+            var columns = keys.map(function (key) { return decode(value.$t[key], strings); });
+            return columns[0].map(function (_, index) {
+                var row = {};
+                keys.forEach(function (key, column) { row[key] = columns[column][index]; });
+                return row;
+            });
+        }
+        var result = {};
+        Object.keys(value).forEach(function (key) { result[key] = decode(value[key], strings); });
+        return result;
+    }
+
+    function showAsOf(asOf) {
+        var node = document.getElementById('looker_as_of');
+        if (!node || !asOf) {
+            return;
+        }
+        // stored in UTC
+        var date = new Date(asOf.replace(' ', 'T') + 'Z');
+        node.querySelector('[data-looker-as-of]').textContent = date.toLocaleString('vi-VN');
+        node.classList.remove('d-none');
+    }
+
+    /* Approximate mode: widgets estimated from a sample carry
+     * {approximate: {sample_percent, errors: {key: bound(s)}}}. */
+    function showApproximate(widgets) {
+        var node = document.getElementById('looker_approximate');
+        var sampled = Object.keys(widgets).filter(function (widget) {
+            return widgets[widget] && widgets[widget].approximate;
+        });
+        if (!node || !sampled.length) {
+            return;
+        }
+        node.querySelector('[data-looker-sample]').textContent = widgets[sampled[0]].approximate.sample_percent;
+        node.classList.remove('d-none');
+    }
+
+    function errorOf(data, key, index) {
+        var errors = data.approximate ? data.approximate.errors[key] : null;
+        var bound = index === undefined || errors === null || errors === undefined ? errors : errors[index];
+        return bound === undefined ? null : bound;
+    }
+
+    /* Tooltip line of the error bound of an approximate chart value; the
+     * dataset is matched to its widget key by identity. */
+    function errorTooltip(data) {
+        return function (context) {
+            var key = Object.keys((data.approximate || {}).errors || {}).filter(function (name) {
+                return data[name] === context.dataset.data;
+            })[0];
+            var bound = key ? errorOf(data, key, context.dataIndex) : null;
+            return bound === null ? '' : '± ' + formatCompact(bound) + ' (95%)';
+        };
+    }
+
+    /* Fetch the dashboard payload on first use. Returns one promise per
+     * widget. */
+    function load(widgets) {
+        if (!payload) {
+            payload = fetchJson(root.dataset.payloadUrl).then(function (data) {
+                showAsOf(data.as_of);
+                var decoded = decode(data.widgets, data.strings);
+                showApproximate(decoded);
+                return decoded;
+            });
+        }
+        return widgets.map(function (widget) {
+            return payload.then(function (data) {
+                if (!(widget in data)) {
+                    throw new Error('Widget missing from the payload: ' + widget);
+                }
+                return data[widget];
+            });
+        });
+    }
+
+    function formatMonetary(value) {
+        return new Intl.NumberFormat('vi-VN', { style: 'currency', currency: currency }).format(value || 0);
+    }
+
+    function formatCompact(value) {
+        return new Intl.NumberFormat('vi-VN', { notation: 'compact' }).format(value);
+    }
+
+    function percentTooltip(context) {
+        var total = context.dataset.data.reduce(function (a, b) { return a + b; }, 0);
+        var percentage = total ? ((context.raw / total) * 100).toFixed(1) : '0.0';
+        return context.label + ': ' + context.raw + ' (' + percentage + '%)';
+    }
+
+    function el(tag, className, text) {
+        var node = document.createElement(tag);
+        if (className) {
+            node.className = className;
+        }
+        if (text !== undefined && text !== null) {
+            node.textContent = text;
+        }
+        return node;
+    }
+
+    function m2oName(value) {
+        return Array.isArray(value) ? value[1] : value;
+    }
+
+    /* Plain values: <span data-looker-widget="kpi" data-looker-key="won_rate" data-looker-format="percent"> */
+    function fillFields(widget, data) {
+        root.querySelectorAll('[data-looker-widget="' + widget + '"][data-looker-key]').forEach(function (node) {
+            var value = data[node.dataset.lookerKey];
+            switch (node.dataset.lookerFormat) {
+                case 'monetary':
+                    node.textContent = formatMonetary(value);
+                    break;
+                case 'percent':
+                    node.textContent = (value || 0) + '%';
+                    break;
+                case 'change':
+                    // change vs the previous period of the same length
+                    var change = data.change_pct ? data.change_pct[node.dataset.lookerKey] : null;
+                    if (change === null || change === undefined) {
+                        node.textContent = data.previous ? 'kỳ trước: 0' : '';
+                    } else {
+                        node.textContent = (change >= 0 ? '▲ ' : '▼ ') + Math.abs(change) + '% so với kỳ trước';
+                        node.className = change >= 0 ? 'text-success' : 'text-danger';
+                    }
+                    break;
+                case 'bar':
+                    node.style.width = (value || 0) + '%';
+                    node.setAttribute('aria-valuenow', value || 0);
+                    break;
+                default:
+                    node.textContent = value === undefined || value === null ? '' : value;
+            }
+            var bound = errorOf(data, node.dataset.lookerKey);
+            var format = node.dataset.lookerFormat;
+            if (bound !== null && format !== 'change' && format !== 'bar') {
+                node.textContent = '≈ ' + node.textContent;
+                node.appendChild(el('small', 'text-muted font-weight-normal ml-1', '± ' + (
+                    format === 'monetary' ? formatMonetary(bound)
+                        : format === 'percent' ? formatCompact(bound) + '%' : formatCompact(bound)
+                )));
+            }
+        });
+    }
+
+    function renderLegend(containerId, data) {
+        var container = document.getElementById(containerId);
+        if (!container) {
+            return;
+        }
+        container.textContent = '';
+        (data.labels || []).slice(0, 4).forEach(function (label, index) {
+            var line = el('div', 'd-flex justify-content-between');
+            var name = el('span');
+            var dot = el('i', 'fa fa-circle mr-1');
+            dot.style.color = (data.colors || [])[index];
+            name.appendChild(dot);
+            name.appendChild(document.createTextNode(label));
+            line.appendChild(name);
+            line.appendChild(el('span', null, (data.percentages || [])[index] + '%'));
+            container.appendChild(line);
+        });
+    }
+
+    /* (Re)draw the chart of a canvas: drill-downs redraw every widget. */
+    function draw(canvasId, config) {
+        var canvas = document.getElementById(canvasId);
+        var previous = Chart.getChart(canvas);
+        if (previous) {
+            previous.destroy();
+        }
+        return new Chart(canvas.getContext('2d'), config);
+    }
+
+    /* Drill-down: clicking a group of a widget keyed by ``field`` filters
+     * the whole dashboard on it. The state lives in the URL as
+     * drill_<field>=<id> parameters (``none`` for records without value). */
+    var drillFields = JSON.parse(root.dataset.drillFields || '{}');
+    var drill = JSON.parse(root.dataset.drill || '[]');
+    var drillGeneration = 0;
+
+    function drillHandler(field, data) {
+        if (!field || !drillFields[field] || !data.keys) {
+            return undefined;
+        }
+        return function (event, elements) {
+            if (!elements.length) {
+                return;
+            }
+            var index = elements[0].index;
+            var key = data.keys[index];
+            setDrill(field, key === null ? 'none' : String(key), data.labels[index]);
+        };
+    }
+
+    function drillParams() {
+        var params = new URLSearchParams();
+        drill.forEach(function (item) { params.set('drill_' + item.field, item.value); });
+        if (new URLSearchParams(window.location.search).get('exact') === '1') {
+            params.set('exact', '1');
+        }
+        return params;
+    }
+
+    /* Links reloading the dashboard with one more parameter set to 1
+     * (data-looker-link="exact" or "refresh"), keeping the current
+     * drill-down. */
+    function syncLinks() {
+        root.querySelectorAll('[data-looker-link]').forEach(function (link) {
+            var params = drillParams();
+            params.set(link.dataset.lookerLink, '1');
+            link.href = '?' + params.toString();
+        });
+    }
+
+    function setDrill(field, value, label) {
+        drill = drill.filter(function (item) { return item.field !== field; });
+        if (value !== null) {
+            drill.push({ field: field, value: value, field_label: drillFields[field], label: label });
+        }
+        refine();
+    }
+
+    function renderDrillBar() {
+        var bar = document.getElementById('looker_drill');
+        if (!bar) {
+            return;
+        }
+        var list = bar.querySelector('[data-looker-drill-filters]');
+        list.textContent = '';
+        drill.forEach(function (item) {
+            var chip = el('span', 'badge bg-primary mr-1', item.field_label + ': ' + item.label + ' ');
+            var remove = el('a', 'text-white', '×');
+            remove.href = '#';
+            remove.addEventListener('click', function (event) {
+                event.preventDefault();
+                setDrill(item.field, null);
+            });
+            chip.appendChild(remove);
+            list.appendChild(chip);
+        });
+        bar.classList.toggle('d-none', !drill.length);
+        syncLinks();
+    }
+
+    /* Apply the current drill-down without reloading the page: widgets
+     * sliced out of cached aggregates come first, the others from one
+     * batch request. Widgets not shown yet get the refined data later. */
+    function refine() {
+        var generation = ++drillGeneration;
+        var params = drillParams();
+        var query = params.toString() ? '?' + params.toString() : '';
+        var base = '/looker_studio/report/' + reportId;
+        window.history.pushState(null, '', window.location.pathname + query);
+        renderDrillBar();
+        var first = fetchJson(base + '/drill' + query);
+        var rest = first.then(function (answer) {
+            if (!answer.pending.length) {
+                return {};
+            }
+            params.set('widgets', answer.pending.join(','));
+            return fetchJson(base + '/data?' + params.toString());
+        });
+        payload = Promise.all([first, rest]).then(function (results) {
+            return Object.assign({}, results[0].widgets, results[1]);
+        });
+        function redraw(widgets) {
+            if (generation !== drillGeneration) {
+                return;
+            }
+            Object.keys(widgets).forEach(function (widget) {
+                if (rendered[widget]) {
+                    renderWidget(widget, widgets[widget]);
+                }
+            });
+        }
+        first.then(function (answer) {
+            if (generation === drillGeneration) {
+                drill = answer.filters;
+                renderDrillBar();
+            }
+            redraw(answer.widgets);
+        });
+        rest.then(redraw).catch(function (error) {
+            console.error('Looker Studio drill-down failed', error);
+        });
+        if (rendered.detail) {
+            detail.reset();
+        }
+    }
+
+    function renderDoughnut(canvasId, data, cutout, drillField) {
+        draw(canvasId, {
+            type: 'doughnut',
+            data: {
+                labels: data.labels,
+                datasets: [{
+                    data: data.counts,
+                    backgroundColor: data.colors,
+                    borderWidth: 2,
+                    borderColor: '#ffffff',
+                }]
+            },
+            options: {
+                maintainAspectRatio: false,
+                cutout: cutout,
+                onClick: drillHandler(drillField, data),
+                plugins: {
+                    legend: { display: false },
+                    tooltip: { callbacks: { label: percentTooltip, afterLabel: errorTooltip(data) } }
+                }
+            }
+        });
+    }
+
+    var renderers = {
+        chart: function (data) {
+            var labels = data.labels || [];
+            var counts = data.count_values || [];
+            var sums = data.sum_values || [];
+            var hasSums = sums.some(function (v) { return v > 0; });
+            var bgColors = labels.map(function (_, i) { return PALETTE[i % PALETTE.length]; });
+
+            var datasets;
+            var options;
+            if (chartType === 'pie') {
+                datasets = [{
+                    data: hasSums ? sums : counts,
+                    backgroundColor: bgColors,
+                    borderWidth: 2,
+                    borderColor: '#ffffff',
+                }];
+                options = {
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: { display: true, position: 'right' },
+                        tooltip: { callbacks: { label: percentTooltip, afterLabel: errorTooltip(data) } }
+                    }
+                };
+            } else {
+                datasets = [{
+                    label: 'Số lượng',
+                    data: counts,
+                    backgroundColor: bgColors,
+                    borderColor: bgColors,
+                    borderWidth: 1,
+                    borderRadius: 5,
+                    yAxisID: 'y',
+                }];
+                if (hasSums) {
+                    datasets.push({
+                        label: 'Giá trị',
+                        data: sums,
+                        type: 'line',
+                        borderColor: '#e74a3b',
+                        backgroundColor: '#e74a3b',
+                        pointRadius: 5,
+                        yAxisID: 'y1',
+                    });
+                }
+                options = {
+                    maintainAspectRatio: false,
+                    layout: { padding: { left: 10, right: 25, top: 25, bottom: 0 } },
+                    scales: {
+                        x: { grid: { display: false }, ticks: { maxTicksLimit: 10 } },
+                        y: { type: 'linear', display: true, position: 'left', ticks: { maxTicksLimit: 8 }, grid: { color: "rgb(234, 236, 244)", borderDash: [2] } },
+                        y1: { type: 'linear', display: hasSums, position: 'right', grid: { drawOnChartArea: false } },
+                    },
+                    plugins: {
+                        legend: { display: true, position: 'top' },
+                        tooltip: { callbacks: { afterLabel: errorTooltip(data) } }
+                    }
+                };
+            }
+            options.onClick = drillHandler(groupField || 'stage_id', data);
+            draw('main_chart', {
+                type: chartType === 'pie' ? 'doughnut' : 'bar',
+                data: { labels: labels, datasets: datasets },
+                options: options
+            });
+        },
+
+        lost_reason: function (data) {
+            renderDoughnut('lost_reason_chart', data, '60%', 'lost_reason_id');
+            renderLegend('lost_reason_legend', data);
+        },
+
+        pipeline: function (data) {
+            draw('pipeline_chart', {
+                type: 'bar',
+                data: {
+                    labels: data.labels,
+                    datasets: [{
+                        label: 'Revenue',
+                        data: data.revenues,
+                        backgroundColor: PALETTE.slice(0, 7),
+                        borderRadius: 5,
+                    }]
+                },
+                options: {
+                    maintainAspectRatio: false,
+                    onClick: drillHandler('stage_id', data),
+                    plugins: {
+                        legend: { display: false },
+                        tooltip: { callbacks: {
+                            label: function (context) { return formatMonetary(context.raw); },
+                            afterLabel: errorTooltip(data),
+                        } }
+                    },
+                    scales: {
+                        x: { grid: { display: false } },
+                        y: { grid: { color: "rgb(234, 236, 244)", borderDash: [2] }, ticks: { callback: formatCompact } }
+                    }
+                }
+            });
+        },
+
+        trend: function (data) {
+            draw('trend_chart', {
+                type: 'line',
+                data: {
+                    labels: data.labels,
+                    datasets: [{
+                        label: 'Won',
+                        data: data.won_counts,
+                        borderColor: '#1cc88a',
+                        backgroundColor: 'rgba(28, 200, 138, 0.1)',
+                        fill: true,
+                        tension: 0.4,
+                    }, {
+                        label: 'Lost',
+                        data: data.lost_counts,
+                        borderColor: '#e74a3b',
+                        backgroundColor: 'rgba(231, 74, 59, 0.1)',
+                        fill: true,
+                        tension: 0.4,
+                    }]
+                },
+                options: {
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: { display: true, position: 'top' },
+                        tooltip: { callbacks: { afterLabel: errorTooltip(data) } }
+                    },
+                    scales: {
+                        x: { grid: { display: false } },
+                        y: { grid: { color: "rgb(234, 236, 244)", borderDash: [2] }, beginAtZero: true }
+                    }
+                }
+            });
+        },
+
+        customer: function (data) {
+            renderDoughnut('customer_level_chart', data, '55%');
+            renderLegend('customer_level_legend', data);
+        },
+    };
+
+    /*
+     * Detail table: keyset-paged and virtualized. Loaded rows are kept in
+     * memory but only those in (or near) the viewport are in the DOM, the
+     * rest being replaced by two spacer rows of the same height.
+     */
+    var ROW_HEIGHT = 33;
+    var OVERSCAN = 10;
+
+    var detail = {
+        viewport: document.getElementById('detail_viewport'),
+        tbody: document.getElementById('detail_rows'),
+        rows: [],
+        cursor: null,
+        done: false,
+        loading: false,
+        generation: 0,
+        sort: 'create_date',
+        order: 'desc',
+        filters: {},
+
+        reset: function () {
+            this.rows = [];
+            this.cursor = null;
+            this.done = false;
+            this.loading = false;
+            this.generation += 1;
+            this.viewport.scrollTop = 0;
+            this.render();
+        },
+
+        fetchPage: function () {
+            if (this.loading || this.done) {
+                return;
+            }
+            this.loading = true;
+            var self = this;
+            var generation = this.generation;
+            var params = new URLSearchParams({ sort: this.sort, order: this.order });
+            if (this.cursor) {
+                params.set('cursor', JSON.stringify(this.cursor));
+            }
+            Object.keys(this.filters).forEach(function (name) {
+                if (self.filters[name]) {
+                    params.set('filter_' + name, self.filters[name]);
+                }
+            });
+            drillParams().forEach(function (value, name) { params.set(name, value); });
+            fetch('/looker_studio/report/' + reportId + '/detail?' + params.toString(), {
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' },
+            }).then(function (response) {
+                if (!response.ok) {
+                    throw new Error('detail: HTTP ' + response.status);
+                }
+                return response.json();
+            }).then(function (page) {
+                if (generation !== self.generation) {
+                    return;  // sort or filters changed meanwhile
+                }
+                self.loading = false;
+                perfOverlay.schedule();
+                self.rows = self.rows.concat(page.rows);
+                self.cursor = page.next_cursor;
+                self.done = !page.next_cursor;
+                self.render();
+            }).catch(function (error) {
+                console.error('Looker Studio detail page failed to load', error);
+                if (generation === self.generation) {
+                    self.loading = false;
+                    self.done = true;
+                    self.render();
+                }
+            });
+        },
+
+        rowElement: function (row) {
+            var tr = el('tr');
+            tr.style.height = ROW_HEIGHT + 'px';
+            tr.appendChild(el('td', null, row.name));
+            tr.appendChild(el('td', null, row.create_date));
+            tr.appendChild(el('td', null, row.partner_id ? row.partner_id[1] : ''));
+            tr.appendChild(el('td', null, row.stage_id ? row.stage_id[1] : ''));
+            tr.appendChild(el('td', null, formatMonetary(row.expected_revenue)));
+            tr.appendChild(el('td', null, (row.probability || 0) + '%'));
+            var lost = el('td');
+            if (row.lost_reason_id) {
+                lost.appendChild(el('span', 'badge badge-danger', row.lost_reason_id[1]));
+            }
+            tr.appendChild(lost);
+            if (groupField) {
+                tr.appendChild(el('td', null, m2oName(row[groupField])));
+            }
+            return tr;
+        },
+
+        spacer: function (height, text) {
+            var tr = el('tr');
+            var td = el('td', text ? 'text-center text-muted' : 'p-0 border-0', text);
+            td.colSpan = this.tbody.dataset.columns;
+            tr.style.height = height + 'px';
+            tr.appendChild(td);
+            return tr;
+        },
+
+        render: function () {
+            var first = Math.max(0, Math.floor(this.viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+            var count = Math.ceil(this.viewport.clientHeight / ROW_HEIGHT) + 2 * OVERSCAN;
+            var last = Math.min(this.rows.length, first + count);
+            var fragment = document.createDocumentFragment();
+            if (first > 0) {
+                fragment.appendChild(this.spacer(first * ROW_HEIGHT));
+            }
+            for (var i = first; i < last; i++) {
+                fragment.appendChild(this.rowElement(this.rows[i]));
+            }
+            if (last < this.rows.length) {
+                fragment.appendChild(this.spacer((this.rows.length - last) * ROW_HEIGHT));
+            }
+            if (!this.done) {
+                fragment.appendChild(this.spacer(ROW_HEIGHT, 'Đang tải...'));
+            } else if (!this.rows.length) {
+                fragment.appendChild(this.spacer(ROW_HEIGHT, 'Không có dữ liệu'));
+            }
+            this.tbody.textContent = '';
+            this.tbody.appendChild(fragment);
+            // the next page is needed as soon as the user nears the end
+            if (!this.done && last >= this.rows.length - OVERSCAN) {
+                this.fetchPage();
+            }
+        },
+
+        setup: function () {
+            var self = this;
+            var scheduled = false;
+            this.viewport.addEventListener('scroll', function () {
+                if (!scheduled) {
+                    scheduled = true;
+                    window.requestAnimationFrame(function () {
+                        scheduled = false;
+                        self.render();
+                    });
+                }
+            });
+            root.querySelectorAll('[data-looker-sort]').forEach(function (th) {
+                th.addEventListener('click', function () {
+                    var sort = th.dataset.lookerSort;
+                    self.order = self.sort === sort && self.order === 'desc' ? 'asc' : 'desc';
+                    self.sort = sort;
+                    root.querySelectorAll('[data-looker-sort]').forEach(function (other) {
+                        other.removeAttribute('aria-sort');
+                    });
+                    th.setAttribute('aria-sort', self.order === 'asc' ? 'ascending' : 'descending');
+                    self.reset();
+                });
+            });
+            var timer = null;
+            root.querySelectorAll('[data-looker-filter]').forEach(function (input) {
+                input.addEventListener('input', function () {
+                    self.filters[input.dataset.lookerFilter] = input.value.trim();
+                    clearTimeout(timer);
+                    timer = setTimeout(function () { self.reset(); }, 300);
+                });
+            });
+        },
+    };
+
+    /* Debug overlay listing the perf_log entries recorded since page load. */
+    var perfOverlay = {
+        tbody: document.getElementById('looker_perf_rows'),
+        timer: null,
+
+        schedule: function () {
+            if (!this.tbody) {
+                return;
+            }
+            var self = this;
+            clearTimeout(this.timer);
+            this.timer = setTimeout(function () { self.refresh(); }, 500);
+        },
+
+        refresh: function () {
+            var self = this;
+            var url = '/looker_studio/report/' + reportId + '/perf_log?since=' + encodeURIComponent(root.dataset.perfSince);
+            fetchJson(url).then(function (entries) {
+                self.tbody.textContent = '';
+                entries.forEach(function (entry) {
+                    var tr = el('tr');
+                    tr.appendChild(el('td', null, entry.method));
+                    tr.appendChild(el('td', 'text-right', entry.duration.toFixed(1)));
+                    tr.appendChild(el('td', 'text-right', entry.query_count));
+                    tr.appendChild(el('td', 'text-right', entry.query_time.toFixed(1)));
+                    tr.appendChild(el('td', 'text-right', entry.row_count));
+                    self.tbody.appendChild(tr);
+                });
+            }).catch(function (error) {
+                console.error('Looker Studio performance log failed to load', error);
+            });
+        },
+    };
+
+    var rendered = {};
+
+    function renderWidget(widget, data) {
+        if (data.approximate) {
+            markApproximate(widget);
+        }
+        fillFields(widget, data);
+        if (renderers[widget]) {
+            renderers[widget](data);
+        }
+    }
+
+    function markApproximate(widget) {
+        root.querySelectorAll('[data-looker-widget="' + widget + '"]').forEach(function (node) {
+            var header = node.closest('.card') && node.closest('.card').querySelector('.card-header');
+            if (header && !header.querySelector('.looker-approximate')) {
+                header.appendChild(el('span', 'looker-approximate badge bg-warning text-dark ml-2', '≈'));
+            }
+        });
+    }
+
+    function show(widgets) {
+        widgets = widgets.filter(function (widget, index) {
+            return !rendered[widget] && widgets.indexOf(widget) === index;
+        });
+        widgets.forEach(function (widget) { rendered[widget] = true; });
+        if (widgets.indexOf('detail') !== -1) {
+            widgets.splice(widgets.indexOf('detail'), 1);
+            detail.setup();
+            detail.reset();
+        }
+        load(widgets).forEach(function (promise, index) {
+            var widget = widgets[index];
+            promise.then(function (data) {
+                renderWidget(widget, data);
+            }).catch(function (error) {
+                console.error('Looker Studio widget failed to load', error);
+                root.querySelectorAll('[data-looker-widget="' + widget + '"][data-looker-key]').forEach(function (node) {
+                    node.textContent = '-';
+                });
+            }).then(function () {
+                perfOverlay.schedule();
+            });
+        });
+    }
+
+    renderDrillBar();
+    var clear = root.querySelector('[data-looker-drill-clear]');
+    if (clear) {
+        clear.addEventListener('click', function (event) {
+            event.preventDefault();
+            drill = [];
+            refine();
+        });
+    }
+    // drill-downs are pushed to the history: going back reloads that state
+    window.addEventListener('popstate', function () { window.location.reload(); });
+
+    var nodes = Array.prototype.slice.call(root.querySelectorAll('[data-looker-widget]'));
+    function widgetsOf(elements) {
+        return elements.map(function (node) { return node.dataset.lookerWidget; });
+    }
+    if (!('IntersectionObserver' in window)) {
+        show(widgetsOf(nodes));
+        return;
+    }
+    // start fetching slightly before a widget scrolls into view; widgets
+    // appearing together are fetched together
+    var observer = new IntersectionObserver(function (entries) {
+        var visible = entries.filter(function (entry) { return entry.isIntersecting; }).map(function (entry) {
+            observer.unobserve(entry.target);
+            return entry.target;
+        });
+        if (visible.length) {
+            show(widgetsOf(visible));
+        }
+    }, { rootMargin: '200px 0px' });
+    nodes.forEach(function (node) { observer.observe(node); });
+})();
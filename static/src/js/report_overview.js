@@ -0,0 +1,80 @@
+/** @odoo-module ignore */
+/**
+ * Multi-report overview for report_overview_template.
+ *
+ * The main chart of every report on the page comes from one request to
+ * /looker_studio/overview/data, which plans the reports' aggregates together.
+ */
+(function () {
+    'use strict';
+
+    var root = document.getElementById('looker_overview');
+    if (!root) {
+        return;
+    }
+
+    var PALETTE = [
+        '#4e73df', '#1cc88a', '#36b9cc', '#f6c23e', '#e74a3b',
+        '#858796', '#5a5c69', '#6610f2', '#fd7e14', '#20c997'
+    ];
+
+    function renderPanel(canvas, data) {
+        var chartType = canvas.dataset.chartType || 'bar';
+        var labels = data.labels || [];
+        var sums = data.sum_values || [];
+        var hasSums = sums.some(function (v) { return v > 0; });
+        var colors = labels.map(function (_, i) { return PALETTE[i % PALETTE.length]; });
+        var config;
+        if (chartType === 'line') {
+            config = {
+                type: 'line',
+                data: {
+                    labels: data.line_labels || [],
+                    datasets: [{
+                        data: data.line_values || [],
+                        borderColor: PALETTE[0],
+                        backgroundColor: PALETTE[0],
+                        tension: 0.3,
+                    }]
+                },
+            };
+        } else {
+            config = {
+                type: chartType === 'pie' ? 'doughnut' : 'bar',
+                data: {
+                    labels: labels,
+                    datasets: [{
+                        data: hasSums ? sums : (data.count_values || []),
+                        backgroundColor: colors,
+                        borderColor: chartType === 'pie' ? '#ffffff' : colors,
+                        borderWidth: 1,
+                    }]
+                },
+            };
+        }
+        config.options = {
+            maintainAspectRatio: false,
+            plugins: { legend: { display: chartType === 'pie', position: 'right' } },
+        };
+        new Chart(canvas.getContext('2d'), config);
+    }
+
+    fetch(root.dataset.dataUrl, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' },
+    }).then(function (response) {
+        if (!response.ok) {
+            throw new Error(root.dataset.dataUrl + ': HTTP ' + response.status);
+        }
+        return response.json();
+    }).then(function (data) {
+        root.querySelectorAll('canvas[data-report-id]').forEach(function (canvas) {
+            var report = data[canvas.dataset.reportId];
+            if (report) {
+                renderPanel(canvas, report.chart);
+            }
+        });
+    }).catch(function (error) {
+        console.error('Looker Studio overview failed to load', error);
+    });
+})();
@@ -0,0 +1,9 @@
+from . import test_detail_page
+from . import test_compare
+from . import test_query_plans
+from . import test_drill_slice
+from . import test_validators
+from . import test_lead_daily_fact
+from . import test_snapshot
+from . import test_payload
+from . import test_approximate
@@ -0,0 +1,84 @@
+import math
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.CRM_report.models.report import ERROR_BOUND_Z
+
+SAMPLE_PERCENT = 50.0
+
+
+@tagged('post_install', '-at_install')
+class TestApproximateMode(TransactionCase):
+    """KPIs estimated from a sample of crm_lead, see ``LeadFilter``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # drilling down by a team of their own isolates the test leads
+        cls.team = cls.env['crm.team'].create({'name': 'Sample team'})
+        cls.drill = [('team_id', '=', cls.team.id)]
+        won = cls.env['crm.stage'].create({'name': 'Sample won', 'is_won': True})
+        cls.env['crm.lead'].create([
+            {'name': f'Sample lead {index}', 'type': 'lead', 'team_id': cls.team.id}
+            for index in range(150)
+        ] + [
+            {'name': f'Sample opportunity {index}', 'type': 'opportunity', 'team_id': cls.team.id,
+             'expected_revenue': 1000 + 10 * index, 'stage_id': won.id if index % 3 == 0 else False}
+            for index in range(150)
+        ])
+        # sampling is decided on the planner's row estimate
+        cls.env.cr.execute("ANALYZE crm_lead")
+        cls.env['ir.config_parameter'].sudo().set_param('CRM_report.approximate_min_rows', '0')
+        cls.report = cls.env['looker_studio.report'].create({
+            'name': 'Approximate',
+            'time_filter': 'custom',
+            'approximate': True,
+            'sample_percent': SAMPLE_PERCENT,
+        })
+
+    def _kpis(self, report):
+        self.env.cr.cache.clear()
+        return report.get_kpi_data(self.drill)
+
+    def _sampled_lead_count(self):
+        self.env.cr.execute(f"""
+            SELECT COUNT(*) FROM crm_lead TABLESAMPLE SYSTEM ({SAMPLE_PERCENT}) REPEATABLE (0)
+             WHERE team_id = %s AND type = 'lead' AND active
+        """, [self.team.id])
+        return self.env.cr.fetchone()[0]
+
+    def test_counts_scaled_with_bounds(self):
+        kpis = self._kpis(self.report)
+        approximate = kpis['approximate']
+        self.assertEqual(approximate['sample_percent'], SAMPLE_PERCENT)
+
+        sampled = self._sampled_lead_count()
+        fraction = SAMPLE_PERCENT / 100
+        self.assertEqual(kpis['lead_count'], round(sampled / fraction))
+        self.assertAlmostEqual(
+            approximate['errors']['lead_count'], ERROR_BOUND_Z * math.sqrt(sampled * (1 - fraction)) / fraction,
+            places=6)
+        for key in ('opp_count', 'forecast', 'total_opps', 'won_rate', 'lost_rate', 'conversion_rate'):
+            self.assertIn(key, approximate['errors'])
+            error = approximate['errors'][key]
+            self.assertTrue(error is None or error >= 0, f'{key} has a bound')
+
+    def test_exact_context(self):
+        kpis = self._kpis(self.report.with_context(looker_studio_exact=True))
+        self.assertNotIn('approximate', kpis)
+        self.assertEqual(kpis['lead_count'], 150)
+        self.assertEqual(kpis['total_opps'], 150)
+        self.assertEqual(kpis['won_rate'], 33.33)
+
+    def test_small_table_exact(self):
+        self.env['ir.config_parameter'].sudo().set_param('CRM_report.approximate_min_rows', str(10 ** 9))
+        self.assertIsNone(self.report._get_sample_percent())
+        self.assertNotIn('approximate', self._kpis(self.report))
+
+    def test_rate_error(self):
+        lead_filter = self.report._get_lead_filter(self.drill, sample=True)
+        self.assertEqual(lead_filter.sample, SAMPLE_PERCENT)
+        # 100 of 200 rows sampled, half of them counted
+        expected = ERROR_BOUND_Z * math.sqrt(0.5 * 0.5 * 0.5 / 100) * 100
+        self.assertEqual(self.report._rate_error(lead_filter, 50.0, 200), round(expected, 2))
+        self.assertIsNone(self.report._rate_error(lead_filter, 0.0, 0))
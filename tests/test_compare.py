@@ -0,0 +1,41 @@
+from datetime import date, datetime
+
+from freezegun import freeze_time
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestPeriodComparison(TransactionCase):
+    """Previous-period values of the KPIs, see ``_get_previous_window``."""
+
+    def _create_report(self, leads):
+        return self.env['looker_studio.report'].create({
+            'name': 'Comparison',
+            'domain': repr([('id', 'in', leads.ids)]),
+            'time_filter': 'this_year',
+        })
+
+    @freeze_time('2024-06-30')
+    def test_previous_window_stops_at_today(self):
+        report = self._create_report(self.env['crm.lead'])
+        # Jan 1 - Jun 30 elapsed: 182 days, compared with the 182 days before
+        self.assertEqual(report._get_previous_window(), (date(2023, 7, 3), date(2023, 12, 31)))
+
+    @freeze_time('2024-06-30')
+    def test_kpis_compare_elapsed_periods(self):
+        leads = self.env['crm.lead'].create([
+            {'name': 'Current', 'type': 'lead'},
+            {'name': 'Previous', 'type': 'lead'},
+            {'name': 'Before previous', 'type': 'lead'},
+        ])
+        for lead, day in zip(leads, (datetime(2024, 3, 1), datetime(2023, 9, 1), datetime(2023, 3, 1))):
+            self.env.cr.execute("UPDATE crm_lead SET create_date = %s WHERE id = %s", (day, lead.id))
+        leads.invalidate_recordset(['create_date'])
+
+        kpis = self._create_report(leads).get_kpi_data()
+        self.assertEqual(kpis['lead_count'], 1)
+        # the lead of March 2023 is outside the previous 182 days
+        self.assertEqual(kpis['previous']['lead_count'], 1)
+        self.assertEqual(kpis['delta']['lead_count'], 0)
+        self.assertEqual(kpis['previous_period'], ['2023-07-03', '2023-12-31'])
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDetailPage(TransactionCase):
+    """Keyset paging of the detail table, see ``get_detail_page``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.leads = cls.env['crm.lead'].create([{'name': f'Keyset {index}'} for index in range(9)])
+        # three leads in the same second, a bulk import sharing one
+        # timestamp, and leads without creation date
+        dates = [
+            datetime(2024, 3, 1, 10, 0, 0, 100), datetime(2024, 3, 1, 10, 0, 0, 200),
+            datetime(2024, 3, 1, 10, 0, 0, 300),
+            datetime(2024, 3, 2, 9, 30), datetime(2024, 3, 2, 9, 30), datetime(2024, 3, 2, 9, 30),
+            datetime(2024, 3, 3, 8, 0), None, None,
+        ]
+        for lead, date in zip(cls.leads, dates):
+            cls.env.cr.execute("UPDATE crm_lead SET create_date = %s WHERE id = %s", (date, lead.id))
+        cls.leads.invalidate_recordset(['create_date'])
+        cls.report = cls.env['looker_studio.report'].create({
+            'name': 'Keyset',
+            'domain': repr([('id', 'in', cls.leads.ids)]),
+            'time_filter': 'custom',
+            'date_from': False,
+            'date_to': False,
+        })
+
+    def _page_through(self, descending, page_size=2):
+        ids, cursor = [], None
+        while True:
+            page = self.report.get_detail_page(cursor=cursor, descending=descending, page_size=page_size)
+            ids += [row['id'] for row in page['rows']]
+            cursor = page['next_cursor']
+            if not cursor:
+                return ids
+
+    def _expected(self, descending):
+        dated = self.leads.filtered('create_date').sorted(lambda lead: (lead.create_date, lead.id), reverse=descending)
+        undated = self.leads.filtered(lambda lead: not lead.create_date).sorted('id', reverse=descending)
+        return dated.ids + undated.ids
+
+    def test_same_second_descending(self):
+        ids = self._page_through(descending=True)
+        self.assertEqual(ids, self._expected(descending=True))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_same_second_ascending(self):
+        ids = self._page_through(descending=False)
+        self.assertEqual(ids, self._expected(descending=False))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_cursor_keeps_microseconds(self):
+        page = self.report.get_detail_page(descending=False, page_size=1)
+        self.assertEqual(page['next_cursor'][0], '2024-03-01T10:00:00.000100')
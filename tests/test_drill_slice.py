@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDrillSlice(TransactionCase):
+    """Drill-downs answered from the cached rows of the unfiltered report,
+    see ``_slice_base_rows``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stages = cls.env['crm.stage'].create([{'name': 'Slice new'}, {'name': 'Slice won'}])
+        cls.leads = cls.env['crm.lead'].create([
+            {'name': f'Slice {index}', 'type': 'opportunity', 'stage_id': stage.id, 'expected_revenue': revenue}
+            for index, (stage, revenue) in enumerate(zip(cls.stages * 3, (100, 200, 300, 400, 500, 600)))
+        ])
+        # two months, both stages in each
+        dates = [datetime(2024, 1, 5), datetime(2024, 1, 6), datetime(2024, 1, 7),
+                 datetime(2024, 3, 5), datetime(2024, 3, 6), datetime(2024, 3, 7)]
+        for lead, date in zip(cls.leads, dates):
+            cls.env.cr.execute("UPDATE crm_lead SET create_date = %s WHERE id = %s", (date, lead.id))
+        cls.leads.invalidate_recordset(['create_date'])
+        cls.report = cls.env['looker_studio.report'].create({
+            'name': 'Slice',
+            'domain': repr([('id', 'in', cls.leads.ids)]),
+            'group_field': 'stage_id',
+            'value_field': 'expected_revenue',
+            'granularity': 'month',
+            'time_filter': 'custom',
+            'date_from': '2024-01-01',
+            'date_to': '2024-03-31',
+        })
+
+    def test_chart_sliced_by_group_field(self):
+        self.report.get_widgets_data(['chart'])
+        for stage in self.stages:
+            drill = [('stage_id', '=', stage.id)]
+            sliced = self.report.get_sliced_widgets_data(['chart'], drill)
+            self.assertIn('chart', sliced, 'the chart drill-down read leads')
+            self.assertEqual(sliced['chart'], self.report.get_chart_data(drill))
+
+    def test_chart_time_series_sliced(self):
+        self.report.get_widgets_data(['chart'])
+        chart = self.report.get_sliced_widgets_data(['chart'], [('stage_id', '=', self.stages[0].id)])['chart']
+        # leads 0 and 2 in January, 4 in March
+        self.assertEqual(chart['line_values'], [400, 0, 500])
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestLeadDailyFact(TransactionCase):
+    """Reports read the same figures from the daily facts as from crm_lead,
+    see ``looker_studio.lead_daily_fact``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # drilling down by a team of their own isolates the test leads
+        cls.team = cls.env['crm.team'].create({'name': 'Fact team'})
+        cls.drill = [('team_id', '=', cls.team.id)]
+        cls.leads = cls.env['crm.lead'].create([
+            {'name': f'Fact {index}', 'type': 'lead', 'team_id': cls.team.id} for index in range(4)
+        ])
+        # inside, on the last day of the window, after it, in the previous period
+        dates = [datetime(2024, 3, 15, 9, 0), datetime(2024, 3, 31, 23, 30),
+                 datetime(2024, 4, 1, 0, 30), datetime(2024, 2, 20, 12, 0)]
+        cls._set_create_dates(cls.leads, dates)
+        window = {'time_filter': 'custom', 'date_from': '2024-03-01', 'date_to': '2024-03-31'}
+        cls.live, cls.fact = cls.env['looker_studio.report'].create([
+            dict(window, name='Live', data_source='live'),
+            dict(window, name='Fact', data_source='fact'),
+        ])
+        cls.env['looker_studio.lead_daily_fact']._refresh(full=True)
+
+    @classmethod
+    def _set_create_dates(cls, leads, dates):
+        # written back then too, so that only the changes made by a test are
+        # newer than the watermark
+        for lead, date in zip(leads, dates):
+            cls.env.cr.execute("UPDATE crm_lead SET create_date = %s, write_date = %s WHERE id = %s", (date, date, lead.id))
+        leads.invalidate_recordset(['create_date', 'write_date'])
+
+    def _kpis(self, report):
+        self.env.cr.cache.clear()
+        return report.get_kpi_data(self.drill)
+
+    def test_fact_and_live_windows_match(self):
+        live, fact = self._kpis(self.live), self._kpis(self.fact)
+        self.assertEqual(live['lead_count'], 2, 'the last day of the window is included whole')
+        self.assertEqual(fact['lead_count'], live['lead_count'])
+        self.assertEqual(fact['previous']['lead_count'], live['previous']['lead_count'])
+
+    def test_refresh_rebuilds_written_days(self):
+        self.leads[1].write({'type': 'opportunity'})
+        self.env['looker_studio.lead_daily_fact']._refresh()
+        fact = self._kpis(self.fact)
+        self.assertEqual(fact['lead_count'], 1)
+        self.assertEqual(fact['lead_count'], self._kpis(self.live)['lead_count'])
+
+    def test_refresh_drops_deleted_leads(self):
+        self.leads[0].unlink()
+        self.env['looker_studio.lead_daily_fact']._refresh()
+        fact = self._kpis(self.fact)
+        self.assertEqual(fact['lead_count'], 1, 'the day of the deleted lead is rebuilt')
+        self.assertEqual(fact['lead_count'], self._kpis(self.live)['lead_count'])
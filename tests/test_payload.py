@@ -0,0 +1,55 @@
+from odoo.tests import HttpCase, tagged
+
+from odoo.addons.CRM_report.controllers.payload import FLOAT_DIGITS, decode_payload, encode_payload
+from odoo.addons.CRM_report.controllers.report import PAYLOAD_EXCLUDED_WIDGETS, PAYLOAD_LIVE
+
+
+def _rounded(value):
+    """``value`` as the payload carries it."""
+    if isinstance(value, float):
+        return round(value, FLOAT_DIGITS)
+    if isinstance(value, dict):
+        return {key: _rounded(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_rounded(item) for item in value]
+    return value
+
+
+@tagged('post_install', '-at_install')
+class TestDashboardPayload(HttpCase):
+    """The columnar payload of the dashboard decodes to the widgets it was
+    encoded from, see ``payload.py``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        stages = cls.env['crm.stage'].create([{'name': 'Payload new'}, {'name': 'Payload won'}])
+        cls.leads = cls.env['crm.lead'].create([
+            {'name': f'Payload {index}', 'type': 'opportunity', 'stage_id': stage.id,
+             'expected_revenue': revenue, 'probability': 100 / 3}
+            for index, (stage, revenue) in enumerate(zip(stages * 2, (100, 250, 1000, 12.5)))
+        ])
+        cls.report = cls.env['looker_studio.report'].create({
+            'name': 'Payload',
+            'domain': repr([('id', 'in', cls.leads.ids)]),
+            'group_field': 'stage_id',
+            'value_field': 'expected_revenue',
+        })
+        cls.widgets = [widget for widget in cls.report._widget_methods if widget not in PAYLOAD_EXCLUDED_WIDGETS]
+
+    def test_round_trip(self):
+        data = self.report.get_widgets_data(self.widgets)
+        payload = encode_payload(data)
+        self.assertTrue(payload['strings'], 'the stage names are shared')
+        self.assertEqual(decode_payload(payload), _rounded(data))
+
+    def test_route_payload(self):
+        self.authenticate('admin', 'admin')
+        response = self.url_open(
+            f'/looker_studio/report/{self.report.id}/payload/{PAYLOAD_LIVE}',
+            headers={'Accept-Encoding': 'gzip'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        # decompressed by requests
+        self.assertEqual(decode_payload(response.json()), _rounded(self.report.get_widgets_data(self.widgets)))
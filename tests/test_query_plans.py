@@ -0,0 +1,112 @@
+from dateutil.relativedelta import relativedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import SQL
+
+from odoo.addons.CRM_report.models.query_plan import capture_queries, explain, plan_indexes, window_statements
+
+# Rows generated, spread over five years of creation dates.
+LEAD_COUNT = 50000
+ACTIVITY_COUNT = 20000
+SALESPERSON_COUNT = 10
+
+
+@tagged('post_install', '-at_install')
+class TestQueryPlans(TransactionCase):
+    """The report queries read crm_lead and mail_activity through the
+    ``REPORT_INDEXES`` designed for them, with the planner's normal settings
+    on a realistic amount of data."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.salespeople = cls.env['res.users'].create([
+            {'name': f'Plan salesperson {index}', 'login': f'plan_salesperson_{index}'}
+            for index in range(SALESPERSON_COUNT)
+        ])
+        partner = cls.env['res.partner'].create({'name': 'Plan customer'})
+        lead = cls.env['crm.lead'].create({'name': 'Plan template', 'type': 'opportunity', 'partner_id': partner.id})
+        activity = lead.activity_schedule('mail.mail_activity_data_todo', user_id=cls.salespeople[0].id)
+        cls.env.flush_all()
+        # one in five records is an opportunity, seven in ten are active
+        cls._clone_rows('crm_lead', lead.id, LEAD_COUNT, {
+            'name': SQL("'Plan lead ' || g"),
+            'type': SQL("CASE WHEN mod(g, 5) = 0 THEN 'opportunity' ELSE 'lead' END"),
+            'active': SQL("mod(g, 10) < 7"),
+            'user_id': SQL("(%s::int[])[mod(g, %s) + 1]", cls.salespeople.ids, SALESPERSON_COUNT),
+        })
+        cls._clone_rows('mail_activity', activity.id, ACTIVITY_COUNT, {
+            'user_id': SQL("(%s::int[])[mod(g, %s) + 1]", cls.salespeople.ids, SALESPERSON_COUNT),
+        })
+        cls.env.cr.execute("ANALYZE crm_lead")
+        cls.env.cr.execute("ANALYZE mail_activity")
+
+    @classmethod
+    def _clone_rows(cls, table, template_id, count, values):
+        """Insert ``count`` copies of row ``template_id`` of ``table``, with
+        ``values`` SQL expressions of the series number ``g`` and creation
+        dates spread over five years."""
+        cls.env.cr.execute(SQL(
+            """SELECT column_name FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = %s AND column_name != 'id'""",
+            table,
+        ))
+        values = dict(values, create_date=SQL(
+            "now() AT TIME ZONE 'UTC' - mod(g * 7919, 1826) * interval '1 day' - mod(g, 86400) * interval '1 second'",
+        ))
+        columns = [row[0] for row in cls.env.cr.fetchall()]
+        cls.env.cr.execute(SQL(
+            "INSERT INTO %s (%s) SELECT %s FROM %s, generate_series(1, %s) AS g WHERE %s.id = %s",
+            SQL.identifier(table),
+            SQL(", ").join(SQL.identifier(column) for column in columns),
+            SQL(", ").join(values.get(column, SQL.identifier(table, column)) for column in columns),
+            SQL.identifier(table), count, SQL.identifier(table), template_id,
+        ))
+
+    def _window(self, **delta):
+        today = fields.Date.context_today(self.env.user)
+        return {'time_filter': 'custom', 'date_from': today - relativedelta(**delta), 'date_to': today}
+
+    def assertUsesIndex(self, report, methods, table, index):
+        with capture_queries(self.env.cr) as queries:
+            for method in methods:
+                getattr(report, method)()
+        statements = window_statements(queries, table)
+        self.assertTrue(statements, f'{report._name} read no {table} rows within its window')
+        for query, params in statements:
+            plan = explain(self.env.cr, query, params)
+            self.assertIn(index, plan_indexes(plan), f'{index} unused by: {query}')
+
+    def test_lead_report_create_date(self):
+        report = self.env['looker_studio.report'].create(dict(self._window(months=1), name='Plan'))
+        self.assertUsesIndex(report, [
+            'get_kpi_data', 'get_chart_data', 'get_lost_reason_data', 'get_pipeline_by_stage_data',
+            'get_win_loss_trend', 'get_source_analysis', 'get_deal_metrics', 'get_customer_data', 'get_detail_page',
+        ], 'crm_lead', 'crm_lead_looker_create_date_index')
+
+    def test_lead_report_type_active(self):
+        report = self.env['looker_studio.report'].create(dict(
+            self._window(months=6), name='Plan open opportunities',
+            domain=repr([('type', '=', 'opportunity'), ('active', '=', True)]),
+        ))
+        self.assertUsesIndex(report, [
+            'get_kpi_data', 'get_chart_data', 'get_pipeline_by_stage_data', 'get_win_loss_trend',
+            'get_source_analysis', 'get_deal_metrics',
+        ], 'crm_lead', 'crm_lead_looker_type_active_create_date_index')
+
+    def test_sales_report_salesperson(self):
+        report = self.env['looker_studio.sales_performance_report'].create(dict(
+            self._window(months=12), name='Plan salesperson',
+            domain=repr([('type', '=', 'opportunity')]),
+            group_by_mode='specific', salesperson_id=self.salespeople[0].id,
+        ))
+        self.assertUsesIndex(
+            report, ['get_summary_data'], 'crm_lead', 'crm_lead_looker_user_create_date_index')
+
+    def test_activity_report_create_date(self):
+        report = self.env['looker_studio.activity_report'].create(dict(
+            self._window(months=1), name='Plan activities', group_field='user_id',
+        ))
+        self.assertUsesIndex(
+            report, ['get_data', 'get_workload_heatmap'], 'mail_activity', 'mail_activity_looker_create_date_index')
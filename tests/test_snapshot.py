@@ -0,0 +1,69 @@
+import json
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestReportSnapshot(TransactionCase):
+    """Report pages served from the snapshots stored by the cron, see
+    ``looker_studio.snapshot.mixin``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Snapshot = cls.env['looker_studio.report_snapshot']
+        cls.leads = cls.env['crm.lead'].create([
+            {'name': f'Snapshot {index}', 'type': 'opportunity', 'expected_revenue': 100 * index}
+            for index in range(3)
+        ])
+        cls.report, cls.disabled = cls.env['looker_studio.report'].create([
+            {'name': 'Snapshot', 'domain': repr([('id', 'in', cls.leads.ids)]), 'snapshot_enabled': True},
+            {'name': 'No snapshot', 'domain': repr([('id', 'in', cls.leads.ids)])},
+        ])
+
+    def _cron_refresh(self):
+        # the cron commits each snapshot, the test transaction must not
+        self.patch(self.env.cr, 'commit', lambda: None)
+        self.Snapshot._cron_refresh()
+
+    def _age(self, snapshot, minutes):
+        self.env.cr.execute(
+            "UPDATE looker_studio_report_snapshot SET computed_at = %s WHERE id = %s",
+            (fields.Datetime.now() - timedelta(minutes=minutes), snapshot.id),
+        )
+        snapshot.invalidate_recordset(['computed_at'])
+
+    def test_cron_stores_enabled_reports(self):
+        self._cron_refresh()
+        snapshot = self.Snapshot._find(self.report)
+        self.assertTrue(snapshot)
+        self.assertFalse(self.Snapshot._find(self.disabled))
+
+        expected = json.loads(json.dumps(self.report._get_snapshot_payload(), default=str))
+        payload, computed_at = self.report._get_snapshot()
+        self.assertEqual(payload, expected)
+        self.assertEqual(computed_at, snapshot.computed_at)
+        self.assertEqual(self.report._get_snapshot_date(), snapshot.computed_at)
+        self.assertEqual(self.disabled._get_snapshot(), (None, None))
+
+    def test_stale_snapshot_recomputed(self):
+        self._cron_refresh()
+        snapshot = self.Snapshot._find(self.report)
+        self._age(snapshot, self.report.snapshot_max_age + 1)
+        self.assertIsNone(self.report._get_snapshot_date(), 'a stale snapshot is not served')
+
+        payload, computed_at = self.report._get_snapshot()
+        self.assertEqual(self.Snapshot._find(self.report), snapshot, 'the snapshot is replaced in place')
+        self.assertGreater(computed_at, fields.Datetime.now() - timedelta(minutes=1))
+        self.assertEqual(self.report._get_snapshot_date(), computed_at)
+        self.assertIn('widgets', payload)
+
+    def test_cron_drops_abandoned_snapshots(self):
+        self._cron_refresh()
+        snapshot = self.Snapshot._find(self.report)
+        self.report.snapshot_enabled = False
+        self._age(snapshot, 8 * 24 * 60)
+        self._cron_refresh()
+        self.assertFalse(snapshot.exists())
@@ -0,0 +1,35 @@
+from odoo.tests import HttpCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestReportValidators(HttpCase):
+    """ETags of the report pages change with the data they show, see
+    ``_validators``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.salespeople = cls.env['res.users'].create([
+            {'name': f'Validator salesperson {index}', 'login': f'validator_salesperson_{index}'}
+            for index in range(2)
+        ])
+        cls.lead = cls.env['crm.lead'].create({'name': 'Validator lead', 'user_id': cls.salespeople[0].id})
+        cls.lead.activity_schedule('mail.mail_activity_data_todo', user_id=cls.salespeople[0].id)
+        cls.report = cls.env['looker_studio.activity_report'].create({
+            'name': 'Validators',
+            'group_field': 'user_id',
+        })
+
+    def _etag(self):
+        response = self.url_open(f'/looker_studio/activity_report/{self.report.id}')
+        self.assertEqual(response.status_code, 200)
+        return response.headers['ETag']
+
+    def test_activity_etag_follows_lead_changes(self):
+        self.authenticate('admin', 'admin')
+        etag = self._etag()
+        self.assertEqual(self._etag(), etag)
+        self.lead.write({'user_id': self.salespeople[1].id})
+        # generations are bumped once the writing transaction commits
+        self.env.cr.postcommit.run()
+        self.assertNotEqual(self._etag(), etag)